@@ -0,0 +1,214 @@
+"""
+End-to-end generation benchmark.
+
+Runs generate_SAP_data at several multiples of tests.Config.sampleconfig, each run in a
+fresh process so that its peak memory is its own, and records rows/sec and peak RSS per
+table. For each table it fits a scaling exponent: the slope of log(seconds) over
+log(rows), 1.0 for a stage whose time grows linearly with its rows. The results are
+compared with a stored baseline; a stage whose exponent, throughput or peak memory
+regressed beyond its tolerance fails the run.
+
+    python -m benchmarks.generation                      # 1x, 10x, 100x, against the baseline
+    python -m benchmarks.generation --update-baseline    # record a new baseline
+
+Throughput and memory depend on the machine; record the baseline on the machine the
+benchmark runs on. Scaling exponents do not.
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tests.Config import sampleconfig
+
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_MODES = ['batch', 'row']
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'generation.json')
+
+# Record counts multiplied by the scale factor
+SCALED_KEYS = ['NUM_VENDORS', 'NUM_MATERIALS', 'NUM_PO_HEADERS', 'NUM_PO_LINE_ITEMS_TARGET', 'NUM_PO_HISTORY_TARGET',
+               'NUM_CONTRACTS_TARGET', 'NUM_VENDORS_CONTRACTS_TARGET']
+
+# Allowed regressions against the baseline
+EXPONENT_TOLERANCE = 0.25 # Absolute increase of a scaling exponent
+THROUGHPUT_TOLERANCE = 0.5 # Relative drop of rows/sec at the largest scale
+MEMORY_TOLERANCE = 0.5 # Relative increase of peak RSS at the largest scale
+
+
+def scaled_config(scale, generation_mode, output_dir):
+    """
+    Returns the sample configuration with its record counts multiplied by `scale`.
+
+    Args:
+        scale (int): The scale factor.
+        generation_mode (str): "batch" or "row".
+        output_dir (str): The output directory of the run.
+    """
+    config = sampleconfig()
+    for key in SCALED_KEYS:
+        setattr(config, key, getattr(config, key) * scale)
+    config.GENERATION_MODE = generation_mode
+    config.OUTPUT_DIR = output_dir
+    config.PROGRESS_SINKS = []
+    config.IN_PROCESS_HANDOFF = False # Time EKPO and EKBE as separate stages
+    return config
+
+def run_scale(scale, generation_mode):
+    """
+    Generates the data at one scale in a temporary directory.
+
+    Args:
+        scale (int): The scale factor.
+        generation_mode (str): "batch" or "row".
+
+    Returns:
+        dict: Table -> {'rows', 'wall_seconds', 'rows_per_sec', 'peak_mb'}.
+    """
+    from src.data_generator.SAPDataGenerator import SAPDataGenerator
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as output_dir:
+        generator = SAPDataGenerator(scaled_config(scale, generation_mode, output_dir))
+        report = generator.generate_SAP_data(workers=1)
+    return {name: {'rows': stage.rows, 'wall_seconds': stage.wall_seconds, 'rows_per_sec': stage.rows_per_sec,
+                   'peak_mb': generator.memory_report.stages[name].peak_mb}
+            for name, stage in report.stages.items()}
+
+def fit_scaling_exponent(rows, seconds):
+    """
+    Fits seconds ~ rows ** exponent by least squares on the log-log values.
+
+    Args:
+        rows (list): Rows of the stage at each scale.
+        seconds (list): Wall time of the stage at each scale.
+
+    Returns:
+        float: The exponent, or None with fewer than two distinct row counts.
+    """
+    rows, seconds = np.asarray(rows, dtype=float), np.maximum(np.asarray(seconds, dtype=float), 1e-9)
+    if len(np.unique(rows)) < 2 or (rows <= 0).any():
+        return None
+    return float(np.polyfit(np.log(rows), np.log(seconds), 1)[0])
+
+def run_benchmark(scales=DEFAULT_SCALES, modes=DEFAULT_MODES):
+    """
+    Runs the benchmark, each scale and mode in a fresh process.
+
+    Args:
+        scales (list): The scale factors (default: 1, 10, 100).
+        modes (list): The generation modes (default: batch and row).
+
+    Returns:
+        dict: {'scales': scales, 'modes': mode -> table -> {'exponent', 'runs': scale -> run_scale figures}}.
+    """
+    results = {'scales': list(scales), 'modes': {}}
+    context = multiprocessing.get_context('spawn')
+    for mode in modes:
+        tables = {}
+        for scale in scales:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                run = executor.submit(run_scale, scale, mode).result()
+            for table, figures in run.items():
+                tables.setdefault(table, {'runs': {}})['runs'][str(scale)] = figures
+        for table in tables.values():
+            runs = list(table['runs'].values())
+            table['exponent'] = fit_scaling_exponent([run['rows'] for run in runs], [run['wall_seconds'] for run in runs])
+        results['modes'][mode] = tables
+    return results
+
+def compare_to_baseline(results, baseline, exponent_tolerance=EXPONENT_TOLERANCE,
+                        throughput_tolerance=THROUGHPUT_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Lists the stages that regressed against the baseline.
+
+    Exponents are compared when both were fitted; throughput and peak memory at the
+    largest scale both runs share.
+
+    Args:
+        results (dict): Output of run_benchmark.
+        baseline (dict): Output of run_benchmark recorded earlier.
+        exponent_tolerance (float): Allowed absolute increase of an exponent.
+        throughput_tolerance (float): Allowed relative drop of rows/sec.
+        memory_tolerance (float): Allowed relative increase of peak RSS.
+
+    Returns:
+        list: One message per regression; empty if nothing regressed.
+    """
+    regressions = []
+    shared_scales = [str(scale) for scale in results['scales'] if scale in baseline['scales']]
+    for mode, tables in results['modes'].items():
+        for table, figures in tables.items():
+            recorded = baseline['modes'].get(mode, {}).get(table)
+            if recorded is None:
+                continue
+            name = f"{mode} {table}"
+            if figures['exponent'] is not None and recorded['exponent'] is not None \
+                    and figures['exponent'] > recorded['exponent'] + exponent_tolerance:
+                regressions.append(f"{name}: scaling exponent {figures['exponent']:.2f}, baseline {recorded['exponent']:.2f}")
+            if not shared_scales:
+                continue
+            run, recorded_run = figures['runs'][shared_scales[-1]], recorded['runs'][shared_scales[-1]]
+            if run['rows_per_sec'] < recorded_run['rows_per_sec'] * (1 - throughput_tolerance):
+                regressions.append(f"{name}: {run['rows_per_sec']:,.0f} rows/s at {shared_scales[-1]}x, "
+                                   f"baseline {recorded_run['rows_per_sec']:,.0f} rows/s")
+            if run['peak_mb'] > recorded_run['peak_mb'] * (1 + memory_tolerance):
+                regressions.append(f"{name}: peak RSS {run['peak_mb']:.0f} MB at {shared_scales[-1]}x, "
+                                   f"baseline {recorded_run['peak_mb']:.0f} MB")
+    return regressions
+
+def format_results(results):
+    """Returns the results as a table: one line per mode and table with rows/sec and peak RSS per scale and the exponent."""
+    lines = []
+    for mode, tables in results['modes'].items():
+        for table, figures in tables.items():
+            runs = ", ".join(f"{scale}x {run['rows_per_sec']:,.0f} rows/s {run['peak_mb']:.0f} MB"
+                             for scale, run in figures['runs'].items())
+            exponent = '?' if figures['exponent'] is None else f"{figures['exponent']:.2f}"
+            lines.append(f"{mode:5} {table:15} exponent {exponent:>5}  {runs}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end generation benchmark with scaling exponents.")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help="Multiples of the sample configuration")
+    parser.add_argument('--modes', nargs='+', default=DEFAULT_MODES, choices=DEFAULT_MODES, help="Generation modes")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline file to compare with or update")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the results to the baseline file")
+    parser.add_argument('--output', help="Also write the results to this JSON file")
+    parser.add_argument('--exponent-tolerance', type=float, default=EXPONENT_TOLERANCE)
+    parser.add_argument('--throughput-tolerance', type=float, default=THROUGHPUT_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.scales, args.modes)
+    print(format_results(results))
+    if args.output:
+        _write_json(results, args.output)
+    if args.update_baseline:
+        _write_json(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    with open(args.baseline) as baseline_file:
+        regressions = compare_to_baseline(results, json.load(baseline_file), args.exponent_tolerance,
+                                          args.throughput_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+def _write_json(results, filepath):
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filepath, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Micro-benchmarks of the primitives in src/data_generator/utilities.py.
+
+Each primitive is timed in its scalar form (one value per call, as the row engine
+calls it) and in its batch form (one array of BATCH_SIZE values per call, as the
+batch engine calls it). Times are reported in nanoseconds per generated value, so
+the two forms compare directly, and checked against a saved baseline: a case that
+got slower than the baseline by more than the tolerance fails the run.
+
+    python -m benchmarks.utilities                      # compare with the baseline
+    python -m benchmarks.utilities --update-baseline    # record a new baseline
+    python -m benchmarks.utilities -k weighted_choice   # only the matching cases
+
+Times depend on the machine; record the baseline on the machine the benchmark runs on.
+"""
+import argparse
+import datetime
+import functools
+import json
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.data_generator.utilities import (
+    AliasSampler, calculate_net_value, calculate_net_values, generate_id, generate_ids, get_calendar_sampler,
+    get_delivery_delay_days, get_delivery_delays, get_q4_multiplier, get_random_date, get_random_date_in_range,
+    get_random_dates, get_random_dates_in_range, log_normal_int, log_normal_ints, read_csv_batches_generator,
+    read_csv_rows_generator, weighted_choice
+)
+
+
+BATCH_SIZE = 10000 # Values per call of a batch variant
+CSV_ROWS = 10000 # Rows of the file the CSV readers read
+# Weight vectors weighted_choice is called with: delay buckets, vendors, materials
+WEIGHT_VECTOR_SIZES = [3, 1000, 50000]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'utilities.json')
+TOLERANCE = 0.5 # Allowed relative slowdown against the baseline; timings of single calls vary by up to a third between runs
+REPEAT = 5 # Timings per case; the fastest is kept
+
+START_DATE = datetime.date(2020, 1, 1)
+END_DATE = datetime.date(2024, 12, 31)
+DELAY_DISTRIBUTION = {'1-7_days': 0.70, '8-14_days': 0.20, '15-30_days': 0.10}
+
+
+class Case:
+    """
+    One micro-benchmark: a primitive in its scalar or batch form.
+
+    Args:
+        primitive (str): The utilities function measured, e.g. 'weighted_choice'.
+        variant (str): 'scalar' or 'batch', optionally with the input size, e.g. 'scalar n=1000'.
+        setup (callable): Called once before timing (and outside of it); returns the function to time.
+        items (int): Values one call of the timed function produces (default: 1).
+    """
+
+    def __init__(self, primitive, variant, setup, items=1):
+        self.primitive = primitive
+        self.variant = variant
+        self.setup = setup
+        self.items = items
+
+    @property
+    def name(self):
+        return f"{self.primitive} {self.variant}"
+
+
+def _seeded(setup):
+    """Wraps a case setup so that every case draws from the same seeded random streams."""
+    def seeded_setup(*args):
+        random.seed(42)
+        np.random.seed(42)
+        return setup(*args)
+    return seeded_setup
+
+def _write_csv(directory):
+    """Writes an EKPO-like CSV file of CSV_ROWS rows for the reader cases and returns its path."""
+    filepath = os.path.join(directory, 'EKPO.csv')
+    rng = np.random.RandomState(42)
+    pd.DataFrame({
+        'EBELN': generate_ids('PO', 1, CSV_ROWS, 8),
+        'EBELP': np.char.add("LI", np.char.zfill((np.arange(CSV_ROWS) % 15 + 1).astype(str), 5)),
+        'MATNR': np.char.add("M", rng.randint(1, 50000, CSV_ROWS).astype(str)),
+        'MENGE': rng.randint(1, 1000, CSV_ROWS),
+        'NETPR': np.round(rng.uniform(1, 5000, CSV_ROWS), 2),
+        'EINDT': get_random_dates(START_DATE, END_DATE, CSV_ROWS, rng)
+    }).to_csv(filepath, index=False)
+    return filepath
+
+def build_cases(data_dir):
+    """
+    Returns every micro-benchmark case.
+
+    Args:
+        data_dir (str): Directory for the input files of the reader cases.
+
+    Returns:
+        list: The Case objects, scalar before batch per primitive.
+    """
+    po_dates = get_random_dates(START_DATE, END_DATE, BATCH_SIZE, np.random.RandomState(42))
+    quantities = np.random.RandomState(42).randint(1, 1000, BATCH_SIZE)
+    prices = np.round(np.random.RandomState(43).uniform(1, 5000, BATCH_SIZE), 2)
+    csv_path = _write_csv(data_dir)
+
+    cases = [
+        Case('generate_id', 'scalar', lambda: lambda: generate_id('V', 'V0001234', 7)),
+        Case('generate_id', 'batch', lambda: lambda: generate_ids('V', 1, BATCH_SIZE, 7), BATCH_SIZE),
+        Case('get_random_date', 'scalar', lambda: lambda: get_random_date(START_DATE, END_DATE)),
+        Case('get_random_date', 'batch', lambda: lambda: get_random_dates(START_DATE, END_DATE, BATCH_SIZE), BATCH_SIZE),
+        Case('get_random_date_in_range', 'scalar', lambda: lambda: get_random_date_in_range(START_DATE, 7, 60)),
+        Case('get_random_date_in_range', 'batch', lambda: lambda: get_random_dates_in_range(po_dates, 7, 60), BATCH_SIZE),
+    ]
+    for size in WEIGHT_VECTOR_SIZES:
+        choices, weights = list(range(size)), list(np.random.RandomState(size).pareto(1.16, size) + 1)
+        cases += [
+            Case('weighted_choice', f'scalar n={size}', lambda choices=choices, weights=weights: lambda: weighted_choice(choices, weights)),
+            # The batch engine builds an AliasSampler once and draws arrays from it
+            Case('weighted_choice', f'batch n={size}',
+                 lambda choices=choices, weights=weights: functools.partial(AliasSampler(choices, weights).sample, BATCH_SIZE), BATCH_SIZE),
+        ]
+    cases += [
+        Case('log_normal_int', 'scalar', lambda: lambda: log_normal_int(4, max_val=15)),
+        Case('log_normal_int', 'batch', lambda: lambda: log_normal_ints(4, BATCH_SIZE, max_val=15), BATCH_SIZE),
+        Case('get_q4_multiplier', 'scalar', lambda: lambda: get_q4_multiplier(0.3, START_DATE, END_DATE)),
+        Case('get_q4_multiplier', 'batch', lambda: lambda: get_calendar_sampler(START_DATE, END_DATE, 0.3).sample(BATCH_SIZE), BATCH_SIZE),
+        Case('get_delivery_delay_days', 'scalar', lambda: lambda: get_delivery_delay_days(DELAY_DISTRIBUTION)),
+        Case('get_delivery_delay_days', 'batch', lambda: lambda: get_delivery_delays(DELAY_DISTRIBUTION, BATCH_SIZE), BATCH_SIZE),
+        Case('calculate_net_value', 'scalar', lambda: lambda: calculate_net_value(17, 123.45)),
+        Case('calculate_net_value', 'batch', lambda: lambda: calculate_net_values(quantities, prices), BATCH_SIZE),
+        Case('read_csv_rows_generator', 'scalar', lambda: lambda: sum(1 for _ in read_csv_rows_generator(csv_path)), CSV_ROWS),
+        Case('read_csv_rows_generator', 'batch',
+             lambda: lambda: sum(len(batch) for batch in read_csv_batches_generator(csv_path, BATCH_SIZE)), CSV_ROWS),
+    ]
+    for case in cases:
+        case.setup = _seeded(case.setup)
+    return cases
+
+def time_case(case, repeat=REPEAT):
+    """
+    Times a case: calls per timing are chosen to take at least 0.2 s, and the fastest of `repeat` timings is kept.
+
+    Args:
+        case (Case): The case.
+        repeat (int): The number of timings (default: REPEAT).
+
+    Returns:
+        float: Nanoseconds per generated value.
+    """
+    timer = timeit.Timer(case.setup())
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number / case.items * 1e9
+
+def run_benchmark(pattern=None, repeat=REPEAT):
+    """
+    Runs the cases whose name contains `pattern` (default: all).
+
+    Returns:
+        dict: Case name -> {'ns_per_item', 'items_per_call'}.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for case in build_cases(data_dir):
+            if pattern is None or pattern in case.name:
+                results[case.name] = {'ns_per_item': time_case(case, repeat), 'items_per_call': case.items}
+    return results
+
+def compare_to_baseline(results, baseline, tolerance=TOLERANCE):
+    """
+    Lists the cases that got slower than the baseline by more than `tolerance`.
+
+    Args:
+        results (dict): Output of run_benchmark.
+        baseline (dict): Output of run_benchmark recorded earlier; cases it lacks are not compared.
+        tolerance (float): Allowed relative slowdown (default: TOLERANCE).
+
+    Returns:
+        list: One message per regression; empty if nothing regressed.
+    """
+    regressions = []
+    for name, figures in results.items():
+        recorded = baseline.get(name)
+        if recorded is not None and figures['ns_per_item'] > recorded['ns_per_item'] * (1 + tolerance):
+            regressions.append(f"{name}: {figures['ns_per_item']:,.1f} ns per value, baseline {recorded['ns_per_item']:,.1f} ns "
+                               f"({figures['ns_per_item'] / recorded['ns_per_item'] - 1:+.0%})")
+    return regressions
+
+def format_results(results, baseline=None):
+    """Returns the results as a table: ns per value per case, with the change against the baseline if one is given."""
+    lines = []
+    for name, figures in results.items():
+        line = f"{name:45} {figures['ns_per_item']:>12,.1f} ns/value"
+        recorded = (baseline or {}).get(name)
+        if recorded is not None:
+            line += f"  {figures['ns_per_item'] / recorded['ns_per_item'] - 1:+7.0%} vs baseline"
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the utilities primitives.")
+    parser.add_argument('-k', dest='pattern', help="Only run the cases whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="Timings per case; the fastest is kept")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline file to compare with or update")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the results to the baseline file")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.pattern, args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print(format_results(results, baseline))
+    if args.update_baseline:
+        # Cases that were not run keep their recorded figures
+        directory = os.path.dirname(args.baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({**baseline, **results}, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import datetime
+import numpy as np
+
+
+class CalendarSampler:
+    """
+    Samples dates from [start_date, end_date) using precomputed per-day weights, the same
+    range get_random_dates draws from.
+
+    The weights are built once; every draw is then a single searchsorted on their
+    cumulative distribution, so drawing N dates costs O(N log days) with no redraws.
+    Because the weights are explicit, the expected share of any set of days (e.g. Q4)
+    can be read off with expected_share instead of being estimated from samples.
+
+    Args:
+        start_date (datetime.date): The first day that can be drawn.
+        end_date (datetime.date): The end of the range; it is not drawn itself.
+        day_weights (array-like): Relative weight of each day from start_date up to end_date
+                                  (default: all days equally likely).
+    """
+
+    def __init__(self, start_date, end_date, day_weights=None):
+        self.days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D'))
+        if len(self.days) == 0:
+            raise ValueError(f"End date {end_date} is not after start date {start_date}.")
+        weights = np.ones(len(self.days)) if day_weights is None else np.asarray(day_weights, dtype=float)
+        if len(weights) != len(self.days) or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Day weights must be non-negative, not all zero and given for every day in the range.")
+        self.probabilities = weights / weights.sum()
+        self.cdf = np.cumsum(self.probabilities)
+
+    @classmethod
+    def from_profiles(cls, start_date, end_date, q4_increase_percentage=0.0, month_end_uplift=0.0,
+                      month_end_days=3, weekday_weights=None):
+        """
+        Builds a sampler from seasonal profiles, multiplied together.
+
+        Args:
+            start_date (datetime.date): The first day that can be drawn.
+            end_date (datetime.date): The end of the range; it is not drawn itself.
+            q4_increase_percentage (float): Share of draws forced into Q4, see q4_profile.
+            month_end_uplift (float): Extra weight of the last days of each month (0.5 = 50% more).
+            month_end_days (int): How many days at the end of each month get the uplift.
+            weekday_weights (list): Seven relative weights, Monday first (default: no weekday pattern).
+
+        Returns:
+            CalendarSampler: The sampler.
+        """
+        days = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D'))
+        weights = q4_profile(days, q4_increase_percentage)
+        if month_end_uplift:
+            weights = weights * month_end_profile(days, month_end_uplift, month_end_days)
+        if weekday_weights is not None:
+            weights = weights * weekday_profile(days, weekday_weights)
+        return cls(start_date, end_date, weights)
+
+    def sample(self, size=None, rng=None):
+        """
+        Draws dates according to the day weights.
+
+        Args:
+            size (int): Number of dates to draw, or None for a single date.
+            rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+        Returns:
+            numpy.ndarray or datetime.date: datetime64[D] dates, or one datetime.date if size is None.
+        """
+        rng = np.random if rng is None else rng
+        positions = np.searchsorted(self.cdf, rng.random_sample(size), side='right')
+        dates = self.days[np.minimum(positions, len(self.days) - 1)]
+        return dates.astype(datetime.date) if size is None else dates
+
+    def expected_share(self, day_mask):
+        """
+        Returns the probability that a drawn date is one of the masked days.
+
+        Args:
+            day_mask (numpy.ndarray): Boolean mask over self.days (e.g. the Q4 days).
+
+        Returns:
+            float: The expected share of draws.
+        """
+        return float(self.probabilities[day_mask].sum())
+
+
+def _months(days):
+    """Returns the month number (1-12) of datetime64[D] days."""
+    return days.astype('datetime64[M]').astype(int) % 12 + 1
+
+def q4_profile(days, q4_increase_percentage):
+    """
+    Day weights of the Q4 profile.
+
+    With probability `q4_increase_percentage` a date is drawn from the Q4 days (October to
+    December) only, otherwise from all days. This is exactly the distribution of the old
+    get_q4_multiplier rejection loop, without its unbounded redraws.
+
+    Args:
+        days (numpy.ndarray): datetime64[D] days.
+        q4_increase_percentage (float): Probability of a forced Q4 date (0 to 1).
+
+    Returns:
+        numpy.ndarray: Relative weight per day.
+    """
+    is_q4 = _months(days) >= 10
+    weights = np.full(len(days), (1 - q4_increase_percentage) / len(days))
+    if is_q4.any():
+        weights[is_q4] += q4_increase_percentage / is_q4.sum()
+    return weights
+
+def month_end_profile(days, uplift, num_days=3):
+    """
+    Day weights with the last `num_days` days of every month weighted (1 + uplift) times.
+
+    Args:
+        days (numpy.ndarray): datetime64[D] days.
+        uplift (float): Extra weight of month-end days (0.5 = 50% more).
+        num_days (int): How many days at the end of each month get the uplift.
+
+    Returns:
+        numpy.ndarray: Relative weight per day.
+    """
+    next_month = (days.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    is_month_end = (next_month - days).astype(int) <= num_days
+    return np.where(is_month_end, 1 + uplift, 1.0)
+
+def weekday_profile(days, weekday_weights):
+    """
+    Day weights by day of the week.
+
+    Args:
+        days (numpy.ndarray): datetime64[D] days.
+        weekday_weights (list): Seven relative weights, Monday first (e.g. [1, 1, 1, 1, 1, 0.1, 0.1]).
+
+    Returns:
+        numpy.ndarray: Relative weight per day.
+    """
+    weekday = (days.astype(int) + 3) % 7 # 1970-01-01 was a Thursday
+    return np.asarray(weekday_weights, dtype=float)[weekday]
@@ -0,0 +1,135 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+
+
+# Configuration keys that do not change the generated data, left out of the configuration hash
+CONFIG_HASH_IGNORED_KEYS = {'NUM_WORKERS', 'SHARE_MASTER_DATA', 'CHECKPOINT', 'RESUME', 'VALUE_POOL_CACHE_DIR',
+                            'PROGRESS_SINKS', 'PROGRESS_INTERVAL_SECONDS', 'PROGRESS_STATUS_FILE',
+                            'TIMING_REPORT', 'PROFILE_STAGES', 'MEMORY_REPORT'}
+
+
+class Checkpoint:
+    """
+    Manifest of the finished stages and shards of a generation run, kept in OUTPUT_DIR.
+
+    After every stage (master table, shard of the transactional tables, merge of a table)
+    the generator records the files it wrote and the ID high-water marks it reached. The
+    random streams need no saved state: every stage draws from a stream derived from
+    RANDOM_SEED, the table, the shard and the increment (see rng.py), which the manifest
+    records. A resumed run skips the recorded stages, restores the ID counters and
+    regenerates the rest, producing the same output as a run that was never interrupted.
+    The manifest is written to a temporary file and renamed, so a crash cannot leave it
+    half-written.
+
+    Args:
+        directory (str): The output directory the manifest is kept in.
+        config_hash (str): The configuration hash of the run, see config_hash.
+        random_streams (dict): The inputs random streams are derived from (RANDOM_SEED, increment).
+    """
+
+    FILENAME = '.checkpoint.json'
+
+    def __init__(self, directory, config_hash, random_streams=None):
+        self.directory = directory
+        self.config_hash = config_hash
+        self.random_streams = dict(random_streams or {})
+        self.stages = {} # Stage name -> {'files', 'id_high_water_marks', 'finished_at'}
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.FILENAME)
+
+    @classmethod
+    def load(cls, directory, config_hash):
+        """
+        Opens the manifest of an interrupted run for resuming.
+
+        Args:
+            directory (str): The output directory.
+            config_hash (str): The configuration hash of the resuming run.
+
+        Returns:
+            Checkpoint: The recorded checkpoint, or an empty one if the directory has none.
+
+        Raises:
+            ValueError: If the manifest was written with a different configuration.
+        """
+        checkpoint = cls(directory, config_hash)
+        if not os.path.exists(checkpoint.path):
+            logging.warning(f"No checkpoint found in {directory}; generating all stages.")
+            return checkpoint
+        with open(checkpoint.path) as manifest:
+            recorded = json.load(manifest)
+        if recorded['config_hash'] != config_hash:
+            raise ValueError(f"The checkpoint in {directory} was written with a different configuration; "
+                             f"cannot resume. Remove {checkpoint.path} to start over.")
+        checkpoint.random_streams = recorded.get('random_streams', {})
+        checkpoint.stages = recorded.get('stages', {})
+        return checkpoint
+
+    def is_done(self, stage):
+        """Returns True if the stage is recorded as finished and the files it wrote still exist."""
+        record = self.stages.get(stage)
+        return record is not None and all(os.path.exists(os.path.join(self.directory, f)) for f in record['files'])
+
+    def id_high_water_marks(self, stage):
+        """Returns the ID high-water marks recorded at the end of a finished stage."""
+        return self.stages[stage]['id_high_water_marks']
+
+    def mark_done(self, stage, files=(), id_high_water_marks=None):
+        """
+        Records a stage as finished and saves the manifest.
+
+        Args:
+            stage (str): The stage name, e.g. 'MARA' or 'shard 3'.
+            files (list): The files the stage wrote, relative to the output directory.
+            id_high_water_marks (dict): The ID high-water marks after the stage.
+        """
+        self.stages[stage] = {
+            'files': list(files),
+            'id_high_water_marks': {entity: int(number) for entity, number in (id_high_water_marks or {}).items()},
+            'finished_at': datetime.datetime.now().isoformat(timespec='seconds')
+        }
+        self.save()
+
+    def save(self):
+        """Writes the manifest atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w') as manifest:
+            json.dump({'config_hash': self.config_hash, 'random_streams': self.random_streams,
+                       'stages': self.stages}, manifest, indent=2)
+        os.replace(temporary_path, self.path)
+
+    def remove(self):
+        """Deletes the manifest."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def config_hash(config):
+    """
+    Returns a hash of the configuration keys that affect the generated data.
+
+    Args:
+        config (Config): The run configuration.
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    values = {key: _hashable(getattr(config, key)) for key in dir(config)
+              if key.isupper() and key not in CONFIG_HASH_IGNORED_KEYS}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=repr).encode()).hexdigest()
+
+def _hashable(value):
+    """Returns a value in a form whose JSON is the same in every process (sets are sorted)."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(map(repr, value))
+    if isinstance(value, dict):
+        return {str(key): _hashable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_hashable(item) for item in value]
+    return value
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+
+class ContractIndex:
+    """
+    Per-vendor interval index over vendor contracts.
+
+    Contracts are grouped by LIFNR and sorted by VALID_FROM, with VALID_TO, the material
+    position (in MARA) and the contract price stored alongside. "Which contracts of this
+    vendor are active on this date" then becomes a binary search over the vendor's slice
+    instead of a filter over the whole contract table.
+
+    Args:
+        contract_df (pd.DataFrame): Vendor contracts with LIFNR, MATNR, CONTRACT_PRICE,
+                                    VALID_FROM and VALID_TO columns.
+        material_ids (array-like): MATNR values in MARA order, used to translate MATNR
+                                   into material positions.
+    """
+
+    def __init__(self, contract_df, material_ids):
+        vendor_codes, vendors = pd.factorize(contract_df['LIFNR'])
+        valid_from = pd.to_datetime(contract_df['VALID_FROM']).to_numpy().astype('datetime64[D]')
+        valid_to = pd.to_datetime(contract_df['VALID_TO']).to_numpy().astype('datetime64[D]')
+
+        # Sort by vendor first, then by VALID_FROM within each vendor
+        order = np.lexsort((valid_from, vendor_codes))
+        self.valid_from = valid_from[order]
+        self.valid_to = valid_to[order]
+        self.material_pos = pd.Index(material_ids).get_indexer(contract_df['MATNR'])[order]
+        self.contract_price = contract_df['CONTRACT_PRICE'].to_numpy(dtype=float)[order]
+        self.contract_row = order # Position of each indexed contract in contract_df
+
+        bounds = np.searchsorted(vendor_codes[order], np.arange(len(vendors) + 1))
+        self.vendors = pd.Index(vendors)
+        self.vendor_ranges = {vendor: (bounds[i], bounds[i + 1]) for i, vendor in enumerate(vendors)}
+
+        # Vendor-material pair keys for vectorized lookups, sorted by key (stable, so VALID_FROM order is kept)
+        self.num_materials = len(material_ids)
+        pair_keys = vendor_codes[order].astype(np.int64) * self.num_materials + self.material_pos
+        self.pair_order = np.argsort(pair_keys, kind='stable')
+        self.pair_keys = pair_keys[self.pair_order]
+        self.max_contracts_per_pair = int(np.unique(pair_keys, return_counts=True)[1].max()) if len(pair_keys) else 0
+
+    def __len__(self):
+        return len(self.contract_row)
+
+    def active_contracts(self, lifnr, date):
+        """
+        Returns the index positions of the vendor's contracts that are valid on a date.
+
+        Args:
+            lifnr (str): Vendor ID.
+            date (numpy.datetime64 or datetime.date): The date to check.
+
+        Returns:
+            numpy.ndarray: Positions into the index arrays, ordered by VALID_FROM.
+        """
+        start, stop = self.vendor_ranges.get(lifnr, (0, 0))
+        date = np.datetime64(date, 'D')
+        # Only contracts that started on or before the date can be active
+        started_stop = start + np.searchsorted(self.valid_from[start:stop], date, side='right')
+        candidates = np.arange(start, started_stop)
+        return candidates[self.valid_to[start:started_stop] >= date]
+
+    def active_materials(self, lifnr, date):
+        """
+        Returns the material positions under active contract for a vendor on a date.
+
+        Args:
+            lifnr (str): Vendor ID.
+            date (numpy.datetime64 or datetime.date): The date to check.
+
+        Returns:
+            numpy.ndarray: Material positions (into MARA) with an active contract.
+        """
+        return self.material_pos[self.active_contracts(lifnr, date)]
+
+    def find_active_contract(self, lifnr, material_pos, date):
+        """
+        Finds the first active contract for a vendor-material combination on a date.
+
+        Args:
+            lifnr (str): Vendor ID.
+            material_pos (int): Material position in MARA.
+            date (numpy.datetime64 or datetime.date): The date to check.
+
+        Returns:
+            int: Position into the index arrays, or -1 if there is no active contract.
+        """
+        active = self.active_contracts(lifnr, date)
+        matches = active[self.material_pos[active] == material_pos]
+        return matches[0] if len(matches) else -1
+
+    def find_active_contracts(self, lifnrs, material_pos, dates):
+        """
+        Vectorized find_active_contract for arrays of vendors, materials and dates.
+
+        Args:
+            lifnrs (array-like): Vendor IDs.
+            material_pos (numpy.ndarray): Material positions in MARA.
+            dates (numpy.ndarray): datetime64[D] dates to check.
+
+        Returns:
+            numpy.ndarray: Positions into the index arrays, -1 where there is no active contract.
+        """
+        vendor_codes = self.vendors.get_indexer(lifnrs)
+        keys = vendor_codes.astype(np.int64) * self.num_materials + material_pos
+        keys[vendor_codes < 0] = -1
+        first = np.searchsorted(self.pair_keys, keys, side='left')
+        count = np.searchsorted(self.pair_keys, keys, side='right') - first
+
+        found = np.full(len(keys), -1, dtype=np.int64)
+        # Vendor-material pairs rarely have more than one contract, so this loop usually runs once
+        for offset in range(self.max_contracts_per_pair):
+            candidate = np.flatnonzero((count > offset) & (found < 0))
+            pos = self.pair_order[first[candidate] + offset]
+            is_active = (self.valid_from[pos] <= dates[candidate]) & (self.valid_to[pos] >= dates[candidate])
+            found[candidate[is_active]] = pos[is_active]
+        return found
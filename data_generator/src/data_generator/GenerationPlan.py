@@ -0,0 +1,127 @@
+import logging
+import numpy as np
+from src.data_generator.utilities import log_normal_ints, sample_without_replacement
+
+
+# Probability that a goods receipt is followed by an invoice receipt
+INVOICE_PROBABILITY = 0.9
+# Maximum number of goods receipts a line item is split into
+MAX_GR_SPLITS = 3
+
+
+class GenerationPlan:
+    """
+    Row counts of EKPO and EKBE, drawn up front for every PO header and line item.
+
+    The plan fixes how many line items each PO gets (at least one, summing exactly to the
+    line item target), each line item's quantity, how many goods receipts it is split into
+    and which of them get an invoice. EKBE rows are cut at the history target, so the last
+    line items may keep only part of their history or none of it. Prefix sums of the counts
+    give the position at which every PO starts in EKPO and every line item starts in EKBE,
+    so the engines need no target checks and the size of each table is known beforehand.
+
+    Args:
+        line_counts (numpy.ndarray): Number of line items per PO header.
+        quantities (numpy.ndarray): Ordered quantity (MENGE) per line item.
+        gr_counts (numpy.ndarray): Number of goods receipts per line item (1 to MAX_GR_SPLITS).
+        invoice_flags (numpy.ndarray): (line items, MAX_GR_SPLITS) booleans, True where a goods receipt gets an invoice.
+        history_target (int): Maximum number of EKBE rows.
+    """
+
+    def __init__(self, line_counts, quantities, gr_counts, invoice_flags, history_target):
+        self.line_counts = np.asarray(line_counts, dtype=np.int64)
+        self.line_offsets = np.concatenate(([0], np.cumsum(self.line_counts)))
+        self.quantities = np.asarray(quantities, dtype=np.int64)
+        self.gr_counts = np.asarray(gr_counts, dtype=np.int64)
+        self.invoice_flags = np.asarray(invoice_flags, dtype=bool) & (np.arange(MAX_GR_SPLITS) < self.gr_counts[:, None])
+
+        # Each goods receipt is followed by its invoice; the history target cuts the rows in that order
+        full_history = self.gr_counts + self.invoice_flags.sum(axis=1)
+        history_before = np.cumsum(full_history) - full_history
+        self.history_counts = np.clip(history_target - history_before, 0, full_history)
+        self.history_offsets = np.concatenate(([0], np.cumsum(self.history_counts)))
+
+    @property
+    def num_po_headers(self):
+        return len(self.line_counts)
+
+    @property
+    def num_line_items(self):
+        return int(self.line_offsets[-1])
+
+    @property
+    def num_history_rows(self):
+        return int(self.history_offsets[-1])
+
+    def line_range(self, po_start, po_stop):
+        """Returns the (start, stop) positions in EKPO of the line items of PO headers po_start to po_stop."""
+        return int(self.line_offsets[po_start]), int(self.line_offsets[po_stop])
+
+    def lines_per_block(self, po_headers_per_block):
+        """Returns the number of line items of each consecutive block of `po_headers_per_block` PO headers."""
+        bounds = np.append(np.arange(0, self.num_po_headers, po_headers_per_block), self.num_po_headers)
+        return np.diff(self.line_offsets[bounds])
+
+    @classmethod
+    def draw(cls, config, rng=None):
+        """
+        Draws the plan of a run (or of a shard) from its configuration.
+
+        Args:
+            config (Config): The configuration with NUM_PO_HEADERS, NUM_PO_LINE_ITEMS_TARGET,
+                             NUM_PO_HISTORY_TARGET, LINE_ITEMS_PER_PO_MEAN and LINE_ITEMS_PER_PO_MAX.
+            rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+        Returns:
+            GenerationPlan: The plan.
+        """
+        rng = np.random if rng is None else rng
+        num_pos = config.NUM_PO_HEADERS
+        max_lines = config.LINE_ITEMS_PER_PO_MAX
+        line_target = int(np.clip(config.NUM_PO_LINE_ITEMS_TARGET, num_pos, num_pos * max_lines))
+        if line_target != config.NUM_PO_LINE_ITEMS_TARGET:
+            logging.warning(f"NUM_PO_LINE_ITEMS_TARGET {config.NUM_PO_LINE_ITEMS_TARGET} cannot be reached with 1 to "
+                            f"{max_lines} line items for each of {num_pos} POs. Planning {line_target} line items.")
+
+        line_counts = log_normal_ints(config.LINE_ITEMS_PER_PO_MEAN, num_pos, std_dev_factor=0.5,
+                                      min_val=1, max_val=max_lines, rng=rng)
+        line_counts = adjust_to_total(line_counts, line_target, 1, max_lines, rng=rng)
+
+        quantities = rng.randint(1, 1001, line_target)
+        # Items with fewer units than splits get one split per unit
+        gr_counts = np.minimum(rng.randint(1, MAX_GR_SPLITS + 1, line_target), quantities)
+        invoice_flags = rng.random_sample((line_target, MAX_GR_SPLITS)) < INVOICE_PROBABILITY
+
+        plan = cls(line_counts, quantities, gr_counts, invoice_flags, config.NUM_PO_HISTORY_TARGET)
+        if plan.num_history_rows < config.NUM_PO_HISTORY_TARGET:
+            logging.warning(f"The planned line items produce only {plan.num_history_rows} EKBE records, "
+                            f"fewer than NUM_PO_HISTORY_TARGET {config.NUM_PO_HISTORY_TARGET}.")
+        logging.info(f"Planned {plan.num_line_items} EKPO and {plan.num_history_rows} EKBE records for {num_pos} POs.")
+        return plan
+
+
+def adjust_to_total(counts, total, min_val, max_val, rng=None):
+    """
+    Adds or removes single units at random positions until counts sum to total,
+    keeping every count within [min_val, max_val].
+
+    Each unit that can still be added (or removed) is equally likely to be picked, so
+    counts with more room change more, and the shape of the distribution is kept.
+
+    Args:
+        counts (numpy.ndarray): The drawn counts.
+        total (int): The required sum, between len(counts) * min_val and len(counts) * max_val.
+        min_val (int): The minimum count.
+        max_val (int): The maximum count.
+        rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+    Returns:
+        numpy.ndarray: The adjusted counts.
+    """
+    difference = int(total - counts.sum())
+    if difference == 0:
+        return counts
+    room = (max_val - counts) if difference > 0 else (counts - min_val)
+    units = sample_without_replacement(int(room.sum()), abs(difference), rng=rng)
+    change = np.bincount(np.searchsorted(np.cumsum(room), units, side='right'), minlength=len(counts))
+    return counts + change if difference > 0 else counts - change
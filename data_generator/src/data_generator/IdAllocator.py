@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+
+# Prefix and minimum number of digits of each kind of generated ID
+ID_FORMATS = {
+    'LIFNR': ('V', 7),
+    'MATNR': ('M', 7),
+    'CONTRACT_ID': ('C', 5),
+    'EBELN': ('PO', 10),
+    'GR': ('GR', 5),
+    'INV': ('INV', 5)
+}
+
+# ID columns of each table and the kind of ID they hold. EKBE's BELNR holds GR or INV
+# numbers depending on BEWTP, see IdAllocator.format_ids.
+TABLE_ID_COLUMNS = {
+    'LFA1': {'LIFNR': 'LIFNR'},
+    'MARA': {'MATNR': 'MATNR'},
+    'vendor_contract': {'CONTRACT_ID': 'CONTRACT_ID', 'LIFNR': 'LIFNR', 'MATNR': 'MATNR'},
+    'EKKO': {'EBELN': 'EBELN', 'LIFNR': 'LIFNR'},
+    'EKPO': {'EBELN': 'EBELN', 'MATNR': 'MATNR', 'LIFNR': 'LIFNR'},
+    'EKBE': {'EBELN': 'EBELN'}
+}
+
+
+class IdAllocator:
+    """
+    Hands out document and master data numbers as int64 counters.
+
+    IDs stay integers while tables are generated and are only turned into their string
+    form (e.g. 'V0000042', 'PO0000001234') when a table is written, one column at a time.
+    Every call to allocate or reserve returns a range that no earlier call returned, so
+    shards and later incremental runs that start from the high-water marks never collide.
+
+    Args:
+        formats (dict): ID kind mapped to its (prefix, number of digits), default ID_FORMATS.
+    """
+
+    def __init__(self, formats=None):
+        self.formats = dict(ID_FORMATS if formats is None else formats)
+        self.high_water_marks = {entity: 0 for entity in self.formats} # Last number handed out per ID kind
+
+    def allocate(self, entity, count):
+        """
+        Allocates the next `count` numbers of an ID kind.
+
+        Args:
+            entity (str): The ID kind, e.g. 'LIFNR'.
+            count (int): How many numbers are needed.
+
+        Returns:
+            numpy.ndarray: int64 numbers, consecutive and starting after the high-water mark.
+        """
+        start, stop = self.reserve(entity, count)
+        return np.arange(start, stop, dtype=np.int64)
+
+    def reserve(self, entity, count):
+        """
+        Reserves a range of numbers of an ID kind, e.g. for a shard or a later run.
+
+        Args:
+            entity (str): The ID kind, e.g. 'EBELN'.
+            count (int): The size of the range.
+
+        Returns:
+            tuple: (start, stop) of the reserved numbers, stop excluded.
+        """
+        if count < 0:
+            raise ValueError(f"Cannot reserve a negative number of {entity} IDs.")
+        start = self.high_water_marks[entity] + 1
+        self.high_water_marks[entity] += count
+        return start, start + count
+
+    def high_water_mark(self, entity):
+        """Returns the last number handed out for an ID kind (0 if none)."""
+        return self.high_water_marks[entity]
+
+    def set_high_water_mark(self, entity, number):
+        """Continues an ID kind after `number`, e.g. inside a reserved range or after existing data."""
+        self.high_water_marks[entity] = int(number)
+
+    def advance_past(self, entity, ids):
+        """Raises the high-water mark of an ID kind past IDs (formatted or numbers) that already exist, e.g. in written tables."""
+        numbers = np.asarray(ids) if pd.api.types.is_integer_dtype(ids) else self.parse(entity, ids)
+        if len(numbers):
+            self.high_water_marks[entity] = max(self.high_water_marks[entity], int(numbers.max()))
+
+    def format_id(self, entity, number):
+        """Formats a single number, e.g. format_id('LIFNR', 42) -> 'V0000042'."""
+        prefix, num_digits = self.formats[entity]
+        return prefix + str(number).zfill(num_digits)
+
+    def format(self, entity, numbers):
+        """
+        Formats numbers of an ID kind as strings, vectorized.
+
+        Args:
+            entity (str): The ID kind.
+            numbers (array-like): int numbers.
+
+        Returns:
+            numpy.ndarray: The formatted IDs.
+        """
+        prefix, num_digits = self.formats[entity]
+        return np.char.add(prefix, np.char.zfill(np.asarray(numbers, dtype=np.int64).astype(str), num_digits))
+
+    def parse(self, entity, ids):
+        """
+        Parses formatted IDs back into their numbers (the inverse of format).
+
+        Args:
+            entity (str): The ID kind.
+            ids (array-like): Formatted IDs, e.g. ['V0000001', 'V0000002'].
+
+        Returns:
+            numpy.ndarray: int64 numbers.
+        """
+        prefix, _ = self.formats[entity]
+        return pd.Series(ids, dtype=str).str.slice(len(prefix)).astype(np.int64).to_numpy()
+
+    def format_ids(self, table, df):
+        """
+        Returns a table chunk with its integer ID columns formatted for writing.
+
+        Columns that already hold strings (e.g. from row-by-row generation) are left as
+        they are. The input DataFrame is not modified, so it can still be handed on.
+
+        Args:
+            table (str): The table name, a key of TABLE_ID_COLUMNS.
+            df (pd.DataFrame): The chunk to format.
+
+        Returns:
+            pd.DataFrame: The chunk with formatted ID columns.
+        """
+        formatted = {}
+        for column, entity in TABLE_ID_COLUMNS.get(table, {}).items():
+            if column in df and pd.api.types.is_integer_dtype(df[column]):
+                formatted[column] = self.format(entity, df[column].to_numpy())
+        if table == 'EKBE' and 'BELNR' in df and pd.api.types.is_integer_dtype(df['BELNR']):
+            is_gr = df['BEWTP'].to_numpy() == 'E'
+            belnr = df['BELNR'].to_numpy()
+            formatted['BELNR'] = np.where(is_gr, self.format('GR', belnr), self.format('INV', belnr))
+        return df.assign(**formatted) if formatted else df
+
+    def parse_ids(self, table, df):
+        """
+        Returns a table chunk read from disk with its ID columns parsed back into numbers
+        (the inverse of format_ids; EKBE's BELNR is kept as written).
+
+        Args:
+            table (str): The table name, a key of TABLE_ID_COLUMNS.
+            df (pd.DataFrame): The chunk as read from disk.
+
+        Returns:
+            pd.DataFrame: The chunk with integer ID columns.
+        """
+        parsed = {column: self.parse(entity, df[column])
+                  for column, entity in TABLE_ID_COLUMNS.get(table, {}).items()
+                  if column in df and not pd.api.types.is_integer_dtype(df[column])}
+        return df.assign(**parsed) if parsed else df
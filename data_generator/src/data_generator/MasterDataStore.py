@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+
+class MasterDataStore:
+    """
+    Master data tables stored column by column as .npy files, opened memory-mapped.
+
+    Worker processes receive the store (which only holds its directory) instead of pickled
+    DataFrames and open the columns read-only with mmap, so all workers share the pages of
+    the operating system's file cache and per-worker memory stays flat as master data grows.
+    Numeric, boolean and datetime columns are mapped as they are. Other columns (strings,
+    date objects) are dictionary-encoded: their integer codes are mapped and they are read
+    back as pandas Categoricals whose codes are views on the mapped file.
+
+    Args:
+        directory (str): The directory holding the store's files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def put_table(self, name, df, columns=None):
+        """
+        Writes a table (or some of its columns) to the store.
+
+        Args:
+            name (str): The table name, e.g. 'MARA'.
+            df (pd.DataFrame): The table.
+            columns (list): The columns to store (default: all).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        columns = list(df.columns if columns is None else columns)
+        encoded = {}
+        for column in columns:
+            values = df[column].to_numpy()
+            if values.dtype.kind in 'biufM':
+                np.save(self._path(name, column), values)
+            else:
+                codes, uniques = pd.factorize(df[column])
+                np.save(self._path(name, column), codes.astype(_code_dtype(len(uniques))))
+                np.save(self._path(name, column, 'values'), np.asarray(uniques), allow_pickle=True)
+                encoded[column] = True
+        with open(self._path(name, extension='json'), 'w') as manifest:
+            json.dump({'columns': columns, 'encoded': encoded, 'rows': len(df)}, manifest)
+        logging.debug(f"Stored {len(columns)} columns of {name} in {self.directory}.")
+
+    def put_array(self, name, values):
+        """Writes an array (e.g. material base prices) to the store."""
+        os.makedirs(self.directory, exist_ok=True)
+        np.save(self._path(name), np.asarray(values))
+
+    def get_table(self, name):
+        """
+        Opens a stored table.
+
+        Args:
+            name (str): The table name.
+
+        Returns:
+            pd.DataFrame: The table; its columns are read-only views on the mapped files.
+        """
+        with open(self._path(name, extension='json')) as manifest:
+            layout = json.load(manifest)
+        data = {}
+        for column in layout['columns']:
+            values = np.load(self._path(name, column), mmap_mode='r')
+            if column in layout['encoded']:
+                categories = np.load(self._path(name, column, 'values'), allow_pickle=True)
+                values = pd.Categorical.from_codes(values, categories, validate=False)
+            data[column] = values
+        return pd.DataFrame(data, copy=False)
+
+    def get_array(self, name):
+        """Opens a stored array read-only and memory-mapped."""
+        return np.load(self._path(name), mmap_mode='r')
+
+    def remove(self):
+        """Deletes the store's files."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _path(self, name, column=None, suffix=None, extension='npy'):
+        parts = [name] + [part for part in (column, suffix) if part is not None]
+        return os.path.join(self.directory, f"{'.'.join(parts)}.{extension}")
+
+
+def _code_dtype(num_values):
+    """Returns the integer dtype pandas uses for the codes of a Categorical with num_values categories,
+    so that building the Categorical does not copy the mapped codes."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_values < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
@@ -1,5 +1,6 @@
 from faker import Faker
 import random
+import os
 import sys
 import types
 from pathlib import Path
@@ -7,14 +8,36 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 import pandas as pd
 import numpy as np
 from src.data_generator.config import Config
+from src.data_generator.ContractIndex import ContractIndex
+from src.data_generator.ValuePools import ValuePools
+from src.data_generator.IdAllocator import IdAllocator, TABLE_ID_COLUMNS
+from src.data_generator.GenerationPlan import GenerationPlan
+from src.data_generator.MasterDataStore import MasterDataStore
+from src.data_generator.Checkpoint import Checkpoint, config_hash
+from src.instrumentation.memory import MemoryMonitor, MemoryReport, dataframe_mb, rows_within_budget
+from src.data_generator.progress import ProgressReporter
+from src.instrumentation.profiling import GenerationReport, StageProfiler
+from src.data_generator.rng import RowStreams, get_random_state, seed_global_state
+from src.data_generator.sharding import (
+    SHARDED_TABLES, count_shards, plan_shards, shard_config, part_filename, merge_part_files,
+    append_name, table_files, next_append_increment
+)
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import  datetime 
-from collections import defaultdict
+from functools import partial
+import contextlib
+import gc
+import itertools
 import logging
+import time
 from src.data_generator.utilities import (
-    get_random_date, get_random_date_in_range, weighted_choice,
-     calculate_net_value,generate_id, save_dataframe, log_normal_int,
-    get_q4_multiplier, get_delivery_delay_days,_validate_configuration_variables,
-    _get_top_vendors_by_weight_lists,save_generator_to_dataframe,read_csv_rows_generator
+    get_random_date, get_random_date_in_range, AliasSampler,
+     calculate_net_value, save_dataframe,
+    get_calendar_sampler, get_delivery_delay_days,_validate_configuration_variables,
+    _get_top_vendors_by_weight_lists,save_generator_to_dataframe,read_csv_rows_generator,read_csv_batches_generator,
+    read_parquet_rows_generator, read_parquet_batches_generator, tee_generator_to_file,
+    get_random_dates, draw_capped_flags, sample_without_replacement, get_delivery_delays,
+    get_random_dates_in_range, calculate_net_values, regroup_batches
 )
 
 
@@ -31,14 +54,179 @@ class SAPDataGenerator:
         self.ekko_df=None
         self.ekpo_df =None
         self.ekbe_df=None
-        self.material_base_prices = {}
+        self.material_base_prices = np.array([]) # Base price per material, indexed by MARA position
         self.top_vendors = set()
         self.vendor_weights=None
+        self.shard_id = None # Set when generating one shard of the transactional tables
+        self.append_increment = 0 # Number of the appended increment being generated, 0 for a full run
+        self.plan = None # GenerationPlan of EKPO/EKBE, drawn after EKKO
+        self.master_store = None # MasterDataStore the master data was spilled to under MAX_MEMORY_MB
+        self.checkpoint = None # Checkpoint of the run when CHECKPOINT is set or a run is resumed
+        self.memory_monitor = MemoryMonitor(getattr(self.config, 'MAX_MEMORY_MB', None),
+                                            trace=getattr(self.config, 'MEMORY_REPORT', False))
+        self.memory_report = None # MemoryReport of the last generate_SAP_data run
+        self.progress = ProgressReporter.from_config(self.config)
+        self.profiler = StageProfiler(os.path.join(self.config.OUTPUT_DIR, 'profiles')
+                                      if getattr(self.config, 'PROFILE_STAGES', False) else None)
+        self.report = None # GenerationReport of the last generate_SAP_data run
+        self.id_allocator = IdAllocator() # IDs are int64 counters until a table is written
+        self.value_pools = ValuePools(self.config.RANDOM_SEED,
+                                      pool_size=getattr(self.config, 'VALUE_POOL_SIZE', 10000),
+                                      cache_dir=getattr(self.config, 'VALUE_POOL_CACHE_DIR', None))
         
         Faker.seed(self.config.RANDOM_SEED)
         random.seed(self.config.RANDOM_SEED)
         np.random.seed(self.config.RANDOM_SEED)
 
+    def _stream_block(self):
+        """Returns the block whose random streams are used: the shard being generated, 0 otherwise."""
+        return 0 if self.shard_id is None else self.shard_id
+
+    def _rng(self, table, sub_block=None):
+        """Returns the random stream of a table (and of the shard, increment and sub-block being generated), see rng.get_random_state."""
+        return get_random_state(self.config.RANDOM_SEED, table, self._stream_block(), self.append_increment, sub_block)
+
+    def _row_streams(self, table):
+        """Returns the random, np.random and Faker streams of a table generated row by row, see rng.RowStreams."""
+        return RowStreams(self.config.RANDOM_SEED, table, self._stream_block(), self.append_increment)
+
+    def _seed_table(self, table):
+        """Seeds the global random, np.random and Faker state from the table's stream before it is generated."""
+        seed_global_state(self.config.RANDOM_SEED, table, self._stream_block(), self.append_increment)
+
+    def _shard_size(self):
+        """Returns the number of PO headers per shard of the transactional tables."""
+        return getattr(self.config, 'PO_HEADERS_PER_SHARD', 100000)
+
+    def _is_batch_mode(self):
+        """Returns True if tables should be generated column-wise instead of one record at a time."""
+        return getattr(self.config, 'GENERATION_MODE', 'row') == 'batch'
+
+    def _batch_size(self):
+        """
+        Returns the number of records generated, read or buffered for writing per batch:
+        GENERATION_BATCH_SIZE, lowered so that a batch fits into a share of MAX_MEMORY_MB.
+        """
+        batch_size = getattr(self.config, 'GENERATION_BATCH_SIZE', 10000)
+        max_memory_mb = self._max_memory_mb()
+        if max_memory_mb is not None:
+            batch_size = min(batch_size, rows_within_budget(max_memory_mb, BATCH_BYTES_PER_ROW))
+        return batch_size
+
+    def _max_memory_mb(self):
+        """Returns the memory budget in MB (MAX_MEMORY_MB), or None if generation is not memory-budgeted."""
+        return getattr(self.config, 'MAX_MEMORY_MB', None)
+
+    def _table_name(self, table):
+        """Returns the name a table is written under: the table itself, or its increment in an append run."""
+        return table if self.append_increment == 0 else append_name(table, self.append_increment)
+
+    def _table_filename(self, table):
+        """Returns the output file name of a table, a part file when generating a shard."""
+        if self.shard_id is None:
+            return f"{self._table_name(table)}.{self.config.OUTPUT_FORMAT}"
+        return part_filename(self._table_name(table), self.shard_id, self.config.OUTPUT_FORMAT)
+
+    def _read_file_batches(self, filepath, columns=None):
+        """Reads some columns of an output file in batches, as written (IDs formatted, CSV values as strings)."""
+        if self.config.OUTPUT_FORMAT == "parquet":
+            return read_parquet_batches_generator(filepath, self._batch_size(), columns=columns)
+        return read_csv_batches_generator(filepath, self._batch_size(), columns=columns)
+
+    def _save_table(self, df, table):
+        """Saves a complete table in the configured output format."""
+        with self.profiler.phase(f"{table} write"):
+            save_dataframe(self.id_allocator.format_ids(table, df), self._table_filename(table), self.config.OUTPUT_DIR,
+                           self.config.OUTPUT_FORMAT, compression=getattr(self.config, 'PARQUET_COMPRESSION', 'snappy'))
+        self.profiler.add_rows(len(df))
+        self.progress.update(table, len(df), os.path.getsize(os.path.join(self.config.OUTPUT_DIR, self._table_filename(table))))
+
+    def _save_table_from_generator(self, generator_func, table):
+        """Streams a table from a generator function to the configured output format."""
+        save_generator_to_dataframe(generator_func, self._table_filename(table), self.config.OUTPUT_DIR, self.config.OUTPUT_FORMAT,
+                                    chunk_size=self._batch_size(),
+                                    row_group_size=getattr(self.config, 'PARQUET_ROW_GROUP_SIZE', None),
+                                    compression=getattr(self.config, 'PARQUET_COMPRESSION', 'snappy'),
+                                    transform=partial(self.id_allocator.format_ids, table),
+                                    on_chunk=partial(self._on_chunk_written, table))
+
+    def _is_in_process_handoff(self):
+        """Returns True if each stage feeds its records straight to the next one instead of re-reading its file."""
+        return getattr(self.config, 'IN_PROCESS_HANDOFF', False)
+
+    def _tee_table(self, generator_func, table):
+        """Returns a generator over a stage's records that writes them to the table's file as they pass."""
+        return tee_generator_to_file(generator_func(), self._table_filename(table), self.config.OUTPUT_DIR, self.config.OUTPUT_FORMAT,
+                                     chunk_size=self._batch_size(),
+                                     row_group_size=getattr(self.config, 'PARQUET_ROW_GROUP_SIZE', None),
+                                     compression=getattr(self.config, 'PARQUET_COMPRESSION', 'snappy'),
+                                     transform=partial(self.id_allocator.format_ids, table),
+                                     on_chunk=partial(self._on_chunk_written, table))
+
+    def _on_chunk_written(self, table, rows, bytes_written, wall_seconds, cpu_seconds):
+        """Reports a chunk a writer wrote to the table's progress tracker and to the profiler's '<table> write' phase."""
+        self.progress.update(table, rows, bytes_written)
+        self.profiler.add_rows(rows)
+        self.profiler.add_phase(f"{table} write", wall_seconds, cpu_seconds)
+
+    @contextlib.contextmanager
+    def _stage(self, name, tables=()):
+        """
+        Context manager around a generation stage: times it, records its peak memory and tracks
+        the progress of the tables it writes against their planned row counts (see _planned_rows).
+        """
+        with self.profiler.stage(name), self.memory_monitor.stage(name), contextlib.ExitStack() as trackers:
+            for table in tables:
+                trackers.enter_context(self.progress.stage(table, self._planned_rows(table)))
+            yield
+
+    def _planned_rows(self, table):
+        """Returns the number of rows a table is planned to get, or None if it is only known once generated."""
+        if table == 'LFA1':
+            return self.config.NUM_VENDORS
+        if table == 'MARA':
+            return self.config.NUM_MATERIALS
+        if table == 'EKKO':
+            return self.config.NUM_PO_HEADERS
+        if table == 'EKPO':
+            return self._generation_plan().num_line_items
+        if table == 'EKBE':
+            return self._generation_plan().num_history_rows
+        return None
+
+    def _iter_table(self, df):
+        """Hands a table that is already in memory to the next stage, in batches or as rows like _read_table."""
+        if self._is_batch_mode():
+            for start in range(0, len(df), self._batch_size()):
+                yield df.iloc[start:start + self._batch_size()]
+        else:
+            yield from df.to_dict('records')
+
+    def _read_table(self, table, batches=None):
+        """
+        Reads a saved table back for the next generation stage.
+
+        Args:
+        table - Table name (e.g. 'EKKO')
+        batches - True to read DataFrame batches, False for one dictionary per row (default: batch mode)
+
+        Returns:
+        Generator over the table's batches or rows
+        """
+        if batches is None:
+            batches = self._is_batch_mode()
+        filepath = f"{self.config.OUTPUT_DIR}/{self._table_filename(table)}"
+        if not batches:
+            if self.config.OUTPUT_FORMAT == "parquet":
+                return read_parquet_rows_generator(filepath, self._batch_size())
+            return read_csv_rows_generator(filepath)
+
+        if self.config.OUTPUT_FORMAT == "parquet":
+            reader = read_parquet_batches_generator(filepath, self._batch_size())
+        else:
+            reader = read_csv_batches_generator(filepath, self._batch_size())
+        # Batch-mode stages work with integer IDs
+        return (self.id_allocator.parse_ids(table, batch) for batch in reader)
 
 
     def _calculate_vendor_weights(self ):
@@ -87,8 +275,8 @@ class SAPDataGenerator:
         Raises:
         ValueError: If df is empty or missing required columns
         """
+        self._seed_table('LFA1')
         logging.info("Starting LFA1 (Vendor Master) data generation.")
-        last_id = None
         vendor_data = []
         is_blocked_count = 0
         is_prefered_count = 0
@@ -98,58 +286,108 @@ class SAPDataGenerator:
             _validate_configuration_variables(self,key_name='VENDOR_BLOCKED_PERCENTAGE',type=float,max_val=1)
             _validate_configuration_variables(self,key_name='VENDOR_PREFERRED_PERCENTAGE',type=float,max_val=1)
            
-            
-            for i in range(self.config.NUM_VENDORS):
-                blocked_ind = " "
-
-                # Generate unique vendor ID
-                vendor_ID = generate_id("V", last_id, 7)
-
-                # Determine if vendor is blocked
-                # Ensure blocked count does not exceed the configured percentage
-                if (random.random() < self.config.VENDOR_BLOCKED_PERCENTAGE) and (is_blocked_count < (self.config.VENDOR_BLOCKED_PERCENTAGE * self.config.NUM_VENDORS)):
-                    blocked_ind = "X"
-                    is_blocked_count += 1
+            if self._is_batch_mode():
+                self.lfa1_df = self._generate_lfa1_batch()
+                is_blocked_count = int((self.lfa1_df['SPERR'] == 'X').sum())
+                is_prefered_count = int(self.lfa1_df['IS_PREFERRED'].sum())
+            else:
+                vendor_numbers = self.id_allocator.allocate('LIFNR', self.config.NUM_VENDORS)
+                for i in range(self.config.NUM_VENDORS):
+                    blocked_ind = " "
+
+                    # Generate unique vendor ID
+                    vendor_ID = self.id_allocator.format_id('LIFNR', vendor_numbers[i])
+
+                    # Determine if vendor is blocked
+                    # Ensure blocked count does not exceed the configured percentage
+                    if (random.random() < self.config.VENDOR_BLOCKED_PERCENTAGE) and (is_blocked_count < (self.config.VENDOR_BLOCKED_PERCENTAGE * self.config.NUM_VENDORS)):
+                        blocked_ind = "X"
+                        is_blocked_count += 1
                     
 
-                is_prefered = False
-                # Determine if vendor is preferred
-                # Ensure preferred count does not exceed the configured percentage
-                if (random.random() < self.config.VENDOR_PREFERRED_PERCENTAGE) and (is_prefered_count < (self.config.VENDOR_PREFERRED_PERCENTAGE * self.config.NUM_VENDORS)):
-                    is_prefered = True
-                    is_prefered_count += 1
+                    is_prefered = False
+                    # Determine if vendor is preferred
+                    # Ensure preferred count does not exceed the configured percentage
+                    if (random.random() < self.config.VENDOR_PREFERRED_PERCENTAGE) and (is_prefered_count < (self.config.VENDOR_PREFERRED_PERCENTAGE * self.config.NUM_VENDORS)):
+                        is_prefered = True
+                        is_prefered_count += 1
                     
 
-                last_id = vendor_ID
-                
-                vendor_data.append({
-                    'LIFNR': vendor_ID,
-                    'NAME1': self.fake.company(),
-                    'LAND1': self.fake.country_code(),
-                    'ORT01': self.fake.city(),
-                    'KTOKK': random.choice(self.config.VENDOR_TYPES),
-                    'ERDAT': get_random_date(self.config.START_DATE, self.config.END_DATE),
-                    'STRAS': self.fake.street_address(),
-                    'SMTP_ADDR': self.fake.email(),
-                    'SPERR': blocked_ind,
-                    'IS_PREFERRED': is_prefered,
-                })
-                
+                    vendor_data.append({
+                        'LIFNR': vendor_ID,
+                        'NAME1': self.fake.company(),
+                        'LAND1': self.fake.country_code(),
+                        'ORT01': self.fake.city(),
+                        'KTOKK': random.choice(self.config.VENDOR_TYPES),
+                        'ERDAT': get_random_date(self.config.START_DATE, self.config.END_DATE),
+                        'STRAS': self.fake.street_address(),
+                        'SMTP_ADDR': self.fake.email(),
+                        'SPERR': blocked_ind,
+                        'IS_PREFERRED': is_prefered,
+                    })
+
+                self.lfa1_df = pd.DataFrame(vendor_data)
 
-            self.lfa1_df = pd.DataFrame(vendor_data)
             self.top_vendors=_get_top_vendors_by_weight_lists(self.lfa1_df['LIFNR'] , self.vendor_weights, .20)
             
             logging.info(f"Generated {len(self.lfa1_df)} vendor records.")
             logging.info(f"Blocked vendors: {is_blocked_count}, Preferred vendors: {is_prefered_count}")
 
-            save_dataframe(self.lfa1_df[['LIFNR','NAME1','LAND1','ORT01','KTOKK','ERDAT','STRAS','SMTP_ADDR','SPERR']], "LFA1.csv", self.config.OUTPUT_DIR, self.config.OUTPUT_FORMAT)
+            self._save_table(self.lfa1_df[['LIFNR','NAME1','LAND1','ORT01','KTOKK','ERDAT','STRAS','SMTP_ADDR','SPERR']], 'LFA1')
             logging.info(f"LFA1 data successfully saved to {self.config.OUTPUT_DIR}/vendors.csv in {self.config.OUTPUT_FORMAT} format.")
             return self.lfa1_df
         except Exception as e:
             logging.error(f"An error occurred during LFA1 data generation: {e}", exc_info=True)
             self.lfa1_df = pd.DataFrame() # Ensure lfa1_df is an empty DataFrame on error
+
+    def _generate_lfa1_batch(self):
+        """
+        Generates the LFA1 (Vendor Master) records column-wise.
+
+        Flags, account groups, creation dates and IDs are drawn as NumPy arrays in one go,
+        keeping the blocked/preferred caps and distributions of the row-wise loop. Names,
+        addresses and emails are drawn from pre-generated Faker value pools.
+        Args:
+        self - SAPDataGenerator instance
+
+        Returns:
+        DataFrame containing LFA1 data
+        """
+        num_vendors = self.config.NUM_VENDORS
+        blocked = draw_capped_flags(num_vendors, self.config.VENDOR_BLOCKED_PERCENTAGE,
+                                    self.config.VENDOR_BLOCKED_PERCENTAGE * num_vendors)
+        preferred = draw_capped_flags(num_vendors, self.config.VENDOR_PREFERRED_PERCENTAGE,
+                                      self.config.VENDOR_PREFERRED_PERCENTAGE * num_vendors)
+
+        return pd.DataFrame({
+            'LIFNR': self.id_allocator.allocate('LIFNR', num_vendors),
+            'NAME1': self._draw_vendor_values('NAME1', 'company', num_vendors),
+            'LAND1': self._draw_vendor_values('LAND1', 'country_code', num_vendors),
+            'ORT01': self._draw_vendor_values('ORT01', 'city', num_vendors),
+            'KTOKK': np.random.choice(self.config.VENDOR_TYPES, size=num_vendors),
+            'ERDAT': get_random_dates(self.config.START_DATE, self.config.END_DATE, num_vendors),
+            'STRAS': self._draw_vendor_values('STRAS', 'street_address', num_vendors),
+            'SMTP_ADDR': self._draw_vendor_values('SMTP_ADDR', 'email', num_vendors),
+            'SPERR': np.where(blocked, "X", " "),
+            'IS_PREFERRED': preferred,
+        })
         
         
+    def _draw_vendor_values(self, column, field, size):
+        """
+        Draws LFA1 column values from the Faker value pool of a field.
+        Args:
+        column - LFA1 column; columns listed in config VENDOR_UNIQUE_FIELDS get distinct values
+        field - Faker provider method, e.g. 'company'
+        size - Number of values to draw
+
+        Returns:
+        numpy.ndarray of values
+        """
+        if column in getattr(self.config, 'VENDOR_UNIQUE_FIELDS', []):
+            return self.value_pools.draw_unique(field, size)
+        return self.value_pools.draw(field, size)
+
     def generate_mara(self):
         """
         Genaratetes MARA (Material Master) data based on the provided configuration.
@@ -162,9 +400,9 @@ class SAPDataGenerator:
         Raises:
         ValueError: If df is empty or missing required columns
         """
+        self._seed_table('MARA')
         logging.info("Starting MARA (Material Master) data generation.")
         material_data = []
-        last_id = None
 
         try:
             _validate_configuration_variables(self,key_name='NUM_MATERIALS',type=int,min_val=1)
@@ -173,60 +411,121 @@ class SAPDataGenerator:
             _validate_configuration_variables(self,key_name='MATERIAL_GROUPS',type=dict)
             
 
-            for i in range(self.config.NUM_MATERIALS):
-                mat_id = generate_id("M", last_id, 7)
-                last_id = mat_id
-
-                mat_group = random.choices(list(self.config.MATERIAL_GROUPS.keys()),k=1)[0]
-                mat_desc = random.choice(self.config.MATERIAL_GROUPS[mat_group]["Description"])
-                mat_type = random.choice(self.config.MATERIAL_TYPES)
-                mat_ut_mes = random.choice(self.config.UNITS_OF_MEASURE)
-
-                # Determine material weight based on unit of measure
-                mat_wt = 0.0
-                if mat_ut_mes == 'KG':
-                    mat_wt = round(random.uniform(0.1, 100.0), 2)
-                elif mat_ut_mes == 'M':
-                    mat_wt = round(random.uniform(0.01, 5.0), 2)
-                elif mat_ut_mes == 'PC' or mat_ut_mes == 'EA':
-                    mat_wt = round(random.uniform(0.001, 50.0), 3)
-                else:  # Default for others
-                    mat_wt = round(random.uniform(0.05, 20.0), 2)
-
-                # Calculate net weight by applying a random tare percentage
-                tare_percentage = random.uniform(0.01, 0.10)
-                mat_net_wt = round(mat_wt * (1 - tare_percentage), 3)
-                if mat_net_wt < 0:
-                    mat_net_wt = 0  # Ensure net weight is not negative
-
-                # Assign base price based on material group's price range
-                price_range = self.config.MATERIAL_GROUPS[mat_group]['price_range']
-                base_price = round(random.uniform(price_range[0], price_range[1]), 2)
-                self.material_base_prices[mat_id] = base_price # Store base price for this material
-
-                material_data.append({
-                    'MATNR': mat_id,
-                    'MAKTX': mat_desc,
-                    'MTART': mat_type,
-                    'MATKL': mat_group,
-                    'MEINS': mat_ut_mes,
-                    'ERSDA': get_random_date(self.config.START_DATE, self.config.END_DATE),
-                    'BRGEW': mat_wt,
-                    'NTGEW': mat_net_wt,
-                    'BASE_PRICE': base_price,
-                })
-                
+            if self._is_batch_mode():
+                self.mara_df, self.material_base_prices = self._generate_mara_batch()
+            else:
+                self.material_base_prices = np.zeros(self.config.NUM_MATERIALS)
+                material_group_sampler = self._material_group_sampler()
+                material_numbers = self.id_allocator.allocate('MATNR', self.config.NUM_MATERIALS)
+                for i in range(self.config.NUM_MATERIALS):
+                    mat_id = self.id_allocator.format_id('MATNR', material_numbers[i])
+
+                    mat_group = material_group_sampler.sample()
+                    mat_desc = random.choice(self.config.MATERIAL_GROUPS[mat_group]["Description"])
+                    mat_type = random.choice(self.config.MATERIAL_TYPES)
+                    mat_ut_mes = random.choice(self.config.UNITS_OF_MEASURE)
+
+                    # Determine material weight based on unit of measure
+                    mat_wt = 0.0
+                    if mat_ut_mes == 'KG':
+                        mat_wt = round(random.uniform(0.1, 100.0), 2)
+                    elif mat_ut_mes == 'M':
+                        mat_wt = round(random.uniform(0.01, 5.0), 2)
+                    elif mat_ut_mes == 'PC' or mat_ut_mes == 'EA':
+                        mat_wt = round(random.uniform(0.001, 50.0), 3)
+                    else:  # Default for others
+                        mat_wt = round(random.uniform(0.05, 20.0), 2)
+
+                    # Calculate net weight by applying a random tare percentage
+                    tare_percentage = random.uniform(0.01, 0.10)
+                    mat_net_wt = round(mat_wt * (1 - tare_percentage), 3)
+                    if mat_net_wt < 0:
+                        mat_net_wt = 0  # Ensure net weight is not negative
+
+                    # Assign base price based on material group's price range
+                    price_range = self.config.MATERIAL_GROUPS[mat_group]['price_range']
+                    base_price = round(random.uniform(price_range[0], price_range[1]), 2)
+                    self.material_base_prices[i] = base_price # Store base price at this material's position
+
+                    material_data.append({
+                        'MATNR': mat_id,
+                        'MAKTX': mat_desc,
+                        'MTART': mat_type,
+                        'MATKL': mat_group,
+                        'MEINS': mat_ut_mes,
+                        'ERSDA': get_random_date(self.config.START_DATE, self.config.END_DATE),
+                        'BRGEW': mat_wt,
+                        'NTGEW': mat_net_wt,
+                        'BASE_PRICE': base_price,
+                    })
+                self.mara_df = pd.DataFrame(material_data)
 
-            self.mara_df = pd.DataFrame(material_data)
             logging.info(f"Generated {len(self.mara_df)} material records.")
 
-            save_dataframe(self.mara_df, "MARA.csv", self.config.OUTPUT_DIR, self.config.OUTPUT_FORMAT)
+            self._save_table(self.mara_df, 'MARA')
             logging.info(f"MARA data successfully saved to {self.config.OUTPUT_DIR}/MARA.csv in {self.config.OUTPUT_FORMAT} format.")
             return self.mara_df
 
         except Exception as e:
             logging.error(f"An error occurred during MARA data generation: {e}", exc_info=True)
             self.mara_df = pd.DataFrame() # Ensure mara_df is an empty DataFrame on error
+
+    def _generate_mara_batch(self):
+        """
+        Generates the MARA (Material Master) records column-wise.
+
+        Material groups (weighted by their 'count' share), descriptions, types and units of measure are sampled as arrays,
+        weights are drawn with one masked uniform draw per unit-of-measure branch and
+        base prices are looked up from the MATERIAL_GROUPS price ranges by group index.
+        Args:
+        self - SAPDataGenerator instance
+
+        Returns:
+        tuple: (DataFrame containing MARA data, array of base prices indexed by material position)
+        """
+        num_materials = self.config.NUM_MATERIALS
+        groups = list(self.config.MATERIAL_GROUPS.keys())
+
+        group_idx = self._material_group_sampler().sample_indices(num_materials)
+        mat_desc = np.empty(num_materials, dtype=object)
+        for g, mat_group in enumerate(groups):
+            mask = group_idx == g
+            mat_desc[mask] = np.random.choice(self.config.MATERIAL_GROUPS[mat_group]["Description"], size=mask.sum())
+        mat_type = np.random.choice(self.config.MATERIAL_TYPES, size=num_materials)
+        mat_ut_mes = np.random.choice(self.config.UNITS_OF_MEASURE, size=num_materials)
+
+        # Determine material weight based on unit of measure: (units, low, high, decimals)
+        mat_wt = np.empty(num_materials)
+        is_default_uom = np.ones(num_materials, dtype=bool)
+        for units, low, high, decimals in ((['KG'], 0.1, 100.0, 2),
+                                           (['M'], 0.01, 5.0, 2),
+                                           (['PC', 'EA'], 0.001, 50.0, 3)):
+            mask = np.isin(mat_ut_mes, units)
+            mat_wt[mask] = np.round(np.random.uniform(low, high, size=mask.sum()), decimals)
+            is_default_uom &= ~mask
+        # Default for others
+        mat_wt[is_default_uom] = np.round(np.random.uniform(0.05, 20.0, size=is_default_uom.sum()), 2)
+
+        # Calculate net weight by applying a random tare percentage
+        tare_percentage = np.random.uniform(0.01, 0.10, size=num_materials)
+        mat_net_wt = np.maximum(np.round(mat_wt * (1 - tare_percentage), 3), 0)
+
+        # Assign base price based on material group's price range
+        price_ranges = np.array([self.config.MATERIAL_GROUPS[g]['price_range'] for g in groups], dtype=float)
+        base_prices = np.round(np.random.uniform(price_ranges[group_idx, 0], price_ranges[group_idx, 1]), 2)
+
+        mara_df = pd.DataFrame({
+            'MATNR': self.id_allocator.allocate('MATNR', num_materials),
+            'MAKTX': mat_desc,
+            'MTART': mat_type,
+            'MATKL': np.asarray(groups)[group_idx],
+            'MEINS': mat_ut_mes,
+            'ERSDA': get_random_dates(self.config.START_DATE, self.config.END_DATE, num_materials),
+            'BRGEW': mat_wt,
+            'NTGEW': mat_net_wt,
+            'BASE_PRICE': base_prices,
+        })
+        return mara_df, base_prices
        
 
     def generate_vendor_contract(self):
@@ -243,9 +542,8 @@ class SAPDataGenerator:
         ValueError: If df is empty or missing required columns
 
         """
+        self._seed_table('vendor_contract')
         logging.info("Starting Vendor Contract data generation.")
-        contracts = []
-        last_id = None
 
        
         _validate_configuration_variables(self,key_name='CONTRACT_COVERAGE_PERCENTAGE',type=tuple,num_type=float,max_val=1)
@@ -256,6 +554,7 @@ class SAPDataGenerator:
         _validate_configuration_variables(self,key_name='START_DATE',type=datetime.date)
         _validate_configuration_variables(self,key_name='END_DATE',type=datetime.date)
         _validate_configuration_variables(self,key_name='CONTRACT_TYPES',type=list,num_type=str)
+        _validate_configuration_variables(self,key_name='NUM_VENDORS_CONTRACTS_TARGET',type=int,min_val=1)
         
         
         
@@ -266,88 +565,89 @@ class SAPDataGenerator:
 
         try:
             # Filter for active vendors (not blocked)
-            active_vendors = self.lfa1_df[self.lfa1_df['SPERR'] != 'X']['LIFNR'].tolist()
-            if not active_vendors:
+            active_vendors = self.lfa1_df.loc[self.lfa1_df['SPERR'] != 'X', 'LIFNR'].to_numpy()
+            if len(active_vendors) == 0:
                 logging.warning("No active vendors found to create contracts. Skipping contract generation.")
                 self.contract_df = pd.DataFrame()
                 return
 
-            material_ids = self.mara_df['MATNR'].tolist()
-            if not material_ids:
+            material_ids = self.mara_df['MATNR'].to_numpy()
+            if len(material_ids) == 0:
                 logging.warning("No materials found to create contracts. Skipping contract generation.")
                 self.contract_df = pd.DataFrame()
                 return
 
-            # Create all possible active vendor-material combinations
-            all_combinations = [(v, m) for v in active_vendors for m in material_ids]
-            logging.debug(f"Total possible vendor-material combinations: {len(all_combinations)}")
+            # Active vendor-material combinations are addressed as flat indices
+            # (vendor_position * num_materials + material_position) and never materialized
+            num_materials = len(material_ids)
+            num_all_combinations = len(active_vendors) * num_materials
+            logging.debug(f"Total possible vendor-material combinations: {num_all_combinations}")
 
             # Determine how many combinations will have contracts
             min_coverage, max_coverage = self.config.CONTRACT_COVERAGE_PERCENTAGE
-            num_combinations_with_contracts = int(len(all_combinations) * random.uniform(min_coverage, max_coverage))
-
-            num_combinations_with_contracts = min(num_combinations_with_contracts, len(all_combinations)) # Cap at total combinations
-            logging.debug(f"Targeting {round(num_combinations_with_contracts/len(all_combinations)*100,2)}% vendor-material combinations for contracts.")
-            expired_contract_num=0
-            # Randomly select combinations for contracts
-            contract_combinations = random.sample(all_combinations, num_combinations_with_contracts)
-            total_num_contracts=0
-            for vendor_id, mat_id in contract_combinations:
-                contract_id = generate_id("C", last_id, 5)
-                last_id = contract_id
-                total_num_contracts+=1
-
-                # Generate valid_from and valid_to dates
-                valid_from = get_random_date(self.config.START_DATE, self.config.END_DATE - datetime.timedelta(days=365))
-                # Ensure valid_to is after valid_from
-                valid_to = valid_from + datetime.timedelta(days=random.randint(*self.config.CONTRACT_VALIDITY_YEARS) * 365)
-                if valid_to < datetime.date.today():
-                    valid_to = datetime.date.today() + datetime.timedelta(days=random.randint(30,150))  # At least 30 days in future
-                
-                # Introduce expired contracts
-                if random.random() < self.config.EXPIRED_CONTRACT_PERCENTAGE and expired_contract_num/min(total_num_contracts,config.NUM_VENDORS_CONTRACTS_TARGET) < self.config.EXPIRED_CONTRACT_PERCENTAGE:
-                    # Set valid_to to a date in the past
-                    valid_to = get_random_date(self.config.START_DATE, datetime.date.today() - datetime.timedelta(days=30))
-                    expired_contract_num+=1
-                    # Ensure valid_from is before valid_to for expired contracts
-                    valid_from = valid_to - datetime.timedelta(days=random.randint(*self.config.CONTRACT_VALIDITY_YEARS) * 365)
-                    # Ensure valid_from is not before the overall START_DATE
-                    if valid_from < datetime.datetime.strptime(str(self.config.START_DATE), '%Y-%m-%d').date():
-                        valid_from = datetime.datetime.strptime(str(self.config.START_DATE), '%Y-%m-%d').date()
-                    
+            num_combinations_with_contracts = int(num_all_combinations * random.uniform(min_coverage, max_coverage))
 
-                volume_commitment = random.randint(*self.config.VOLUME_COMMITMENT_UNITS)
-                contract_type = random.choice(self.config.CONTRACT_TYPES)
+            num_combinations_with_contracts = min(num_combinations_with_contracts, num_all_combinations) # Cap at total combinations
+            logging.debug(f"Targeting {round(num_combinations_with_contracts/num_all_combinations*100,2)}% vendor-material combinations for contracts.")
+            num_contracts = min(num_combinations_with_contracts, self.config.NUM_VENDORS_CONTRACTS_TARGET)
+            if num_contracts == 0:
+                logging.warning("Contract coverage yields no vendor-material combinations. Skipping contract generation.")
+                self.contract_df = pd.DataFrame()
+                return
 
-                # Contract price: 5-15% below market average (material base price)
-                base_price = self.material_base_prices.get(mat_id, 100.0) # Default to 100 if base price not found
-                if base_price == 100.0:
-                    
-                    logging.debug(f"Base price not found for material {mat_id}. Using default 100 for contract price calculation.")
-
-                min_discount, max_discount = self.config.CONTRACT_PRICE_DISCOUNT_PERCENTAGE
-                discount = random.uniform(min_discount, max_discount)
-                contract_price = round(base_price * (1 - discount), 2)
-                if contract_price <= 0: contract_price = round(base_price * 0.01, 2) # Ensure price is positive
-
-                contracts.append({
-                    'CONTRACT_ID': contract_id,
-                    'LIFNR': vendor_id,
-                    'MATNR': mat_id,
-                    'CONTRACT_PRICE': contract_price,
-                    'VALID_FROM': valid_from ,
-                    'VALID_TO': valid_to,
-                    'VOLUME_COMMITMENT': volume_commitment,
-                    'CONTRACT_TYPE': contract_type
-                })
-                if total_num_contracts >=config.NUM_VENDORS_CONTRACTS_TARGET:
-                    break
-                
-            logging.info(f"Generated {round((expired_contract_num/len(contracts))*100,2)}% expired contracts out of {len(contracts)} total contracts.")
+            # Randomly select combinations for contracts and decode them into positions
+            contract_combinations = sample_without_replacement(num_all_combinations, num_contracts)
+            vendor_pos, mat_pos = np.divmod(contract_combinations, num_materials)
+
+            # Generate valid_from and valid_to dates
+            today = np.datetime64(datetime.date.today(), 'D')
+            min_years, max_years = self.config.CONTRACT_VALIDITY_YEARS
+            valid_from = get_random_dates(self.config.START_DATE, self.config.END_DATE - datetime.timedelta(days=365), num_contracts)
+            # Ensure valid_to is after valid_from
+            valid_to = valid_from + np.random.randint(min_years, max_years + 1, size=num_contracts) * 365
+            in_past = valid_to < today
+            valid_to[in_past] = today + np.random.randint(30, 151, size=in_past.sum())  # At least 30 days in future
+
+            # Introduce expired contracts, keeping the running expired share below the configured percentage
+            expired = np.random.random(num_contracts) < self.config.EXPIRED_CONTRACT_PERCENTAGE
+            expired_contract_num = 0
+            for pos in np.flatnonzero(expired):
+                if expired_contract_num / (pos + 1) < self.config.EXPIRED_CONTRACT_PERCENTAGE:
+                    expired_contract_num += 1
+                else:
+                    expired[pos] = False
+            # Set valid_to to a date in the past
+            valid_to[expired] = get_random_dates(self.config.START_DATE, datetime.date.today() - datetime.timedelta(days=30), expired_contract_num)
+            # Ensure valid_from is before valid_to for expired contracts, but not before the overall START_DATE
+            valid_from[expired] = np.maximum(
+                valid_to[expired] - np.random.randint(min_years, max_years + 1, size=expired_contract_num) * 365,
+                np.datetime64(self.config.START_DATE, 'D'))
+
+            volume_commitment = np.random.randint(self.config.VOLUME_COMMITMENT_UNITS[0], self.config.VOLUME_COMMITMENT_UNITS[1] + 1, size=num_contracts)
+            contract_type = np.random.choice(self.config.CONTRACT_TYPES, size=num_contracts)
+
+            # Contract price: 5-15% below market average (material base price)
+            base_price = self.material_base_prices[mat_pos]
+            min_discount, max_discount = self.config.CONTRACT_PRICE_DISCOUNT_PERCENTAGE
+            discount = np.random.uniform(min_discount, max_discount, size=num_contracts)
+            contract_price = np.round(base_price * (1 - discount), 2)
+            contract_price = np.where(contract_price <= 0, np.round(base_price * 0.01, 2), contract_price) # Ensure price is positive
+
+            logging.info(f"Generated {round((expired_contract_num/num_contracts)*100,2)}% expired contracts out of {num_contracts} total contracts.")
+            contracts = {
+                'CONTRACT_ID': self.id_allocator.allocate('CONTRACT_ID', num_contracts),
+                'LIFNR': active_vendors[vendor_pos],
+                'MATNR': material_ids[mat_pos],
+                'CONTRACT_PRICE': contract_price,
+                'VALID_FROM': valid_from,
+                'VALID_TO': valid_to,
+                'VOLUME_COMMITMENT': volume_commitment,
+                'CONTRACT_TYPE': contract_type
+            }
             self.contract_df = pd.DataFrame(contracts)
             logging.info(f"Generated {len(self.contract_df)} vendor contract records.")
 
-            save_dataframe(self.contract_df, "vendor_contract.csv", self.config.OUTPUT_DIR, self.config.OUTPUT_FORMAT)
+            self._save_table(self.contract_df, 'vendor_contract')
             logging.info(f"Vendor Contract data successfully saved to {self.config.OUTPUT_DIR}/vendor_contract.csv in {self.config.OUTPUT_FORMAT} format.")
 
         except Exception as e:
@@ -371,9 +671,10 @@ class SAPDataGenerator:
         ValueError: If df is empty or missing required columns
 
         """
+        self._seed_table('EKKO')
+        self.plan = None # New PO headers need a new plan
         logging.info("Starting EKKO (Purchase Order Headers) data generation.")
         ekko_records = []
-        last_id = None
         _validate_configuration_variables(self,key_name='CONTRACT_PO_PERCENTAGE',type=tuple,num_type=float,max_val=1)
         _validate_configuration_variables(self,key_name='NUM_PO_HEADERS',type=int,min_val=1)
         _validate_configuration_variables(self,key_name='COMPANY_CODES',type=list,num_type=str)
@@ -440,47 +741,49 @@ class SAPDataGenerator:
             
             logging.info(f"Targeting {num_contract_pos} contract POs out of {self.config.NUM_PO_HEADERS} total POs.")
 
-            for i in range(self.config.NUM_PO_HEADERS):
-                ebeln = generate_id('PO', last_id, 10) # Assuming 10-char PO number
-                last_id = ebeln
-
-                bukrs = random.choice(self.config.COMPANY_CODES)
+            po_date_sampler = self._po_date_sampler()
+            vendor_sampler = AliasSampler(active_vendor_lifnrs, active_vendor_weights)
+            if self._is_batch_mode():
+                ekko_df = self._generate_ekko_batch(vendor_sampler, num_contract_pos, po_date_sampler)
+            else:
+                ebeln_numbers = self.id_allocator.allocate('EBELN', self.config.NUM_PO_HEADERS)
+                for i in range(self.config.NUM_PO_HEADERS):
+                    ebeln = self.id_allocator.format_id('EBELN', ebeln_numbers[i])
 
-                bsart = 'NB' if i < num_contract_pos else 'FO'
+                    bukrs = random.choice(self.config.COMPANY_CODES)
 
-                aedat = get_q4_multiplier(self.config.Q4_SPEND_INCREASE_PERCENTAGE,self.config.START_DATE, self.config.END_DATE)
+                    bsart = 'NB' if i < num_contract_pos else 'FO'
 
+                    aedat = po_date_sampler.sample()
 
-                # Select vendor based on Pareto distribution
-                lifnr = weighted_choice(active_vendor_lifnrs, active_vendor_weights)
 
-                waers = random.choice(self.config.CURRENCIES)
-                ekorg = random.choice(self.config.PURCHASING_ORGANIZATIONS)
-                ekgrp = random.choice(self.config.PURCHASING_GROUPS)
-                bedat = aedat # Document date usually same as PO date
+                    # Select vendor based on Pareto distribution
+                    lifnr = vendor_sampler.sample()
 
-                ekko_records.append({
-                    'EBELN': ebeln,
-                    'BUKRS': bukrs,
-                    'BSART': bsart,
-                    'AEDAT': aedat,
-                    'LIFNR': lifnr,
-                    'WAERS': waers,
-                    'EKORG': ekorg,
-                    'EKGRP': ekgrp,
-                    'BEDAT': bedat
-                })
-                logging.debug(f"Generated EKKO record for PO {ebeln} (Vendor: {lifnr}, Type: {bsart}).")
+                    waers = random.choice(self.config.CURRENCIES)
+                    ekorg = random.choice(self.config.PURCHASING_ORGANIZATIONS)
+                    ekgrp = random.choice(self.config.PURCHASING_GROUPS)
+                    bedat = aedat # Document date usually same as PO date
 
+                    ekko_records.append({
+                        'EBELN': ebeln,
+                        'BUKRS': bukrs,
+                        'BSART': bsart,
+                        'AEDAT': aedat,
+                        'LIFNR': lifnr,
+                        'WAERS': waers,
+                        'EKORG': ekorg,
+                        'EKGRP': ekgrp,
+                        'BEDAT': bedat
+                    })
+                    logging.debug(f"Generated EKKO record for PO {ebeln} (Vendor: {lifnr}, Type: {bsart}).")
+
+                ekko_df = pd.DataFrame(ekko_records)
+            logging.info(f"Generated {len(ekko_df)} EKKO (Purchase Order Header) records.")
+            self._save_table(ekko_df, 'EKKO')
+            self.ekko_df=self._iter_table(ekko_df) if self._is_in_process_handoff() else self._read_table('EKKO')
             
-            
-            logging.info(f"Generated {len(ekko_records)} EKKO (Purchase Order Header) records.")
-            
-            
-            save_dataframe(pd.DataFrame(ekko_records), "EKKO.csv", self.config.OUTPUT_DIR, self.config.OUTPUT_FORMAT)
-            self.ekko_df=read_csv_rows_generator(self.config.OUTPUT_DIR + "/EKKO.csv")
-            
-            logging.info(f"EKKO data successfully saved to {self.config.OUTPUT_DIR}/EKKO.csv in {self.config.OUTPUT_FORMAT} format.")
+            logging.info(f"EKKO data successfully saved to {self.config.OUTPUT_DIR}/{self._table_filename('EKKO')} in {self.config.OUTPUT_FORMAT} format.")
 
         except Exception as e:
             logging.error(f"An error occurred during EKKO data generation: {e}", exc_info=True)
@@ -489,6 +792,86 @@ class SAPDataGenerator:
             logging.info("Finished EKKO (Purchase Order Headers) data generation.")
 
 
+    def _material_group_sampler(self):
+        """Returns an AliasSampler over the MATERIAL_GROUPS names, weighted by their 'count' share (equal if missing)."""
+        groups = list(self.config.MATERIAL_GROUPS.keys())
+        return AliasSampler(groups, [self.config.MATERIAL_GROUPS[g].get('count', 1.0) for g in groups])
+
+    def _share_master_data(self):
+        """
+        Writes the master data columns that shard workers read (SHARED_MASTER_COLUMNS) to a
+        MasterDataStore under OUTPUT_DIR, for the workers to memory-map.
+
+        Returns:
+            MasterDataStore: The store; remove it once the workers are done.
+        """
+        store = MasterDataStore(os.path.join(self.config.OUTPUT_DIR, '.master_data'))
+        for table, df in (('LFA1', self.lfa1_df), ('MARA', self.mara_df), ('vendor_contract', self.contract_df)):
+            store.put_table(table, df, SHARED_MASTER_COLUMNS[table])
+        store.put_array('material_base_prices', self.material_base_prices)
+        store.put_array('vendor_weights', self.vendor_weights)
+        logging.info(f"Shared master data with shard workers in {store.directory}.")
+        return store
+
+    def _generation_plan(self):
+        """Returns the GenerationPlan of EKPO/EKBE, drawing it from its own random stream on first use."""
+        if self.plan is None:
+            with self.profiler.phase('generation plan'):
+                self.plan = GenerationPlan.draw(self.config, self._rng('plan'))
+        return self.plan
+
+    def _po_date_sampler(self):
+        """
+        Returns the CalendarSampler of PO dates, built from the seasonal profile settings:
+        Q4_SPEND_INCREASE_PERCENTAGE and the optional MONTH_END_UPLIFT and WEEKDAY_WEIGHTS.
+        """
+        weekday_weights = getattr(self.config, 'WEEKDAY_WEIGHTS', None)
+        return get_calendar_sampler(self.config.START_DATE, self.config.END_DATE,
+                                    q4_increase_percentage=self.config.Q4_SPEND_INCREASE_PERCENTAGE,
+                                    month_end_uplift=getattr(self.config, 'MONTH_END_UPLIFT', 0.0),
+                                    weekday_weights=tuple(weekday_weights) if weekday_weights is not None else None)
+
+    def _generate_ekko_batch(self, vendor_sampler, num_contract_pos, po_date_sampler):
+        """
+        Generates all EKKO records column by column (batch mode).
+
+        Args:
+            vendor_sampler (AliasSampler): Weighted sampler over the LIFNRs of the active vendors.
+            num_contract_pos (int): Number of contract (NB) POs; the first POs get BSART 'NB'.
+            po_date_sampler (CalendarSampler): Sampler of the PO dates.
+
+        Returns:
+            pd.DataFrame: The EKKO records, with integer EBELN and LIFNR.
+        """
+        num_pos = self.config.NUM_PO_HEADERS
+        rng = self._rng('EKKO')
+        aedat = po_date_sampler.sample(num_pos, rng)
+        return pd.DataFrame({
+            'EBELN': self.id_allocator.allocate('EBELN', num_pos),
+            'BUKRS': rng.choice(self.config.COMPANY_CODES, num_pos),
+            'BSART': np.where(np.arange(num_pos) < num_contract_pos, 'NB', 'FO'),
+            'AEDAT': aedat,
+            'LIFNR': vendor_sampler.sample(num_pos, rng),
+            'WAERS': rng.choice(self.config.CURRENCIES, num_pos),
+            'EKORG': rng.choice(self.config.PURCHASING_ORGANIZATIONS, num_pos),
+            'EKGRP': rng.choice(self.config.PURCHASING_GROUPS, num_pos),
+            'BEDAT': aedat # Document date usually same as PO date
+        })
+
+    def _build_contract_index(self):
+        """
+        Builds the per-vendor contract interval index used for EKPO material selection and pricing.
+        Args:
+        self - SAPDataGenerator instance
+
+        Returns:
+        ContractIndex over self.contract_df (empty if there are no contracts)
+        """
+        contract_df = self.contract_df
+        if contract_df is None or contract_df.empty:
+            contract_df = pd.DataFrame({'LIFNR': [], 'MATNR': [], 'CONTRACT_PRICE': [], 'VALID_FROM': [], 'VALID_TO': []})
+        return ContractIndex(contract_df, self.mara_df['MATNR'])
+
     def generate_ekpo(self):
         """
         Generates EKPO (Purchase Order Line Item) data based on existing PO headers (EKKO),
@@ -503,6 +886,7 @@ class SAPDataGenerator:
         ValueError: If df is empty or missing required columns
         
         """
+        streams = self._row_streams('EKPO') # Own streams: under the handoff EKBE draws while EKPO is generated
         logging.info("Starting EKPO (Purchase Order Line Items) data generation.")
         ekpo_records = []
         
@@ -527,76 +911,69 @@ class SAPDataGenerator:
         _validate_configuration_variables(self,key_name='PLANTS',type=list,num_type=str)
 
         try:
-            # Pre-process contracts for quick lookup: (LIFNR, MATNR) -> list of contract rows
-            contract_lookup = defaultdict(list)
-            if not self.contract_df.empty:
-                # Convert date columns to datetime objects for comparison
-                self.contract_df['VALID_FROM'] = pd.to_datetime(self.contract_df['VALID_FROM']).dt.date
-                self.contract_df['VALID_TO'] = pd.to_datetime(self.contract_df['VALID_TO']).dt.date
-                for _, row in self.contract_df.iterrows():
-                    contract_lookup[(row['LIFNR'], row['MATNR'])].append(row)
-            logging.debug(f"Contract lookup table built with {len(contract_lookup)} unique vendor-material combinations.")
+            if self._is_batch_mode():
+                yield from self._generate_ekpo_batch()
+                return
+
+            # Pre-process contracts for quick lookup: LIFNR -> contracts sorted by VALID_FROM
+            with self.profiler.phase('EKPO contract index'):
+                contract_index = self._build_contract_index()
+            logging.debug(f"Contract index built with {len(contract_index)} contracts.")
+            mara_matnr = self.mara_df['MATNR'].to_numpy()
+            mara_matkl = self.mara_df['MATKL'].to_numpy()
+            mara_meins = self.mara_df['MEINS'].to_numpy()
             
             # Pre-process vendor preferred status for quick lookup
             vendor_preferred_lookup = self.lfa1_df.set_index('LIFNR')['IS_PREFERRED'].to_dict()
             logging.debug(f"Vendor preferred status lookup built for {len(vendor_preferred_lookup)} vendors.")
 
+            plan = self._generation_plan()
             line_item_count = 0
-            for  po_header in self.ekko_df:
+            for po_index, po_header in enumerate(self.ekko_df):
                
                 # Convert PO header AEDAT to date object for comparison
-                po_aedat = pd.to_datetime(po_header['AEDAT']).date()
-
-                num_line_items = log_normal_int(
-                    self.config.LINE_ITEMS_PER_PO_MEAN,
-                    std_dev_factor=0.5,
-                    min_val=1,
-                    max_val=self.config.LINE_ITEMS_PER_PO_MAX
-                )
+                po_aedat = np.datetime64(po_header['AEDAT'], 'D')
+
+                # Materials under active contract for this vendor on the PO date (contract POs only)
+                contract_materials = []
+                if po_header['BSART'] == 'NB':
+                    with self.profiler.phase('EKPO contract lookup'):
+                        contract_materials = contract_index.active_materials(po_header['LIFNR'], po_aedat)
+
+                num_line_items = plan.line_counts[po_index]
                 logging.debug(f"PO {po_header['EBELN']} will have {num_line_items} line items.")
 
                 for i in range(num_line_items):
-                    if line_item_count >= self.config.NUM_PO_LINE_ITEMS_TARGET:
-                        logging.info(f"Reached target number of PO line items ({self.config.NUM_PO_LINE_ITEMS_TARGET}). Stopping generation.")
-                        break
-
                     ebeln = po_header['EBELN']
                     ebelp = "LI"+str(i + 1).zfill(5) # Line item number (e.g., 00010, 00020)
 
-                    # Select a material randomly
-                    #matnr_row = self.mara_df.sample(1).iloc[0] # i think this is where i need to see if the PO in Contract or not and then select material accordingly
-                    matnr_list=self.contract_df[(self.contract_df['LIFNR']==po_header['LIFNR']) & (po_header['BSART'] == 'NB') ]
-                    matnr_list=matnr_list[(matnr_list['VALID_FROM'] <= po_aedat) & (matnr_list['VALID_TO'] >= po_aedat) ]['MATNR'].tolist()
-                    
-                    if matnr_list:
-                        matnr_row_id=self.mara_df[self.mara_df['MATNR'].isin(matnr_list)]
-                        matnr_row = matnr_row_id.sample(1).iloc[0]
-                        
+                    # Select a material randomly, from the vendor's active contracts if there are any
+                    if len(contract_materials):
+                        mat_pos = contract_materials[streams.np_random.randint(len(contract_materials))]
                     else:
-                        matnr_row = self.mara_df.sample(1).iloc[0]
+                        mat_pos = streams.np_random.randint(len(mara_matnr))
 
-                    matnr = matnr_row['MATNR']
-                    matkl = matnr_row['MATKL']
-                    meins = matnr_row['MEINS']
+                    matnr = mara_matnr[mat_pos]
+                    matkl = mara_matkl[mat_pos]
+                    meins = mara_meins[mat_pos]
                     
-                    base_price = self.material_base_prices.get(matnr, 100.0)
+                    base_price = self.material_base_prices[mat_pos]
 
                     # Determine unit price based on contract, preferred vendor, and volatility
                     unit_price = base_price
 
                     # Check for active contract
-                    active_contract = None
-                    contracts_for_vm = contract_lookup.get((po_header['LIFNR'], matnr), [])
-                    for contract in contracts_for_vm:
-                        if contract['VALID_FROM'] <= po_aedat <= contract['VALID_TO']:
-                            active_contract = contract
-                            logging.debug(f"Found active contract for {po_header['LIFNR']}-{matnr} for PO {ebeln}.")
-                            break
+                    active_contract_price = None
+                    with self.profiler.phase('EKPO contract lookup'):
+                        contract_pos = contract_index.find_active_contract(po_header['LIFNR'], mat_pos, po_aedat)
+                    if contract_pos >= 0:
+                        active_contract_price = contract_index.contract_price[contract_pos]
+                        logging.debug(f"Found active contract for {po_header['LIFNR']}-{matnr} for PO {ebeln}.")
                     
-                    if active_contract is None:
+                    if active_contract_price is None:
                         logging.debug(f"No active contract for {po_header['LIFNR']}-{matnr} for PO {ebeln}.")
-                    if active_contract is not None and po_header['BSART'] == 'NB': 
-                        unit_price = active_contract['CONTRACT_PRICE']
+                    if active_contract_price is not None and po_header['BSART'] == 'NB': 
+                        unit_price = active_contract_price
                         logging.debug(f"PO {ebeln} (Type FO) uses contract price: {unit_price}.")
                     else: # Non-contract PO (BSART='FO') or no active contract
                         # Apply preferred vendor discount if applicable
@@ -607,28 +984,28 @@ class SAPDataGenerator:
                             logging.debug(f"Applied preferred vendor discount for {po_header['LIFNR']}. New price: {unit_price}. for {matnr}")'''
 
                         # Apply price volatility
-                        volatility_factor = 1 + random.uniform(-self.config.PRICE_VOLATILITY_PERCENTAGE, self.config.PRICE_VOLATILITY_PERCENTAGE)
+                        volatility_factor = 1 + streams.random.uniform(-self.config.PRICE_VOLATILITY_PERCENTAGE, self.config.PRICE_VOLATILITY_PERCENTAGE)
                         unit_price *= volatility_factor
                         logging.debug(f"Applied price volatility. New price: {unit_price}.")
 
                         # If there was an active contract but this is an 'NB' PO (standard PO)
                         # and the price is higher, reflect that variance (off-contract purchase).
                         # This scenario implies a deviation from the contract.
-                        if active_contract is not None and po_header['BSART'] == 'FO' and unit_price < active_contract['CONTRACT_PRICE']:
+                        if active_contract_price is not None and po_header['BSART'] == 'FO' and unit_price < active_contract_price:
                             # Make it higher than contract price to simulate off-contract purchase
-                            unit_price = active_contract['CONTRACT_PRICE'] * random.uniform(1.05, 1.20) # 5-20% higher than contract
-                            logging.debug(f"PO {ebeln} (Type NB) for {matnr} has active contract but price {unit_price} is higher than contract price {active_contract['CONTRACT_PRICE']}. Simulating off-contract purchase.")
+                            unit_price = active_contract_price * streams.random.uniform(1.05, 1.20) # 5-20% higher than contract
+                            logging.debug(f"PO {ebeln} (Type NB) for {matnr} has active contract but price {unit_price} is higher than contract price {active_contract_price}. Simulating off-contract purchase.")
 
                     unit_price = round(unit_price, 2)
                     if unit_price <= 0: unit_price = round(base_price * 0.01, 2) # Ensure price is positive
 
-                    menge = random.randint(1, 1000) # Quantity
+                    menge = int(plan.quantities[line_item_count]) # Quantity
                     netwr = calculate_net_value(menge, unit_price)
 
                     # Expected delivery date: 7-60 days after PO date
-                    eindt = get_random_date_in_range(po_aedat, 7, 60)
+                    eindt = get_random_date_in_range(po_aedat.astype(datetime.date), 7, 60, streams.random)
 
-                    werks = random.choice(self.config.PLANTS)
+                    werks = streams.random.choice(self.config.PLANTS)
                     logging.debug("Why are you writing vendor ID in EKPO?")
                     ekpo_records={
                         'EBELN': ebeln,
@@ -646,8 +1023,6 @@ class SAPDataGenerator:
                     }
                     yield ekpo_records
                     line_item_count += 1
-                if line_item_count >= self.config.NUM_PO_LINE_ITEMS_TARGET:
-                    break
 
             
             logging.info(f"Generated {line_item_count} EKPO (Purchase Order Line Item) records.")
@@ -659,6 +1034,97 @@ class SAPDataGenerator:
             self.ekpo_df = None # Ensure ekpo_df is an empty DataFrame on error
         
     
+    def _generate_ekpo_batch(self):
+        """
+        Column-wise EKPO engine used in batch mode.
+
+        Regroups EKKO into blocks of RANDOM_BLOCK_PO_HEADERS PO headers, each drawn from its own
+        stream so that the batch size does not change the data, and yields one DataFrame of line
+        items per block, so the writer can append it without building per-row dictionaries.
+        Args:
+        self - SAPDataGenerator instance
+
+        Yields:
+        DataFrame containing a batch of EKPO (Purchase Order Line Item) records
+        """
+        with self.profiler.phase('EKPO contract index'):
+            contract_index = self._build_contract_index()
+        logging.debug(f"Contract index built with {len(contract_index)} contracts.")
+        mara_matnr = self.mara_df['MATNR'].to_numpy()
+        mara_matkl = self.mara_df['MATKL'].to_numpy()
+        mara_meins = self.mara_df['MEINS'].to_numpy()
+        volatility = self.config.PRICE_VOLATILITY_PERCENTAGE
+
+        plan = self._generation_plan()
+        line_item_count = 0
+        po_count = 0
+        for block, po_headers in enumerate(regroup_batches(self.ekko_df, itertools.repeat(RANDOM_BLOCK_PO_HEADERS))):
+            rng = self._rng('EKPO', block)
+            num_line_items = plan.line_counts[po_count:po_count + len(po_headers)]
+            first_line, last_line = plan.line_range(po_count, po_count + len(po_headers))
+            po_count += len(po_headers)
+            line_start = np.cumsum(num_line_items) - num_line_items
+            total = int(num_line_items.sum())
+
+            po_pos = np.repeat(np.arange(len(po_headers)), num_line_items)
+            line_number = np.arange(total) - line_start[po_pos] + 1
+            po_aedat = pd.to_datetime(po_headers['AEDAT']).to_numpy().astype('datetime64[D]')
+            po_lifnr = po_headers['LIFNR'].to_numpy()
+            is_contract_po = po_headers['BSART'].to_numpy() == 'NB'
+
+            with self.profiler.phase('EKPO contract lookup'):
+                # Select materials randomly, from the vendor's active contracts for contract POs that have any
+                mat_pos = rng.randint(0, len(mara_matnr), total)
+                for i in np.flatnonzero(is_contract_po & (num_line_items > 0)):
+                    contract_materials = contract_index.active_materials(po_lifnr[i], po_aedat[i])
+                    if len(contract_materials):
+                        lines = slice(line_start[i], line_start[i] + num_line_items[i])
+                        mat_pos[lines] = contract_materials[rng.randint(0, len(contract_materials), num_line_items[i])]
+
+                lifnr = po_lifnr[po_pos]
+                po_date = po_aedat[po_pos]
+                is_contract_line = is_contract_po[po_pos]
+
+                # Contract price where an active contract exists, NaN otherwise
+                contract_pos = contract_index.find_active_contracts(lifnr, mat_pos, po_date)
+                has_contract = contract_pos >= 0
+                contract_price = np.full(total, np.nan)
+                contract_price[has_contract] = contract_index.contract_price[contract_pos[has_contract]]
+
+            with self.profiler.phase('EKPO pricing'):
+                base_price = self.material_base_prices[mat_pos]
+                # Contract POs use the contract price, everything else gets price volatility
+                unit_price = base_price * (1 + rng.uniform(-volatility, volatility, total))
+                uses_contract = has_contract & is_contract_line
+                unit_price[uses_contract] = contract_price[uses_contract]
+                # Off-contract purchase of a contracted material: 5-20% above the contract price
+                off_contract = has_contract & ~is_contract_line & (unit_price < contract_price)
+                unit_price[off_contract] = contract_price[off_contract] * rng.uniform(1.05, 1.20, off_contract.sum())
+
+                unit_price = np.round(unit_price, 2)
+                unit_price = np.where(unit_price <= 0, np.round(base_price * 0.01, 2), unit_price) # Ensure price is positive
+
+                menge = plan.quantities[first_line:last_line] # Quantity
+                netwr = calculate_net_values(menge, unit_price)
+
+            yield pd.DataFrame({
+                'EBELN': po_headers['EBELN'].to_numpy()[po_pos],
+                'EBELP': np.char.add("LI", np.char.zfill(line_number.astype(str), 5)),
+                'MATNR': mara_matnr[mat_pos],
+                'MENGE': menge,
+                'MEINS': mara_meins[mat_pos],
+                'NETPR': unit_price,
+                'NETWR': netwr,
+                'EINDT': get_random_dates_in_range(po_date, 7, 60, rng=rng), # Expected delivery date: 7-60 days after PO date
+                'WERKS': rng.choice(self.config.PLANTS, total),
+                'MATKL': mara_matkl[mat_pos],
+                'LIFNR': lifnr, # For EKBE generation
+                'PO_DATE': po_date # For EKBE generation
+            })
+            line_item_count += total
+
+        logging.info(f"Generated {line_item_count} EKPO (Purchase Order Line Item) records.")
+
     def generate_ekbe(self):
         """
         Generates EKBE (Purchase Order History) data based on existing PO headers (EKKO),
@@ -674,6 +1140,7 @@ class SAPDataGenerator:
         
         
         """
+        streams = self._row_streams('EKBE')
         logging.info("Generating EKBE (PO History)...")
         _validate_configuration_variables(self,key_name='LATE_DELIVERY_PERCENTAGE',type=tuple,num_type=float,max_val=1)
         _validate_configuration_variables(self,key_name='NUM_PO_HISTORY_TARGET',type=int,min_val=1)
@@ -700,23 +1167,27 @@ class SAPDataGenerator:
             return
         
         try:
+            if self._is_batch_mode():
+                yield from self._generate_ekbe_batch()
+                return
+
         # Pre-process vendor performance for delivery delays
             vendor_delivery_performance = {}  # LIFNR -> average_late_rate_multiplier
             active_vendors = self.lfa1_df[self.lfa1_df['SPERR'] != 'X']['LIFNR'].tolist()
             for lifnr in active_vendors:
-                base_late_rate = random.uniform(*self.config.LATE_DELIVERY_PERCENTAGE)
-                performance_factor = 1 + random.uniform(-self.config.VENDOR_PERFORMANCE_VARIATION, self.config.VENDOR_PERFORMANCE_VARIATION)
+                base_late_rate = streams.random.uniform(*self.config.LATE_DELIVERY_PERCENTAGE)
+                performance_factor = 1 + streams.random.uniform(-self.config.VENDOR_PERFORMANCE_VARIATION, self.config.VENDOR_PERFORMANCE_VARIATION)
                 vendor_delivery_performance[lifnr] = max(0, min(1, base_late_rate * performance_factor))
-            
+            default_late_rate = np.mean(self.config.LATE_DELIVERY_PERCENTAGE) # Vendors without a rate use the average
 
+            plan = self._generation_plan()
             ekbe_count = 0
-            gr_id_counter = 0
-            inv_id_counter = 0
             
-            for  po_item in self.ekpo_df:
+            for line_pos, po_item in enumerate(self.ekpo_df):
                 
-                if ekbe_count >= self.config.NUM_PO_HISTORY_TARGET:
+                if ekbe_count >= plan.num_history_rows:
                     break
+                rows_left = plan.history_counts[line_pos] # The history target may cut this item's rows
 
                 ebeln = po_item['EBELN']
                 ebelp = po_item['EBELP']
@@ -727,9 +1198,8 @@ class SAPDataGenerator:
                 netpr_per_unit = po_item['NETPR']
 
                 # --- Determine number of GRs and their quantities (using internal logic) ---
-                # For simplicity, let's say 1 to 3 GR splits for a PO item
-                # More complex logic could be based on total_po_menge (e.g., larger quantities -> more splits)
-                num_gr_splits = random.randint(1, 3) # Fixed internal range for splits
+                # 1 to 3 GR splits for a PO item, drawn in the generation plan
+                num_gr_splits = int(plan.gr_counts[line_pos])
                 
                 gr_quantities = []
                 remaining_menge = int(total_po_menge)
@@ -742,7 +1212,7 @@ class SAPDataGenerator:
                         
                         # Distribute remaining quantity, ensuring at least 1 unit per split
                         # And not taking more than 80% of remaining to leave some for next splits
-                        qty = random.randint(1, max(1, int(int(remaining_menge) * 0.8 / (num_gr_splits - i))))
+                        qty = streams.random.randint(1, max(1, int(int(remaining_menge) * 0.8 / (num_gr_splits - i))))
                         gr_quantities.append(qty)
                         remaining_menge -= qty
                 
@@ -761,19 +1231,21 @@ class SAPDataGenerator:
                 gr_dates = []
                 for i, gr_menge in enumerate(gr_quantities):
                     if gr_menge <= 0: continue # Skip if quantity is zero
+                    if rows_left == 0:
+                        break
                     if type(eindt) is str or type(po_date) is str:
                         eindt=datetime.datetime.strptime(eindt,"%Y-%m-%d")
                         po_date=datetime.datetime.strptime(po_date,"%Y-%m-%d")
                     # Determine if delivery is late
-                    vendor_late_rate = vendor_delivery_performance.get(lifnr, np.mean(self.config.LATE_DELIVERY_PERCENTAGE))
+                    vendor_late_rate = vendor_delivery_performance.get(lifnr, default_late_rate)
                     days_to_delivery = (eindt - po_date).days
                     adjusted_late_rate = vendor_late_rate * (1 - (0.5 * (60 - days_to_delivery) / 53))
                     adjusted_late_rate = max(0, min(1, adjusted_late_rate))
-                    is_late = random.random() < adjusted_late_rate
+                    is_late = streams.random.random() < adjusted_late_rate
 
                     actual_delivery_date = eindt
                     if is_late:
-                        delay_days = get_delivery_delay_days(self.config.DELAY_DISTRIBUTION)
+                        delay_days = get_delivery_delay_days(self.config.DELAY_DISTRIBUTION, streams.random, streams.np_random)
                         actual_delivery_date = eindt + datetime.timedelta(days=delay_days)
                     
                     # Ensure actual delivery date is not before PO date
@@ -785,7 +1257,7 @@ class SAPDataGenerator:
                        # actual_delivery_date = max(actual_delivery_date, gr_dates[-1] + datetime.timedelta(days=random.randint(1, 5)))
                     
                     gr_dates.append(actual_delivery_date)
-                    gr_id_counter += 1
+                    gr_number, _ = self.id_allocator.reserve('GR', 1)
                     
                     ekbe_records ={
                         'EBELN': ebeln,
@@ -794,21 +1266,22 @@ class SAPDataGenerator:
                         'BUDAT': actual_delivery_date,
                         'MENGE': gr_menge,
                         'DMBTR': calculate_net_value(int(gr_menge), float(netpr_per_unit)),
-                        'BELNR': f"GR{gr_id_counter:05d}",
+                        'BELNR': self.id_allocator.format_id('GR', gr_number),
                         'ACTUAL_DELIVERY_DATE': actual_delivery_date
                     }
                     yield ekbe_records
                     ekbe_count += 1
+                    rows_left -= 1
 
                     # --- Generate corresponding Invoice Receipt (BEWTP='Q') ---
                     # Aim for roughly 1:1 GR to INV ratio, with some internal variation
-                    # Let's say 90% chance of an invoice for each GR
-                    if random.random() < 0.9: # Fixed internal probability for invoice generation
-                        if ekbe_count >= self.config.NUM_PO_HISTORY_TARGET:
+                    # 90% chance of an invoice for each GR, drawn in the generation plan
+                    if plan.invoice_flags[line_pos, i]:
+                        if rows_left == 0:
                             break
 
-                        invoice_date = get_random_date_in_range(actual_delivery_date, *self.config.INVOICE_DAYS_AFTER_GR)
-                        inv_id_counter += 1
+                        invoice_date = get_random_date_in_range(actual_delivery_date, *self.config.INVOICE_DAYS_AFTER_GR, py_random=streams.random)
+                        inv_number, _ = self.id_allocator.reserve('INV', 1)
 
                         ekbe_records={
                             'EBELN': ebeln,
@@ -817,11 +1290,12 @@ class SAPDataGenerator:
                             'BUDAT': invoice_date,
                             'MENGE': gr_menge, # Invoice quantity matches this GR
                             'DMBTR': calculate_net_value(int(gr_menge), float(netpr_per_unit)), # Invoice amount matches this GR
-                            'BELNR': f"INV{inv_id_counter:05d}",
+                            'BELNR': self.id_allocator.format_id('INV', inv_number),
                             'ACTUAL_DELIVERY_DATE': None
                         }
                         yield ekbe_records
                         ekbe_count += 1
+                        rows_left -= 1
 
             
             logging.info(f"Generated {ekbe_count} EKBE records.")
@@ -830,30 +1304,494 @@ class SAPDataGenerator:
             logging.error(f"An error occurred during EKBE data generation: {e}", exc_info=True)
             self.ekbe_df = pd.DataFrame()
     
-    def generate_SAP_data(self):
-        '''Calls all the individual generator functions'''
-        
-        self._calculate_vendor_weights()
-        self.generate_lfa1()
+    def _generate_ekbe_batch(self):
+        """
+        Column-wise EKBE engine used in batch mode.
+
+        Regroups EKPO into the line items of blocks of RANDOM_BLOCK_PO_HEADERS PO headers, draws
+        GR splits, late deliveries, delays and invoices as arrays from the block's stream, and
+        yields one DataFrame of GR/INV rows per block, in the same order as the row-wise engine
+        (each GR followed by its invoice).
+        Args:
+        self - SAPDataGenerator instance
+
+        Yields:
+        DataFrame containing a batch of EKBE (Purchase Order History) records
+        """
+        vendor_rng = self._rng('EKBE')
+        # Late delivery rate per active vendor, vendors without one use the average rate
+        active_vendors = pd.Index(self.lfa1_df.loc[self.lfa1_df['SPERR'] != 'X', 'LIFNR'])
+        base_late_rate = vendor_rng.uniform(*self.config.LATE_DELIVERY_PERCENTAGE, len(active_vendors))
+        variation = self.config.VENDOR_PERFORMANCE_VARIATION
+        performance_factor = 1 + vendor_rng.uniform(-variation, variation, len(active_vendors))
+        vendor_late_rate = np.append(np.clip(base_late_rate * performance_factor, 0, 1),
+                                     np.mean(self.config.LATE_DELIVERY_PERCENTAGE))
+
+        plan = self._generation_plan()
+        ekbe_count = 0
+        line_count = 0
+        for block, po_items in enumerate(regroup_batches(self.ekpo_df, plan.lines_per_block(RANDOM_BLOCK_PO_HEADERS))):
+            if ekbe_count >= plan.num_history_rows:
+                break
+            rng = self._rng('EKBE', block)
+
+            num_items = len(po_items)
+            lines = slice(line_count, line_count + num_items)
+            line_count += num_items
+            total_po_menge = po_items['MENGE'].to_numpy(dtype=float).astype(int)
+            netpr_per_unit = po_items['NETPR'].to_numpy(dtype=float)
+            po_date = pd.to_datetime(po_items['PO_DATE']).to_numpy().astype('datetime64[D]')
+            eindt = pd.to_datetime(po_items['EINDT']).to_numpy().astype('datetime64[D]')
+
+            # --- GR quantities: 1 to 3 planned splits per item, each at least 1 unit, summing to MENGE ---
+            num_gr_splits = np.minimum(plan.gr_counts[lines], np.maximum(total_po_menge, 1))
+            gr_quantities = np.zeros((num_items, 3), dtype=int)
+            remaining_menge = total_po_menge.copy()
+            for i in range(2):
+                # Not taking more than 80% of remaining to leave some for next splits
+                splits_left = np.maximum(num_gr_splits - i, 1)
+                max_qty = np.maximum(1, (remaining_menge * 0.8 / splits_left).astype(int))
+                qty = np.where(i < num_gr_splits - 1, rng.randint(1, max_qty + 1), 0)
+                gr_quantities[:, i] = qty
+                remaining_menge -= qty
+            gr_quantities[np.arange(num_items), num_gr_splits - 1] = remaining_menge # Last split gets remaining quantity
+
+            # One entry per GR, in item order
+            item_pos, split = np.nonzero(np.arange(3) < num_gr_splits[:, None])
+            gr_menge = gr_quantities[item_pos, split]
+            num_grs = len(item_pos)
+
+            # --- Late deliveries ---
+            vendor_pos = active_vendors.get_indexer(po_items['LIFNR'].to_numpy())
+            late_rate = vendor_late_rate[np.where(vendor_pos < 0, len(active_vendors), vendor_pos)]
+            days_to_delivery = (eindt - po_date).astype(int)
+            adjusted_late_rate = np.clip(late_rate * (1 - (0.5 * (60 - days_to_delivery) / 53)), 0, 1)
+            is_late = rng.random_sample(num_grs) < adjusted_late_rate[item_pos]
+
+            actual_delivery_date = eindt[item_pos].copy()
+            actual_delivery_date[is_late] += get_delivery_delays(self.config.DELAY_DISTRIBUTION, is_late.sum(), rng=rng)
+            # Ensure actual delivery date is not before PO date
+            gr_po_date = po_date[item_pos]
+            actual_delivery_date = np.where(actual_delivery_date < gr_po_date, gr_po_date + 1, actual_delivery_date)
+
+            # --- Invoices: planned per GR, dated INVOICE_DAYS_AFTER_GR after it ---
+            has_invoice = plan.invoice_flags[lines][item_pos, split]
+            min_days, max_days = self.config.INVOICE_DAYS_AFTER_GR
+            invoice_date = get_random_dates_in_range(actual_delivery_date, min_days, max_days, rng=rng)
+
+            # Interleave: each GR row is followed by its invoice row
+            rows_per_gr = 1 + has_invoice
+            gr_row = np.cumsum(rows_per_gr) - rows_per_gr
+            is_gr = np.zeros(int(rows_per_gr.sum()), dtype=bool)
+            is_gr[gr_row] = True
+            row_gr = (np.cumsum(is_gr) - 1) # GR each row belongs to
+            # Keep the planned number of rows of each item; the history target cuts the last items
+            item_rows = np.bincount(item_pos, weights=rows_per_gr, minlength=num_items).astype(np.int64)
+            row_item = item_pos[row_gr]
+            row_rank = np.arange(len(is_gr)) - (np.cumsum(item_rows) - item_rows)[row_item]
+            keep = row_rank < plan.history_counts[lines][row_item]
+            is_gr, row_gr = is_gr[keep], row_gr[keep]
+            num_rows = len(is_gr)
+            num_gr_rows = int(is_gr.sum())
+            num_inv_rows = num_rows - num_gr_rows
+
+            # GR and INV numbers, formatted by BEWTP when EKBE is written
+            belnr = np.empty(num_rows, dtype=np.int64)
+            belnr[is_gr] = self.id_allocator.allocate('GR', num_gr_rows)
+            belnr[~is_gr] = self.id_allocator.allocate('INV', num_inv_rows)
+
+            row_item = item_pos[row_gr]
+            row_menge = gr_menge[row_gr]
+            delivery_date = actual_delivery_date[row_gr]
+            yield pd.DataFrame({
+                'EBELN': po_items['EBELN'].to_numpy()[row_item],
+                'EBELP': po_items['EBELP'].to_numpy()[row_item],
+                'BEWTP': np.where(is_gr, 'E', 'Q'), # Goods Receipt / Invoice Receipt
+                'BUDAT': np.where(is_gr, delivery_date, invoice_date[row_gr]),
+                'MENGE': row_menge, # Invoice quantity matches its GR
+                'DMBTR': calculate_net_values(row_menge, netpr_per_unit[row_item]),
+                'BELNR': belnr,
+                'ACTUAL_DELIVERY_DATE': pd.Series(delivery_date).where(is_gr) # Empty for invoices
+            })
+            ekbe_count += num_rows
+
+        logging.info(f"Generated {ekbe_count} EKBE records.")
+
+    def generate_SAP_data(self, workers=None, append=None, resume=None):
+        '''
+        Calls all the individual generator functions.
+
+        Args:
+        workers - Number of worker processes for EKKO/EKPO/EKBE (default: config NUM_WORKERS, or 1).
+                  Master data is generated once; when NUM_PO_HEADERS exceeds PO_HEADERS_PER_SHARD
+                  the PO headers are split into shards, generated by this many processes. The
+                  output does not depend on the number of workers.
+        append - True to keep the master data and transactional tables already in OUTPUT_DIR and only
+                 add EKKO/EKPO/EKBE for the configured START_DATE..END_DATE window, see load_master_data
+                 (default: config APPEND, or False)
+        resume - True to continue an interrupted run from the checkpoint in OUTPUT_DIR, skipping its
+                 finished stages and shards; the output is the same as that of an uninterrupted run
+                 (default: config RESUME, or False). Checkpoints are recorded when CHECKPOINT is set or
+                 when resuming.
+
+        Returns:
+        GenerationReport with the wall time, CPU time, rows and rows/sec of every stage and their sub-phases
+        (also kept as self.report). It is logged, and written to OUTPUT_DIR/generation_report.json when
+        TIMING_REPORT is set; with PROFILE_STAGES each stage's cProfile statistics go to OUTPUT_DIR/profiles.
+        The peak and retained memory of every stage are kept as self.memory_report; with MEMORY_REPORT the
+        run is traced with tracemalloc and the report, with each stage's top allocation sites, is logged
+        and written to OUTPUT_DIR/memory_report.json.
+        '''
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            with self.memory_monitor.tracing():
+                self._generate_SAP_data(workers, append, resume)
+        finally:
+            self.report = self.profiler.report(time.perf_counter() - wall_start, time.process_time() - cpu_start)
+            logging.info(self.report.summary())
+            if getattr(self.config, 'TIMING_REPORT', False):
+                self.report.write_json(os.path.join(self.config.OUTPUT_DIR, 'generation_report.json'))
+            self.memory_report = self.memory_monitor.report()
+            if getattr(self.config, 'MEMORY_REPORT', False):
+                logging.info(self.memory_report.summary())
+                self.memory_report.write_json(os.path.join(self.config.OUTPUT_DIR, 'memory_report.json'))
+        return self.report
+
+    def _generate_SAP_data(self, workers, append, resume):
+        '''Runs the stages of generate_SAP_data.'''
+        if workers is None:
+            workers = getattr(self.config, 'NUM_WORKERS', 1)
+        if append is None:
+            append = getattr(self.config, 'APPEND', False)
+        if resume is None:
+            resume = getattr(self.config, 'RESUME', False)
+        self.checkpoint = self._open_checkpoint(resume)
         
+        if append:
+            with self._stage('load master data'):
+                if self._skip_stage('master data'):
+                    for table in MASTER_TABLE_ATTRIBUTES:
+                        self._load_master_table(table)
+                    self._calculate_vendor_weights()
+                    self.append_increment = self.checkpoint.random_streams['append_increment']
+                else:
+                    self.load_master_data()
+                    self._finish_stage('master data')
+        else:
+            with self._stage('LFA1', ['LFA1']):
+                self._calculate_vendor_weights()
+                if self._skip_stage('LFA1'):
+                    self._load_master_table('LFA1')
+                else:
+                    self.generate_lfa1()
+                    self._finish_stage('LFA1', ['LFA1'])
+            if self._max_memory_mb() is not None:
+                self.value_pools.pools.clear() # Only LFA1 draws from the pools
         
-        self.generate_mara()
+            with self._stage('MARA', ['MARA']):
+                if self._skip_stage('MARA'):
+                    self._load_master_table('MARA')
+                else:
+                    self.generate_mara()
+                    self._finish_stage('MARA', ['MARA'])
        
+            with self._stage('vendor_contract', ['vendor_contract']):
+                if self._skip_stage('vendor_contract'):
+                    self._load_master_table('vendor_contract')
+                else:
+                    self.generate_vendor_contract()
+                    self._finish_stage('vendor_contract', ['vendor_contract'])
         
-        self.generate_vendor_contract()
-        
-        
-        
-        self.generate_ekko()
+        try:
+            if self._skip_stage('EKKO/EKPO/EKBE'):
+                return
+            self._apply_memory_budget()
+            if count_shards(self.config, self._shard_size()) > 1:
+                with self._stage('EKKO/EKPO/EKBE'):
+                    self._generate_sharded_transactional_data(workers)
+                merged = getattr(self.config, 'MERGE_PART_FILES', True)
+                self._finish_stage('EKKO/EKPO/EKBE', SHARDED_TABLES if merged else [])
+            else:
+                self._generate_transactional_data()
+                self._finish_stage('EKKO/EKPO/EKBE', SHARDED_TABLES)
+        finally:
+            if self._max_memory_mb() is not None:
+                self._release_master_data()
+
+    def _open_checkpoint(self, resume):
+        '''
+        Returns the run's Checkpoint: the recorded one when resuming, a new one replacing any earlier
+        manifest when CHECKPOINT is set, or None when the run is not checkpointed.
+        '''
+        if not resume and not getattr(self.config, 'CHECKPOINT', False):
+            return None
+        run_config_hash = config_hash(self.config)
+        if resume:
+            return Checkpoint.load(self.config.OUTPUT_DIR, run_config_hash)
+        checkpoint = Checkpoint(self.config.OUTPUT_DIR, run_config_hash)
+        checkpoint.save()
+        return checkpoint
+
+    def _is_finished(self, stage):
+        '''Returns True if the checkpoint records the stage as finished.'''
+        return self.checkpoint is not None and self.checkpoint.is_done(stage)
+
+    def _skip_stage(self, stage):
+        '''
+        Returns True if a resumed run can skip the stage because the checkpoint records it as finished,
+        after restoring the ID high-water marks it reached; the caller loads what the stage wrote.
+        '''
+        if not self._is_finished(stage):
+            return False
+        for entity, number in self.checkpoint.id_high_water_marks(stage).items():
+            self.id_allocator.set_high_water_mark(entity, number)
+        logging.info(f"Resuming: stage {stage} finished in the checkpointed run, skipping it.")
+        return True
+
+    def _finish_stage(self, stage, tables=()):
+        '''Records a finished stage, with the files of the tables it wrote, in the checkpoint (if the run has one).'''
+        if self.checkpoint is None:
+            return
+        self.checkpoint.random_streams = {'RANDOM_SEED': self.config.RANDOM_SEED, 'append_increment': self.append_increment}
+        self.checkpoint.mark_done(stage, [self._table_filename(table) for table in tables],
+                                  self.id_allocator.high_water_marks)
+
+    def load_master_data(self):
+        '''
+        Prepares an append run: loads LFA1, MARA and the vendor contracts an earlier run wrote to
+        OUTPUT_DIR, continues every ID sequence after the highest number in the existing tables
+        (earlier increments included) and picks the next increment number, so EKKO/EKPO/EKBE of the
+        new window go to new '-append-' files with their own random streams.
+
+        Only the columns the EKKO/EKPO/EKBE engines read are loaded. IS_PREFERRED is not part of the
+        LFA1 file and is loaded as False; the engines only use it for the disabled preferred vendor discount.
+        '''
+        output_dir = self.config.OUTPUT_DIR
+        extension = self.config.OUTPUT_FORMAT
+        for table in ['LFA1', 'MARA', 'vendor_contract']:
+            if not os.path.exists(os.path.join(output_dir, f"{table}.{extension}")):
+                raise FileNotFoundError(f"Cannot append: {table}.{extension} of an earlier run is not in {output_dir}.")
+
+        for table in MASTER_TABLE_ATTRIBUTES:
+            df = self._load_master_table(table)
+            for column, entity in TABLE_ID_COLUMNS[table].items():
+                if column == entity: # The table's own key, not a reference to another table
+                    self.id_allocator.advance_past(entity, df[column])
+        if len(self.lfa1_df) != self.config.NUM_VENDORS:
+            raise ValueError(f"Cannot append: {output_dir} holds {len(self.lfa1_df)} vendors, but NUM_VENDORS is {self.config.NUM_VENDORS}.")
+        self._calculate_vendor_weights()
+
+        for filepath in table_files(output_dir, 'EKKO', extension):
+            for batch in self._read_file_batches(filepath, ['EBELN']):
+                self.id_allocator.advance_past('EBELN', batch['EBELN'])
+        for filepath in table_files(output_dir, 'EKBE', extension):
+            for batch in self._read_file_batches(filepath, ['BELNR', 'BEWTP']):
+                is_gr = batch['BEWTP'] == 'E'
+                self.id_allocator.advance_past('GR', batch.loc[is_gr, 'BELNR'])
+                self.id_allocator.advance_past('INV', batch.loc[~is_gr, 'BELNR'])
+        self.append_increment = next_append_increment(output_dir, extension)
+        logging.info(f"Loaded {len(self.lfa1_df)} vendors, {len(self.mara_df)} materials and {len(self.contract_df)} contracts "
+                     f"from {output_dir}; appending increment {self.append_increment} after PO "
+                     f"{self.id_allocator.high_water_mark('EBELN')}.")
+
+    def _load_master_table(self, table):
+        '''
+        Loads a master table written to OUTPUT_DIR into its attribute (e.g. lfa1_df), with the columns
+        the later stages read, in the form they use: integer IDs in batch mode, formatted ones in row mode.
+        IS_PREFERRED is not part of the LFA1 file and is loaded as False; the engines only use it for
+        the disabled preferred vendor discount.
+
+        Returns:
+        The loaded table
+        '''
+        if table == 'LFA1':
+            df = self._load_table('LFA1', ['LIFNR', 'SPERR']).assign(IS_PREFERRED=False)
+        elif table == 'MARA':
+            df = self._load_table('MARA', ['MATNR', 'MATKL', 'MEINS', 'BASE_PRICE'])
+            self.material_base_prices = df['BASE_PRICE'].to_numpy(dtype=float)
+        else:
+            df = self._load_table('vendor_contract', ['CONTRACT_ID'] + SHARED_MASTER_COLUMNS['vendor_contract'])
+            df['CONTRACT_PRICE'] = df['CONTRACT_PRICE'].astype(float)
+        if self._is_batch_mode():
+            df = self.id_allocator.parse_ids(table, df)
+        setattr(self, MASTER_TABLE_ATTRIBUTES[table], df)
+        return df
+
+    def _load_table(self, table, columns):
+        '''Reads some columns of a table written to OUTPUT_DIR, with IDs formatted as written.'''
+        filepath = os.path.join(self.config.OUTPUT_DIR, f"{table}.{self.config.OUTPUT_FORMAT}")
+        batches = list(self._read_file_batches(filepath, columns))
+        return pd.concat(batches, ignore_index=True)[columns] if batches else pd.DataFrame(columns=columns)
+
+    def _apply_memory_budget(self):
+        '''
+        Under MAX_MEMORY_MB, spills the master data to memory-mapped files when it takes more than
+        MASTER_DATA_BUDGET_SHARE of the budget. Only the columns the EKKO/EKPO/EKBE engines read
+        (SHARED_MASTER_COLUMNS) are kept; they are replaced by read-only views on the files, so
+        the operating system can page them out instead of the process holding them.
+        '''
+        max_memory_mb = self._max_memory_mb()
+        if max_memory_mb is None:
+            return
+        master_mb = sum(dataframe_mb(df) for df in (self.lfa1_df, self.mara_df, self.contract_df))
+        master_mb += (self.material_base_prices.nbytes + np.asarray(self.vendor_weights).nbytes) / 2**20
+        if master_mb <= max_memory_mb * MASTER_DATA_BUDGET_SHARE:
+            return
+        store = self._share_master_data()
+        self.master_store = store
+        (self.lfa1_df, self.mara_df, self.contract_df,
+         self.material_base_prices, self.vendor_weights) = _open_master_data(store)
+        gc.collect()
+        logging.info(f"Master data ({master_mb:.0f} MB) exceeds {MASTER_DATA_BUDGET_SHARE:.0%} of MAX_MEMORY_MB "
+                     f"({max_memory_mb} MB); using memory-mapped copies from {store.directory}.")
+
+    def _release_master_data(self):
+        '''Drops the master data and generation plan once no stage needs them, and removes spilled files.'''
+        self.lfa1_df = self.mara_df = self.contract_df = None
+        self.material_base_prices = np.array([])
+        self.vendor_weights = None
+        self.plan = None
+        gc.collect()
+        if self.master_store is not None:
+            self.master_store.remove()
+            self.master_store = None
+
+    def _generate_transactional_data(self):
+        '''Generates EKKO, EKPO and EKBE from the master data, one table after the other'''
+        with self._stage('EKKO', ['EKKO']):
+            self.generate_ekko()
         
-        save_generator_to_dataframe(generator.generate_ekpo,"EKPO.csv", config.OUTPUT_DIR, config.OUTPUT_FORMAT)
-        self.ekpo_df=read_csv_rows_generator(self.config.OUTPUT_DIR + "/EKPO.csv")
-    
-        save_generator_to_dataframe(generator.generate_ekbe,"EKBE.csv", config.OUTPUT_DIR, config.OUTPUT_FORMAT)
-        self.ekbe_df=read_csv_rows_generator(self.config.OUTPUT_DIR + "/EKBE.csv")
+        if self._is_in_process_handoff():
+            # EKPO records go to EKBE as they are generated; the EKPO file is written on the way
+            with self._stage('EKPO/EKBE', ['EKPO', 'EKBE']):
+                self.ekpo_df=self._tee_table(self.generate_ekpo, 'EKPO')
+                self._save_table_from_generator(self.generate_ekbe, 'EKBE')
+                for _ in self.ekpo_df: # EKBE may stop at its target before all of EKPO is written
+                    pass
+        else:
+            with self._stage('EKPO', ['EKPO']):
+                self._save_table_from_generator(self.generate_ekpo, 'EKPO')
+            self.ekpo_df=self._read_table('EKPO')
         
+            with self._stage('EKBE', ['EKBE']):
+                self._save_table_from_generator(self.generate_ekbe, 'EKBE')
+        self.ekbe_df=self._read_table('EKBE', batches=False)
+
+    def _generate_sharded_transactional_data(self, workers):
+        '''
+        Generates EKKO, EKPO and EKBE in shards, each writing its own part files.
+
+        Args:
+        workers - Number of worker processes; with one, the shards are generated one after the other in this process
+        '''
+        shards = [dict(shard, append_increment=self.append_increment)
+                  for shard in plan_shards(self.config, self.id_allocator, self._shard_size())]
+        master_data = (self.lfa1_df, self.mara_df, self.contract_df, self.material_base_prices, self.vendor_weights)
+        logging.info(f"Generating transactional data in {len(shards)} shards with {workers} workers.")
+
+        pending = [shard for shard in shards if not self._is_finished(f"shard {shard['shard_id']}")]
+        if len(pending) < len(shards):
+            logging.info(f"Resuming: {len(shards) - len(pending)} shards finished in the checkpointed run, skipping them.")
+
+        # Shards report nothing themselves; their progress is counted here as they finish
+        with self.progress.stage('EKKO/EKPO/EKBE shards', sum(shard['NUM_PO_HEADERS'] for shard in pending), unit='PO headers') as tracker:
+            if workers > 1 and pending:
+                # Workers map the master data from disk instead of each unpickling its own copy
+                store = self.master_store # Already on disk if it was spilled under MAX_MEMORY_MB
+                if store is None and getattr(self.config, 'SHARE_MASTER_DATA', True):
+                    store = self._share_master_data()
+                try:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        futures = {executor.submit(_generate_shard, self.config, store or master_data, shard): shard for shard in pending}
+                        for future in as_completed(futures):
+                            self._merge_shard_reports(future.result()) # Re-raises errors from the worker
+                            self._finish_shard(futures[future], tracker)
+                finally:
+                    if store is not None and store is not self.master_store:
+                        store.remove()
+            else:
+                for shard in pending:
+                    self._merge_shard_reports(_generate_shard(self.config, master_data, shard))
+                    self._finish_shard(shard, tracker)
+
+        if getattr(self.config, 'MERGE_PART_FILES', True):
+            for table in SHARDED_TABLES:
+                if self._is_finished(f"merge {table}"):
+                    continue
+                with self.profiler.phase(f"merge {table}"):
+                    merge_part_files(self.config.OUTPUT_DIR, self._table_name(table), len(shards), self.config.OUTPUT_FORMAT,
+                                     compression=getattr(self.config, 'PARQUET_COMPRESSION', 'snappy'))
+                self._finish_stage(f"merge {table}", [table])
+            self.ekko_df=self._read_table('EKKO', batches=False)
+            self.ekpo_df=self._read_table('EKPO', batches=False)
+            self.ekbe_df=self._read_table('EKBE', batches=False)
+
+    def _merge_shard_reports(self, reports):
+        '''Adds the stage timings and memory a shard returned to those of this run.'''
+        self.profiler.merge(GenerationReport.from_dict(reports['timings']))
+        self.memory_monitor.merge(MemoryReport.from_dict(reports['memory']))
+
+    def _finish_shard(self, shard, tracker):
+        '''Records a generated shard in the checkpoint, and its PO headers and part file sizes in the progress tracker.'''
+        self._finish_stage(f"shard {shard['shard_id']}")
+        part_paths = [os.path.join(self.config.OUTPUT_DIR, part_filename(self._table_name(table), shard['shard_id'], self.config.OUTPUT_FORMAT))
+                      for table in SHARDED_TABLES]
+        tracker.update(shard['NUM_PO_HEADERS'], sum(os.path.getsize(path) for path in part_paths if os.path.exists(path)))
         
 
+# PO headers per random block of the batch engines: each block draws EKPO and EKBE from its own stream
+RANDOM_BLOCK_PO_HEADERS = 1000
+# Estimated memory per record of a batch, including the engines' temporaries, for sizing batches under MAX_MEMORY_MB
+BATCH_BYTES_PER_ROW = 2048
+# Share of MAX_MEMORY_MB the master data may take before it is spilled to memory-mapped files
+MASTER_DATA_BUDGET_SHARE = 0.5
+
+# Master data tables and the generator attributes holding them
+MASTER_TABLE_ATTRIBUTES = {'LFA1': 'lfa1_df', 'MARA': 'mara_df', 'vendor_contract': 'contract_df'}
+
+# Master data columns read by the EKKO/EKPO/EKBE engines, the part of master data shard workers need
+SHARED_MASTER_COLUMNS = {
+    'LFA1': ['LIFNR', 'SPERR', 'IS_PREFERRED'],
+    'MARA': ['MATNR', 'MATKL', 'MEINS'],
+    'vendor_contract': ['LIFNR', 'MATNR', 'CONTRACT_PRICE', 'VALID_FROM', 'VALID_TO']
+}
+
+def _open_master_data(store):
+    """Opens the master data a generator shared with _share_master_data, as read-only memory-mapped views."""
+    return (store.get_table('LFA1'), store.get_table('MARA'), store.get_table('vendor_contract'),
+            store.get_array('material_base_prices'), store.get_array('vendor_weights'))
+
+def _generate_shard(config, master_data, shard):
+    """
+    Worker entry point: generates one shard of EKKO/EKPO/EKBE into its part files.
+    Kept at module level so it can be sent to a ProcessPoolExecutor.
+
+    Args:
+        config (Config): The run configuration.
+        master_data (tuple or MasterDataStore): LFA1, MARA and contract DataFrames, material base prices
+                                                and vendor weights, or the store they were shared in.
+        shard (dict): A shard from plan_shards.
+
+    Returns:
+        dict: The 'timings' (GenerationReport) and 'memory' (MemoryReport) of the shard's stages as to_dict,
+              for the parent to merge.
+    """
+    if isinstance(master_data, MasterDataStore):
+        master_data = _open_master_data(master_data)
+    generator = SAPDataGenerator(shard_config(config, shard))
+    generator.shard_id = shard['shard_id']
+    generator.append_increment = shard.get('append_increment', 0)
+    generator.progress = ProgressReporter() # The parent reports the progress of the shards
+    generator.profiler.prefix = f"shard-{shard['shard_id']:05d}-"
+    for entity, high_water_mark in shard['id_offsets'].items():
+        generator.id_allocator.set_high_water_mark(entity, high_water_mark)
+    (generator.lfa1_df, generator.mara_df, generator.contract_df,
+     generator.material_base_prices, generator.vendor_weights) = master_data
+    with generator.memory_monitor.tracing():
+        generator._generate_transactional_data()
+    return {'timings': generator.profiler.report().to_dict(), 'memory': generator.memory_monitor.report().to_dict()}
+
+
 if __name__ == "__main__":
     config=Config()
     
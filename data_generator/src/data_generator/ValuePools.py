@@ -0,0 +1,116 @@
+import logging
+import os
+import numpy as np
+from faker import Faker
+
+
+class ValuePools:
+    """
+    Pre-generated pools of Faker values for high-volume master data.
+
+    Calling Faker once per record is the slowest part of generating master data. Instead,
+    each field gets a pool of distinct values that is generated once (per seed) and rows
+    are assembled by drawing pool indexes with NumPy. Pools can be persisted in a cache
+    directory, keyed by seed, field and size, so repeated runs skip Faker entirely.
+
+    Args:
+        seed (int): Seed of the pools; the same seed always produces the same pools.
+        pool_size (int): Maximum number of distinct values to generate per field for draws with replacement.
+        cache_dir (str): Directory for cached pools, or None to keep pools in memory only.
+        locale (str): Faker locale of the values (default: Faker's default locale).
+    """
+
+    def __init__(self, seed, pool_size=10000, cache_dir=None, locale=None):
+        self.seed = seed
+        self.pool_size = pool_size
+        self.cache_dir = cache_dir
+        self.locale = locale
+        self.pools = {}
+
+    def get_pool(self, field, size=None):
+        """
+        Returns a pool of distinct values of a Faker field, generating (or loading) it on first use.
+
+        A pool holds the first `size` distinct values of the field's seeded Faker instance, so a
+        larger pool generated earlier is cut to its first `size` values instead of regenerated.
+
+        Args:
+            field (str): Faker provider method, e.g. 'company' or 'email'.
+            size (int): Number of distinct values (default: pool_size); fewer if Faker runs out of values.
+
+        Returns:
+            numpy.ndarray: Distinct values of the field.
+        """
+        size = self.pool_size if size is None else size
+        pool = self.pools.get(field)
+        if pool is not None and len(pool) >= size:
+            return pool[:size]
+
+        cache_path = self._cache_path(field, size)
+        if cache_path is not None and os.path.exists(cache_path):
+            pool = np.load(cache_path)
+            logging.debug(f"Loaded {len(pool)} '{field}' values from {cache_path}.")
+        else:
+            pool = self._generate_pool(field, size)
+            if cache_path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.save(cache_path, pool)
+        self.pools[field] = pool
+        return pool
+
+    def draw(self, field, size):
+        """
+        Draws values of a field with replacement.
+
+        Args:
+            field (str): Faker provider method.
+            size (int): Number of values to draw.
+
+        Returns:
+            numpy.ndarray: The drawn values.
+        """
+        pool = self.get_pool(field, min(self.pool_size, size)) # A small draw needs no more values than it draws
+        return pool[np.random.randint(0, len(pool), size)]
+
+    def draw_unique(self, field, size):
+        """
+        Draws distinct values of a field (without replacement).
+
+        Args:
+            field (str): Faker provider method.
+            size (int): Number of values to draw.
+
+        Returns:
+            numpy.ndarray: The drawn values, all different.
+
+        Raises:
+            ValueError: If Faker cannot produce `size` distinct values for the field.
+        """
+        pool = self.get_pool(field, size)
+        if len(pool) < size:
+            raise ValueError(f"Only {len(pool)} distinct '{field}' values could be generated, {size} are needed.")
+        return pool[np.random.permutation(len(pool))[:size]]
+
+    def _generate_pool(self, field, size):
+        """Generates up to `size` distinct values with a Faker instance seeded for the field."""
+        fake = Faker(self.locale)
+        fake.seed_instance(f"{self.seed}-{field}") # Independent of other fields and of global Faker state
+        provider = getattr(fake, field)
+
+        values = {}
+        # Fields with few possible values (e.g. country codes) stop once no new values turn up
+        misses = 0
+        while len(values) < size and misses < 1000:
+            value = provider()
+            if value in values:
+                misses += 1
+            else:
+                values[value] = None
+                misses = 0
+        logging.info(f"Generated a pool of {len(values)} '{field}' values.")
+        return np.array(list(values), dtype=str)
+
+    def _cache_path(self, field, size):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{field}-{self.locale or 'default'}-seed{self.seed}-n{size}.npy")
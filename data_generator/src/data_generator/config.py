@@ -5,6 +5,27 @@ class Config:
     RANDOM_SEED = 42
     OUTPUT_DIR = "generated_sap_data"
     OUTPUT_FORMAT = "csv" # or "parquet"
+    PARQUET_ROW_GROUP_SIZE = 100000 # Maximum rows per Parquet row group (each written chunk is at least one row group)
+    PARQUET_COMPRESSION = "snappy" # Parquet codec: "snappy", "zstd", "gzip", "lz4", "brotli" or "none"
+    GENERATION_MODE = "batch" # "batch" (vectorized, column-wise) or "row" (one record at a time)
+    GENERATION_BATCH_SIZE = 10000 # Records generated (and written) per batch in batch mode
+    NUM_WORKERS = 1 # Worker processes for EKKO/EKPO/EKBE; more than 1 generates them in parallel shards
+    PO_HEADERS_PER_SHARD = 100000 # PO headers per shard of EKKO/EKPO/EKBE; fixed so the output does not depend on NUM_WORKERS
+    SHARE_MASTER_DATA = True # Worker processes memory-map master data from OUTPUT_DIR/.master_data instead of receiving pickled copies
+    MAX_MEMORY_MB = None # Memory budget in MB: caps batch sizes, spills master data to memory-mapped files and logs stages over budget; None for no budget
+    MERGE_PART_FILES = True # Merge the per-shard part files into one file per table
+    APPEND = False # Keep the tables in OUTPUT_DIR and only add EKKO/EKPO/EKBE for START_DATE..END_DATE, as new '<table>-append-NNNNN' files
+    CHECKPOINT = False # Record finished stages and shards in OUTPUT_DIR/.checkpoint.json so that an interrupted run can be resumed
+    RESUME = False # Continue an interrupted run from its checkpoint, skipping finished stages and shards
+    PROGRESS_SINKS = ['log'] # Progress, throughput and ETA of every stage: any of 'bar' (terminal), 'log' (log lines), 'json' (status file)
+    PROGRESS_INTERVAL_SECONDS = 5.0 # Minimum seconds between two progress reports of a stage
+    PROGRESS_STATUS_FILE = None # Path of the 'json' status file (default: OUTPUT_DIR/.progress.json)
+    TIMING_REPORT = False # Write the wall/CPU time, rows and rows/sec of every stage to OUTPUT_DIR/generation_report.json
+    PROFILE_STAGES = False # Run each stage under cProfile and save its statistics to OUTPUT_DIR/profiles/<stage>.prof
+    MEMORY_REPORT = False # Trace allocations with tracemalloc and write each stage's peak/retained memory and top allocation sites to OUTPUT_DIR/memory_report.json (slow)
+    IN_PROCESS_HANDOFF = True # Feed EKKO/EKPO records straight to the next stage while writing them, instead of re-reading the files
+    VALUE_POOL_SIZE = 10000 # Distinct Faker values pre-generated per field (names, cities, emails, ...)
+    VALUE_POOL_CACHE_DIR = None # Directory to cache value pools between runs (keyed by seed), or None
 
     # Date Range
     START_DATE = datetime.date(2020, 1, 1)
@@ -25,6 +46,7 @@ class Config:
     VENDOR_PERCENTAGE_FOR_DISTRIBUTION_OF_SALES=.2
     VENDOR_SALES_CONTRIBUTION_PERCENTAGE=0.80
     VENDOR_TYPES = ['ZDOM', 'ZINT', 'ZSRV', 'ZCON'] # Domestic, International, Service, Consumable
+    VENDOR_UNIQUE_FIELDS = ['NAME1', 'SMTP_ADDR'] # LFA1 columns that get distinct values in batch mode
 
     # MARA - Material Master
     MATERIAL_TYPES = ['ROH', 'HALB', 'FERT', 'HAWA']
@@ -97,4 +119,6 @@ class Config:
     EXPIRED_CONTRACT_PERCENTAGE = 0.10 # 10% of contracts are expired
 
     # Seasonal Patterns
-    Q4_SPEND_INCREASE_PERCENTAGE = 0.30 # 30% more spending in Q4 vs Q1
\ No newline at end of file
+    Q4_SPEND_INCREASE_PERCENTAGE = 0.30 # 30% more spending in Q4 vs Q1
+    MONTH_END_UPLIFT = 0.0 # Extra weight of PO dates in the last days of each month (0.5 = 50% more)
+    WEEKDAY_WEIGHTS = None # Seven relative PO date weights, Monday first (e.g. [1, 1, 1, 1, 1, 0.1, 0.1]), None for no pattern
\ No newline at end of file
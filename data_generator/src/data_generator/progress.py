@@ -0,0 +1,230 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+
+
+def format_duration(seconds):
+    """Formats seconds as H:MM:SS, or '?' if unknown."""
+    if seconds is None:
+        return '?'
+    return str(datetime.timedelta(seconds=int(round(seconds))))
+
+def format_snapshot(snapshot):
+    """Formats a progress snapshot as one line, e.g. 'EKPO: 45.0% 12,345/27,400 rows, 8,120 rows/s, 1.2 MB/s, ETA 0:00:02'."""
+    if snapshot['status'] == 'running' and snapshot['rows'] == 0:
+        planned = '' if snapshot['total_rows'] is None else f", {snapshot['total_rows']:,} {snapshot['unit']} planned"
+        return f"{snapshot['stage']}: started{planned}"
+    done = f"{snapshot['rows']:,}" if snapshot['total_rows'] is None else f"{snapshot['rows']:,}/{snapshot['total_rows']:,}"
+    percent = '' if snapshot['percent'] is None else f"{snapshot['percent']:.1f}% "
+    line = (f"{snapshot['stage']}: {percent}{done} {snapshot['unit']}, {snapshot['rows_per_sec']:,.0f} {snapshot['unit']}/s, "
+            f"{snapshot['bytes_per_sec'] / 2**20:.1f} MB/s")
+    if snapshot['status'] == 'running':
+        return f"{line}, ETA {format_duration(snapshot['eta_seconds'])}"
+    return f"{line}, {snapshot['status']} in {format_duration(snapshot['elapsed_seconds'])}"
+
+
+class ProgressTracker:
+    """
+    Tracks the progress of one stage against its planned number of rows.
+
+    The stage reports the rows (and bytes) it wrote with update; the tracker derives
+    rows/sec, bytes/sec, percent complete and ETA and hands a snapshot to every sink at
+    most once per `interval` seconds, and once more when the stage ends. Used as a
+    context manager, the final snapshot says whether the stage finished or failed.
+
+    Args:
+        stage (str): The stage name, e.g. 'EKPO'.
+        total_rows (int): The planned number of rows, or None if unknown.
+        sinks (list): Sinks with an emit(snapshot) method.
+        interval (float): Minimum seconds between two snapshots (default: 5).
+        unit (str): What is counted (default: 'rows').
+    """
+
+    def __init__(self, stage, total_rows, sinks, interval=5.0, unit='rows'):
+        self.stage = stage
+        self.total_rows = None if total_rows is None else int(total_rows)
+        self.sinks = sinks
+        self.interval = interval
+        self.unit = unit
+        self.rows = 0
+        self.bytes_written = 0
+        self.status = 'running'
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.last_emitted_at = self.started_at
+
+    def __enter__(self):
+        self._emit()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish('failed' if exc_type is not None else 'finished')
+        return False
+
+    def update(self, rows, bytes_written=0):
+        """Adds rows (and bytes) the stage wrote; emits a snapshot if `interval` has passed."""
+        self.rows += rows
+        self.bytes_written += bytes_written
+        if time.monotonic() - self.last_emitted_at >= self.interval:
+            self._emit()
+
+    def finish(self, status='finished'):
+        """Ends the stage and emits its final snapshot."""
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+            self.status = status
+            self._emit()
+
+    def snapshot(self):
+        """
+        Returns the stage's progress.
+
+        Returns:
+            dict: stage, status, unit, rows, total_rows, percent, bytes_written, elapsed_seconds,
+                  rows_per_sec, bytes_per_sec and eta_seconds (None where unknown).
+        """
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        rows_per_sec = self.rows / elapsed if elapsed > 0 else 0.0
+        percent = eta = None
+        if self.total_rows:
+            percent = min(100.0, 100.0 * self.rows / self.total_rows)
+            if rows_per_sec > 0:
+                eta = max(0.0, (self.total_rows - self.rows) / rows_per_sec)
+        return {
+            'stage': self.stage,
+            'status': self.status,
+            'unit': self.unit,
+            'rows': self.rows,
+            'total_rows': self.total_rows,
+            'percent': percent,
+            'bytes_written': self.bytes_written,
+            'elapsed_seconds': elapsed,
+            'rows_per_sec': rows_per_sec,
+            'bytes_per_sec': self.bytes_written / elapsed if elapsed > 0 else 0.0,
+            'eta_seconds': 0.0 if self.status != 'running' else eta
+        }
+
+    def _emit(self):
+        self.last_emitted_at = time.monotonic()
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            try:
+                sink.emit(snapshot)
+            except Exception as e: # Progress reporting must never stop a run
+                logging.warning(f"Progress sink {type(sink).__name__} failed: {e}")
+
+
+class ProgressReporter:
+    """
+    Opens a ProgressTracker per stage and routes the writers' row counts to it.
+
+    Args:
+        sinks (list): Sinks with an emit(snapshot) method (default: none, nothing is reported).
+        interval (float): Minimum seconds between two snapshots of a stage (default: 5).
+    """
+
+    def __init__(self, sinks=(), interval=5.0):
+        self.sinks = list(sinks)
+        self.interval = interval
+        self.trackers = {} # Stage name -> tracker of the running stage
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds the reporter configured by PROGRESS_SINKS ('bar', 'log', 'json'), PROGRESS_INTERVAL_SECONDS
+        and PROGRESS_STATUS_FILE (default: OUTPUT_DIR/.progress.json).
+        """
+        sinks = []
+        for name in getattr(config, 'PROGRESS_SINKS', ['log']):
+            if name == 'bar':
+                sinks.append(TerminalProgressSink())
+            elif name == 'log':
+                sinks.append(LogProgressSink())
+            elif name == 'json':
+                status_file = getattr(config, 'PROGRESS_STATUS_FILE', None)
+                sinks.append(JsonStatusSink(status_file or os.path.join(config.OUTPUT_DIR, '.progress.json')))
+            else:
+                raise ValueError(f"Unknown progress sink '{name}'; use 'bar', 'log' or 'json'.")
+        return cls(sinks, getattr(config, 'PROGRESS_INTERVAL_SECONDS', 5.0))
+
+    def stage(self, name, total_rows=None, unit='rows'):
+        """Returns a tracker for a stage, to be used as a context manager around the stage."""
+        tracker = ProgressTracker(name, total_rows, self.sinks, self.interval, unit)
+        self.trackers[name] = tracker
+        return tracker
+
+    def update(self, name, rows, bytes_written=0):
+        """Adds rows (and bytes) to the running stage `name`; ignored if no such stage is being tracked."""
+        tracker = self.trackers.get(name)
+        if tracker is not None and tracker.finished_at is None:
+            tracker.update(rows, bytes_written)
+
+
+class TerminalProgressSink:
+    """
+    Draws a progress bar per stage on a terminal, redrawn in place.
+
+    Args:
+        stream (file): The stream to draw on (default: sys.stderr).
+        width (int): The width of the bar in characters (default: 30).
+    """
+
+    def __init__(self, stream=None, width=30):
+        self.stream = stream if stream is not None else sys.stderr
+        self.width = width
+
+    def emit(self, snapshot):
+        filled = int(self.width * (snapshot['percent'] or 0) / 100)
+        bar = '#' * filled + '-' * (self.width - filled)
+        end = '\n' if snapshot['status'] != 'running' else ''
+        self.stream.write(f"\r[{bar}] {format_snapshot(snapshot)}\033[K{end}")
+        self.stream.flush()
+
+
+class LogProgressSink:
+    """
+    Logs a progress line per snapshot.
+
+    Args:
+        level (int): The logging level (default: logging.INFO).
+    """
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def emit(self, snapshot):
+        logging.log(self.level, format_snapshot(snapshot))
+
+
+class JsonStatusSink:
+    """
+    Keeps a JSON status file with the latest snapshot of every stage, for schedulers to poll.
+
+    The file holds 'updated_at', 'current_stage' and 'stages' (stage name -> snapshot). It is
+    written to a temporary file and renamed, so readers never see it half-written.
+
+    Args:
+        path (str): The path of the status file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stages = {}
+
+    def emit(self, snapshot):
+        self.stages[snapshot['stage']] = snapshot
+        status = {
+            'updated_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'current_stage': snapshot['stage'] if snapshot['status'] == 'running' else None,
+            'stages': self.stages
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w') as status_file:
+            json.dump(status, status_file, indent=2)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,94 @@
+import random
+import zlib
+import numpy as np
+from faker import Faker
+
+
+def stream_seed_sequence(random_seed, table, block=0, increment=0, sub_block=None):
+    """
+    Returns the SeedSequence of a random stream, derived from the run's RANDOM_SEED.
+
+    Every (table, block) pair gets its own spawn key, so its stream does not depend on
+    how many draws other tables or blocks made, in which order they ran or in which
+    worker process. Appended increments add their number to the key, so an append run
+    does not repeat the draws of the run it extends. Sub-blocks split a block into fixed
+    groups of records with a stream each, so how the records are batched does not change
+    what is drawn for them.
+
+    Args:
+        random_seed (int): The configured RANDOM_SEED.
+        table (str): The table the stream is for (e.g. 'EKPO').
+        block (int): The block (shard) of the table (default: 0).
+        increment (int): The appended increment, 0 for a full run (default: 0).
+        sub_block (int): The group of records within the block, or None for the stream of the whole block (default).
+
+    Returns:
+        numpy.random.SeedSequence: The stream's seed sequence.
+    """
+    spawn_key = (zlib.crc32(table.encode()), block)
+    if sub_block is not None:
+        spawn_key += (increment, sub_block)
+    elif increment:
+        spawn_key += (increment,)
+    return np.random.SeedSequence(random_seed, spawn_key=spawn_key)
+
+def get_random_state(random_seed, table, block=0, increment=0, sub_block=None):
+    """
+    Returns a random stream with the legacy np.random API (randint, random, choice, ...)
+    backed by a Philox counter-based generator.
+
+    Args:
+        random_seed (int): The configured RANDOM_SEED.
+        table (str): The table the stream is for.
+        block (int): The block (shard) of the table (default: 0).
+        increment (int): The appended increment, 0 for a full run (default: 0).
+        sub_block (int): The group of records within the block, or None for the whole block (default).
+
+    Returns:
+        numpy.random.RandomState: The stream; it can be passed wherever np.random is used.
+    """
+    return np.random.RandomState(np.random.Philox(stream_seed_sequence(random_seed, table, block, increment, sub_block)))
+
+def _row_seed(random_seed, table, block=0, increment=0):
+    """Returns the integer seed of a (table, block) stream for the random, np.random and Faker APIs."""
+    return int(stream_seed_sequence(random_seed, table, block, increment).generate_state(1)[0])
+
+class RowStreams:
+    """
+    The random streams of a table generated row by row: a `random.Random` and a
+    `numpy.random.RandomState`, both seeded from the (table, block) stream. They draw
+    the same values as the global state seeded by seed_global_state, but tables whose
+    generators run interleaved (EKPO and EKBE under the in-process handoff) do not
+    share them.
+
+    Args:
+        random_seed (int): The configured RANDOM_SEED.
+        table (str): The table the streams are for.
+        block (int): The block (shard) of the table (default: 0).
+        increment (int): The appended increment, 0 for a full run (default: 0).
+    """
+
+    def __init__(self, random_seed, table, block=0, increment=0):
+        seed = _row_seed(random_seed, table, block, increment)
+        self.random = random.Random(seed)
+        self.np_random = np.random.RandomState(seed)
+
+def seed_global_state(random_seed, table, block=0, increment=0):
+    """
+    Seeds the global `random`, `np.random` and Faker state from a (table, block) stream,
+    for row-wise code that draws from the global generators.
+
+    Args:
+        random_seed (int): The configured RANDOM_SEED.
+        table (str): The table about to be generated.
+        block (int): The block (shard) of the table (default: 0).
+        increment (int): The appended increment, 0 for a full run (default: 0).
+
+    Returns:
+        int: The seed that was set.
+    """
+    seed = _row_seed(random_seed, table, block, increment)
+    random.seed(seed)
+    np.random.seed(seed)
+    Faker.seed(seed)
+    return seed
@@ -0,0 +1,157 @@
+import copy
+import logging
+import os
+import re
+import shutil
+import numpy as np
+from src.data_generator.utilities import _import_pyarrow
+
+
+# Transactional tables generated per shard, in generation order
+SHARDED_TABLES = ['EKKO', 'EKPO', 'EKBE']
+
+def split_proportionally(total, weights):
+    """
+    Splits a total into integer parts proportional to weights, the first parts getting the remainder.
+
+    Args:
+        total (int): The amount to split.
+        weights (numpy.ndarray): The relative size of each part.
+
+    Returns:
+        numpy.ndarray: The part sizes, summing to `total`.
+    """
+    weights = np.asarray(weights, dtype=np.int64)
+    sizes = total * weights // weights.sum()
+    sizes[:total - sizes.sum()] += 1
+    return sizes
+
+def count_shards(config, shard_size):
+    """Returns the number of shards of at most `shard_size` PO headers that NUM_PO_HEADERS is split into."""
+    return max(1, -(-config.NUM_PO_HEADERS // shard_size))
+
+def plan_shards(config, id_allocator, shard_size):
+    """
+    Splits the PO headers and the EKPO/EKBE targets into shards of `shard_size` PO headers
+    with disjoint ID ranges.
+
+    Shards are fixed blocks of the output: how many there are depends only on the
+    configuration, never on the number of workers, and every shard draws from its own
+    random streams (see rng.py). The merged output is therefore the same whether the
+    shards run in one process or in many. Each shard reserves a contiguous range of PO
+    numbers from the allocator. GR and INV document numbers are reserved per shard from
+    the shard's share of NUM_PO_HISTORY_TARGET, which bounds how many of either it can create.
+
+    Args:
+        config (Config): The run configuration.
+        id_allocator (IdAllocator): The run's ID allocator; the ranges are reserved from it.
+        shard_size (int): The number of PO headers per shard (the last shard may have fewer).
+
+    Returns:
+        list: One dictionary per shard with its targets and the ID high-water marks it starts from.
+    """
+    num_shards = count_shards(config, shard_size)
+    headers = np.full(num_shards, shard_size, dtype=np.int64)
+    headers[-1] = config.NUM_PO_HEADERS - shard_size * (num_shards - 1)
+    line_items = split_proportionally(config.NUM_PO_LINE_ITEMS_TARGET, headers)
+    history = split_proportionally(config.NUM_PO_HISTORY_TARGET, headers)
+    reserved = [{
+        'EBELN': id_allocator.reserve('EBELN', int(headers[shard_id]))[0] - 1,
+        'GR': id_allocator.reserve('GR', int(history[shard_id]))[0] - 1,
+        'INV': id_allocator.reserve('INV', int(history[shard_id]))[0] - 1
+    } for shard_id in range(num_shards)]
+
+    return [{
+        'shard_id': shard_id,
+        'NUM_PO_HEADERS': int(headers[shard_id]),
+        'NUM_PO_LINE_ITEMS_TARGET': int(line_items[shard_id]),
+        'NUM_PO_HISTORY_TARGET': int(history[shard_id]),
+        'id_offsets': reserved[shard_id]
+    } for shard_id in range(num_shards)]
+
+def shard_config(config, shard):
+    """
+    Returns a copy of the configuration with the shard's targets.
+
+    Args:
+        config (Config): The run configuration.
+        shard (dict): A shard from plan_shards.
+
+    Returns:
+        Config: The shard's configuration.
+    """
+    config = copy.copy(config)
+    for key_name in ['NUM_PO_HEADERS', 'NUM_PO_LINE_ITEMS_TARGET', 'NUM_PO_HISTORY_TARGET']:
+        setattr(config, key_name, shard[key_name])
+    return config
+
+def part_filename(table, shard_id, extension='csv'):
+    """Returns the part file name of a table for a shard (e.g. 'EKPO-00003.csv')."""
+    return f"{table}-{shard_id:05d}.{extension}"
+
+def append_name(table, increment):
+    """Returns the name an appended increment of a table is written under (e.g. 'EKPO-append-00002')."""
+    return f"{table}-append-{increment:05d}"
+
+def table_files(output_dir, table, extension='csv'):
+    """Returns the paths of all files holding rows of a table: its file, part files and appended increments."""
+    return sorted(os.path.join(output_dir, name) for name in os.listdir(output_dir)
+                  if name == f"{table}.{extension}" or (name.startswith(f"{table}-") and name.endswith(f".{extension}")))
+
+def next_append_increment(output_dir, extension='csv'):
+    """Returns the number of the next appended increment in output_dir: 1 for the first append."""
+    pattern = re.compile(rf"^(?:{'|'.join(SHARDED_TABLES)})-append-(\d+)(?:-\d+)?\.{extension}$")
+    increments = [int(match.group(1)) for match in map(pattern.match, os.listdir(output_dir)) if match]
+    return max(increments, default=0) + 1
+
+def merge_part_files(output_dir, table, num_shards, extension='csv', compression='snappy'):
+    """
+    Concatenates a table's part files, in shard order, into the table's file and removes
+    the parts. CSV parts are appended byte-wise keeping only the first header; Parquet
+    parts are copied row group by row group into one file.
+
+    Args:
+        output_dir (str): The directory holding the part files.
+        table (str): The table name (e.g. 'EKBE').
+        num_shards (int): The number of shards that were generated.
+        extension (str): The file extension, 'csv' or 'parquet' (default: 'csv').
+        compression (str): The Parquet compression codec of the merged file (default: 'snappy').
+
+    Returns:
+        str: The path of the merged file.
+    """
+    filepath = os.path.join(output_dir, f"{table}.{extension}")
+    part_paths = [os.path.join(output_dir, part_filename(table, shard_id, extension)) for shard_id in range(num_shards)]
+    part_paths = [part_path for part_path in part_paths if os.path.exists(part_path)] # Shards may produce no rows for a table
+
+    if extension == 'parquet':
+        _merge_parquet_parts(filepath, part_paths, compression)
+    else:
+        header_written = False
+        with open(filepath, 'wb') as merged:
+            for part_path in part_paths:
+                with open(part_path, 'rb') as part:
+                    header = part.readline()
+                    if not header_written:
+                        merged.write(header)
+                        header_written = True
+                    shutil.copyfileobj(part, merged)
+    for part_path in part_paths:
+        os.remove(part_path)
+    logging.info(f"Merged {len(part_paths)} {table} part files into {filepath}")
+    return filepath
+
+def _merge_parquet_parts(filepath, part_paths, compression):
+    """Copies the row groups of Parquet part files, which share the table's schema, into one file."""
+    _, pq = _import_pyarrow()
+    writer = None
+    try:
+        for part_path in part_paths:
+            part = pq.ParquetFile(part_path)
+            if writer is None:
+                writer = pq.ParquetWriter(filepath, part.schema_arrow, compression=compression)
+            for row_group in range(part.metadata.num_row_groups):
+                writer.write_table(part.read_row_group(row_group))
+    finally:
+        if writer is not None:
+            writer.close()
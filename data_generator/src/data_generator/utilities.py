@@ -8,6 +8,9 @@ import os
 import math
 import logging
 import os
+import functools
+import time
+from src.data_generator.CalendarSampler import CalendarSampler
 
 def get_random_date(start_date, end_date):
     """
@@ -26,6 +29,27 @@ def get_random_date(start_date, end_date):
     random_date = start_date + datetime.timedelta(days=random_number_of_days)
     return random_date
 
+def get_random_dates(start_date, end_date, size, rng=None):
+    """
+    Generates an array of random dates between two given dates.
+
+    Vectorized counterpart of get_random_date: every date is drawn uniformly from
+    [start_date, end_date) in a single NumPy call.
+
+    Args:
+        start_date (datetime.date): The start of the date range.
+        end_date (datetime.date): The end of the date range.
+        size (int): The number of dates to generate.
+        rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+    Returns:
+        numpy.ndarray: An array of datetime64[D] values within the specified range.
+    """
+    rng = np.random if rng is None else rng
+    days_between_dates = (end_date - start_date).days
+    random_number_of_days = rng.randint(0, days_between_dates, size=size)
+    return np.datetime64(start_date, 'D') + random_number_of_days
+
 def generate_id(prefix, last_id,num_digits):
     """
     Generates a new sequential ID with a given prefix, incrementing from the last known ID.
@@ -49,7 +73,24 @@ def generate_id(prefix, last_id,num_digits):
     formatted_number = str(next_number).zfill(num_digits)
     return prefix + formatted_number
 
-def get_random_date_in_range(start_date, days_ahead_min, days_ahead_max):
+def generate_ids(prefix, start, count, num_digits):
+    """
+    Generates a block of sequential IDs with a given prefix in one vectorized step.
+
+    Args:
+        prefix (str): The string prefix for the IDs (e.g., 'V').
+        start (int): The numeric part of the first ID in the block.
+        count (int): The number of IDs to generate.
+        num_digits (int): The number of digits the numeric part should have, padded with leading zeros.
+
+    Returns:
+        numpy.ndarray: An array of IDs (e.g., ['V0000001', 'V0000002', ...]), identical to
+                       calling generate_id repeatedly starting from start - 1.
+    """
+    numbers = np.arange(start, start + count).astype(str)
+    return np.char.add(prefix, np.char.zfill(numbers, num_digits))
+
+def get_random_date_in_range(start_date, days_ahead_min, days_ahead_max, py_random=None):
     """
     Generates a random date that is a certain number of days ahead of a given start date.
 
@@ -57,13 +98,37 @@ def get_random_date_in_range(start_date, days_ahead_min, days_ahead_max):
         start_date (datetime.date): The base date from which to calculate the future date.
         days_ahead_min (int): The minimum number of days to add to the start date.
         days_ahead_max (int): The maximum number of days to add to the start date.
+        py_random (random.Random): Random stream to draw from (default: the global random state).
 
     Returns:
         datetime.date: A random date in the future, based on the specified range.
     """
-    days_ahead = random.randint(days_ahead_min, days_ahead_max)
+    py_random = random if py_random is None else py_random
+    days_ahead = py_random.randint(days_ahead_min, days_ahead_max)
     return start_date + datetime.timedelta(days=days_ahead)
 
+def get_random_dates_in_range(start_dates, days_ahead_min, days_ahead_max, size=None, rng=None):
+    """
+    Generates random dates a number of days ahead of start dates.
+
+    Vectorized counterpart of get_random_date_in_range: each date is start + randint(min, max),
+    both ends included, e.g. a vector of PO dates gives a vector of delivery dates.
+
+    Args:
+        start_dates (array-like or datetime.date): The base dates, or a single base date.
+        days_ahead_min (int): The minimum number of days to add.
+        days_ahead_max (int): The maximum number of days to add.
+        size (int): Number of dates to draw when start_dates is a single date (default: one per start date).
+        rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+    Returns:
+        numpy.ndarray: An array of datetime64[D] values.
+    """
+    rng = np.random if rng is None else rng
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+    shape = start_dates.shape if size is None else size
+    return start_dates + rng.randint(days_ahead_min, days_ahead_max + 1, size=shape)
+
 def weighted_choice(choices, weights):
     """
     Selects a single item from a list of choices based on a corresponding list of weights.
@@ -77,6 +142,128 @@ def weighted_choice(choices, weights):
     """
     return random.choices(choices, weights=weights, k=1)[0]
 
+class AliasSampler:
+    """
+    Reusable weighted sampler over a fixed set of items (Walker's alias method).
+
+    The alias table is built once in O(n); every draw then costs O(1) regardless of the
+    number of items, for single draws as well as for `size=N` arrays. Use it instead of
+    weighted_choice when the same weights are sampled from many times.
+
+    Args:
+        items (array-like): The items to draw.
+        weights (array-like): Non-negative weight of each item; they need not sum to 1.
+    """
+
+    def __init__(self, items, weights):
+        self.items = np.asarray(items)
+        weights = np.asarray(weights, dtype=float)
+        if len(weights) != len(self.items) or len(weights) == 0:
+            raise ValueError("AliasSampler needs one weight per item and at least one item.")
+        if (weights < 0).any() or not np.isfinite(weights).all() or weights.sum() <= 0:
+            raise ValueError("AliasSampler weights must be finite, non-negative and not all zero.")
+
+        num_items = len(weights)
+        scaled = weights * num_items / weights.sum()
+        self.probabilities = np.ones(num_items)
+        self.aliases = np.arange(num_items)
+        small = [i for i in range(num_items) if scaled[i] < 1.0]
+        large = [i for i in range(num_items) if scaled[i] >= 1.0]
+        # Fill each under-full slot with the remainder of an over-full item
+        while small and large:
+            less, more = small.pop(), large[-1]
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(large.pop())
+        # Whatever is left is full up to rounding errors and keeps probability 1
+
+    def __len__(self):
+        return len(self.items)
+
+    def sample_indices(self, size=None, rng=None):
+        """
+        Draws positions into items.
+
+        Args:
+            size (int): Number of draws, or None for a single draw.
+            rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+        Returns:
+            numpy.ndarray or int: The drawn positions.
+        """
+        rng = np.random if rng is None else rng
+        slots = rng.randint(0, len(self.items), size)
+        indices = np.where(rng.random_sample(size) < self.probabilities[slots], slots, self.aliases[slots])
+        return int(indices) if size is None else indices
+
+    def sample(self, size=None, rng=None):
+        """
+        Draws items according to their weights.
+
+        Args:
+            size (int): Number of draws, or None for a single item.
+            rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+        Returns:
+            numpy.ndarray or any: The drawn items, or a single item if size is None.
+        """
+        return self.items[self.sample_indices(size, rng)]
+
+def draw_capped_flags(size, probability, max_count):
+    """
+    Draws an array of boolean flags that are set with a given probability, keeping at most
+    max_count flags set.
+
+    Mirrors the row-wise pattern `random.random() < probability and count < max_count`:
+    candidates are accepted in order until the cap is reached.
+
+    Args:
+        size (int): The number of flags to draw.
+        probability (float): The probability of each flag being set.
+        max_count (float): The maximum number of flags that may be set.
+
+    Returns:
+        numpy.ndarray: A boolean array of length size.
+    """
+    flags = np.random.random(size) < probability
+    flags &= (np.cumsum(flags) - 1) < max_count
+    return flags
+
+def sample_without_replacement(population_size, k, rng=None):
+    """
+    Draws k distinct integers from range(population_size) in random order.
+
+    Memory grows with k rather than with population_size: populations that are not much
+    larger than k are permuted directly, larger ones are sampled by drawing batches of
+    random integers and discarding duplicates until k distinct values are collected.
+
+    Args:
+        population_size (int): The size of the population to sample from.
+        k (int): The number of distinct values to draw.
+        rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+    Returns:
+        numpy.ndarray: An int64 array of k distinct values in random order.
+
+    Raises:
+        ValueError: If k is larger than population_size.
+    """
+    rng = np.random if rng is None else rng
+    if k > population_size:
+        raise ValueError(f"Cannot draw {k} distinct values from a population of {population_size}.")
+    if population_size <= 4 * k:
+        return rng.permutation(population_size)[:k].astype(np.int64)
+
+    selected = np.empty(0, dtype=np.int64)
+    while len(selected) < k:
+        missing = k - len(selected)
+        draws = rng.randint(0, population_size, size=missing + missing // 4 + 16, dtype=np.int64)
+        selected = np.unique(np.concatenate([selected, draws]))
+    # np.unique sorts, so shuffle before truncating to keep the subset uniform
+    return rng.permutation(selected)[:k]
+
 def calculate_net_value(quantity, unit_price):
     """
     Calculates the net value by multiplying quantity and unit price, rounded to 2 decimal places.
@@ -90,7 +277,106 @@ def calculate_net_value(quantity, unit_price):
     """
     return round(quantity * unit_price, 2)
 
-def save_dataframe(df, filename, output_dir, output_format):
+def calculate_net_values(quantities, unit_prices):
+    """
+    Calculates net values for arrays of quantities and unit prices, rounded to 2 decimal places.
+
+    Vectorized counterpart of calculate_net_value. NumPy rounds the scaled value, so
+    a product that lies exactly on a half cent may round differently from Python's round.
+
+    Args:
+        quantities (array-like): The numbers of units.
+        unit_prices (array-like): The prices per unit.
+
+    Returns:
+        numpy.ndarray: The float64 net values.
+    """
+    return np.round(np.asarray(quantities, dtype=float) * np.asarray(unit_prices, dtype=float), 2)
+
+# Column types of the generated tables. Parquet files are written with these fixed
+# schemas, so every chunk (and every shard) of a table has the same column types.
+TABLE_SCHEMAS = {
+    'LFA1': {
+        'LIFNR': 'string', 'NAME1': 'string', 'LAND1': 'string', 'ORT01': 'string', 'KTOKK': 'string',
+        'ERDAT': 'date32', 'STRAS': 'string', 'SMTP_ADDR': 'string', 'SPERR': 'string'
+    },
+    'MARA': {
+        'MATNR': 'string', 'MAKTX': 'string', 'MTART': 'string', 'MATKL': 'string', 'MEINS': 'string',
+        'ERSDA': 'date32', 'BRGEW': 'float64', 'NTGEW': 'float64', 'BASE_PRICE': 'float64'
+    },
+    'vendor_contract': {
+        'CONTRACT_ID': 'string', 'LIFNR': 'string', 'MATNR': 'string', 'CONTRACT_PRICE': 'float64',
+        'VALID_FROM': 'date32', 'VALID_TO': 'date32', 'VOLUME_COMMITMENT': 'int64', 'CONTRACT_TYPE': 'string'
+    },
+    'EKKO': {
+        'EBELN': 'string', 'BUKRS': 'string', 'BSART': 'string', 'AEDAT': 'date32', 'LIFNR': 'string',
+        'WAERS': 'string', 'EKORG': 'string', 'EKGRP': 'string', 'BEDAT': 'date32'
+    },
+    'EKPO': {
+        'EBELN': 'string', 'EBELP': 'string', 'MATNR': 'string', 'MENGE': 'int64', 'MEINS': 'string',
+        'NETPR': 'float64', 'NETWR': 'float64', 'EINDT': 'date32', 'WERKS': 'string', 'MATKL': 'string',
+        'LIFNR': 'string', 'PO_DATE': 'date32'
+    },
+    'EKBE': {
+        'EBELN': 'string', 'EBELP': 'string', 'BEWTP': 'string', 'BUDAT': 'date32', 'MENGE': 'int64',
+        'DMBTR': 'float64', 'BELNR': 'string', 'ACTUAL_DELIVERY_DATE': 'date32'
+    }
+}
+
+def _import_pyarrow():
+    """Imports pyarrow, which is only needed for Parquet output."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow).") from e
+    return pa, pq
+
+def get_parquet_schema(filename):
+    """
+    Returns the fixed Parquet schema of a generated table.
+
+    Args:
+        filename (str): The table's file name (e.g. 'EKPO.parquet' or the part file 'EKPO-00001.parquet').
+
+    Returns:
+        pyarrow.Schema or None: The table's schema, or None for tables without a definition.
+    """
+    pa, _ = _import_pyarrow()
+    table = os.path.splitext(os.path.basename(filename))[0].split('-')[0]
+    column_types = TABLE_SCHEMAS.get(table)
+    if column_types is None:
+        return None
+    return pa.schema([(column, getattr(pa, type_name)()) for column, type_name in column_types.items()])
+
+def to_arrow_table(df, schema=None):
+    """
+    Converts a DataFrame to a pyarrow Table, coercing its columns to a fixed schema.
+
+    Dates may arrive as datetime.date objects, datetime64 values or 'YYYY-MM-DD' strings
+    and missing dates become nulls. Columns that are not in the schema are dropped.
+
+    Args:
+        df (pd.DataFrame): The rows to convert.
+        schema (pyarrow.Schema): The target schema, or None to infer it from the DataFrame.
+
+    Returns:
+        pyarrow.Table: The converted rows.
+    """
+    pa, _ = _import_pyarrow()
+    if schema is None:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    arrays = []
+    for field in schema:
+        values = df[field.name]
+        if pa.types.is_date32(field.type):
+            values = pd.to_datetime(values).to_numpy().astype('datetime64[D]')
+        elif pa.types.is_string(field.type):
+            values = values.astype(str)
+        arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def save_dataframe(df, filename, output_dir, output_format, compression='snappy'):
     """
     Saves a pandas DataFrame to a file in either CSV or Parquet format.
 
@@ -101,6 +387,7 @@ def save_dataframe(df, filename, output_dir, output_format):
         filename (str): The name of the output file (e.g., 'data.csv').
         output_dir (str): The directory where the file will be saved.
         output_format (str): The format to save the file in. Supported values are "csv" and "parquet".
+        compression (str): The Parquet compression codec (default: 'snappy').
 
     Returns:
         None: This function does not return a value. It prints a confirmation message to the console.
@@ -110,17 +397,23 @@ def save_dataframe(df, filename, output_dir, output_format):
     if output_format == "csv":
         df.to_csv(filepath, index=False)
     elif output_format == "parquet":
-        df.to_parquet(filepath, index=False)
+        _, pq = _import_pyarrow()
+        pq.write_table(to_arrow_table(df, get_parquet_schema(filename)), filepath, compression=compression)
     logging.info(f"Saved {len(df)} records to {filepath}")
 
 
-def save_generator_to_dataframe(generator_func, filename, output_dir, output_format, chunk_size=10000):
+def save_generator_to_dataframe(generator_func, filename, output_dir, output_format, chunk_size=10000,
+                                row_group_size=None, compression='snappy', transform=None, on_chunk=None):
     """
     Reads rows from a generator function, accumulates them into DataFrames in chunks,
     and then saves these DataFrames to a file in either CSV or Parquet format.
+
+    Parquet is streamed: a single writer stays open and every chunk is appended as a row
+    group, so memory is bounded by the chunk size and not by the size of the table.
     Args:
         generator_func (callable): A function that, when called, returns a generator
-                                   yielding dictionaries or lists representing rows.
+                                   yielding dictionaries or lists representing rows,
+                                   or DataFrames holding a batch of rows each.
                                    
         filename (str): The name of the output file (e.g., 'data.csv').
 
@@ -129,65 +422,158 @@ def save_generator_to_dataframe(generator_func, filename, output_dir, output_for
         output_format (str): The format to save the file in. Supported values are "csv" and "parquet".
 
         chunk_size (int): The number of rows to accumulate before writing a chunk to the file.
+
+        row_group_size (int): The maximum number of rows per Parquet row group; larger
+                              chunks are split (default: one row group per chunk).
+
+        compression (str): The Parquet compression codec (default: 'snappy').
+
+        transform (callable): Applied to each chunk (DataFrame) right before it is written,
+                              e.g. to format integer IDs (default: None).
+
+        on_chunk (callable): Called after every chunk written with its rows, bytes and the wall and
+                             CPU seconds spent writing it, e.g. to report progress (default: None).
                           
     Returns:
         None: This function does not return a value. It prints a confirmation message to the console.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    filepath = os.path.join(output_dir, filename)
+    if output_format not in ("csv", "parquet"):
+        logging.error(f"Unsupported output format: {output_format}")
+        return
+
+    writer = TableWriter(filename, output_dir, output_format, chunk_size, row_group_size, compression, transform, on_chunk)
+    try:
+        for item in generator_func():
+            writer.write(item)
+    except Exception as e:
+        logging.error(f"An error occurred while saving data: {e}")
+        raise # Re-raise the exception after logging
+    finally:
+        writer.close()
+
+def tee_generator_to_file(generator, filename, output_dir, output_format, chunk_size=10000,
+                          row_group_size=None, compression='snappy', transform=None, on_chunk=None):
+    """
+    Passes the items of a generator through unchanged while writing them to a file.
 
-    total_records_saved = 0
-    first_chunk = True
-    rows_buffer = []
+    This lets the next generation stage consume a table's records in process, as they
+    are produced, with the file on disk only as a sink. The file is complete once the
+    returned generator is exhausted, so a consumer that stops early must drain it.
 
+    Args:
+        generator (iterator): Yields dictionaries representing rows, or DataFrames of rows.
+        filename (str): The name of the output file (e.g., 'EKPO.csv').
+        output_dir (str): The directory where the file will be saved.
+        output_format (str): "csv" or "parquet".
+        chunk_size (int): The number of rows to accumulate before writing a chunk to the file.
+        row_group_size (int): The maximum number of rows per Parquet row group.
+        compression (str): The Parquet compression codec (default: 'snappy').
+        transform (callable): Applied to each chunk before it is written; the yielded items are not changed.
+        on_chunk (callable): Called after every chunk written with its rows, bytes, wall and CPU seconds (default: None).
+
+    Yields:
+        dict or pd.DataFrame: The generator's items, in order.
+    """
+    writer = TableWriter(filename, output_dir, output_format, chunk_size, row_group_size, compression, transform, on_chunk)
     try:
-        for row in generator_func():
-            rows_buffer.append(row)
+        for item in generator:
+            writer.write(item)
+            yield item
+    finally:
+        writer.close()
 
-            if len(rows_buffer) >= chunk_size:
-                df_chunk = pd.DataFrame(rows_buffer)
-                
-                if output_format == "csv":
-                    # For CSV, append if not the first chunk, otherwise write header
-                    df_chunk.to_csv(filepath, mode='a' if not first_chunk else 'w', 
-                                    header=first_chunk, index=False)
-                elif output_format == "parquet":
-                    pass 
-                else:
-                    logging.error(f"Unsupported output format: {output_format}")
-                    return
-
-                total_records_saved += len(df_chunk)
-                #logging.info(f"Processed and saved {len(df_chunk)} records. Total: {total_records_saved}")
-                rows_buffer = []  # Clear buffer
-                first_chunk = False
-
-        # Save any remaining rows in the buffer
-        if rows_buffer:
-            df_chunk = pd.DataFrame(rows_buffer)
-            if output_format == "csv":
-                df_chunk.to_csv(filepath, mode='a' if not first_chunk else 'w', 
-                                header=first_chunk, index=False)
-            elif output_format == "parquet":
-                pass # Handled below
-            
-            total_records_saved += len(df_chunk)
-            #logging.info(f"Processed and saved {len(df_chunk)} remaining records. Total: {total_records_saved}")
+class TableWriter:
+    """
+    Writes a table chunk by chunk to CSV or Parquet.
 
-        # For Parquet, if we accumulated all data in memory (which is the default behavior
-        # for `pd.to_parquet` when not using a streaming writer), we need to create
-        # the full DataFrame and save it.
-        if output_format == "parquet":
-            pass
-            
-            logging.info(f"Saved {total_records_saved} records to {filepath}")
+    Rows are buffered up to `chunk_size` before they are written, DataFrame batches are
+    written as they are. Parquet is streamed: a single writer stays open and every chunk is
+    appended as a row group, so memory is bounded by the chunk size and not by the table size.
 
-    except Exception as e:
-        logging.error(f"An error occurred while saving data: {e}")
-        raise # Re-raise the exception after logging
-     
-    logging.info(f"Saved {total_records_saved} records to {filepath}")
-    logging.info(f"{filename} data successfully saved to {filepath} in csv format.")
+    Args:
+        filename (str): The name of the output file (e.g., 'data.csv').
+        output_dir (str): The directory where the file will be saved.
+        output_format (str): "csv" or "parquet".
+        chunk_size (int): The number of rows to accumulate before writing a chunk.
+        row_group_size (int): The maximum number of rows per Parquet row group (default: one per chunk).
+        compression (str): The Parquet compression codec (default: 'snappy').
+        transform (callable): Applied to each chunk (DataFrame) right before it is written (default: None).
+        on_chunk (callable): Called after every chunk written with its rows, bytes, wall and CPU seconds (default: None).
+    """
+
+    def __init__(self, filename, output_dir, output_format, chunk_size=10000, row_group_size=None, compression='snappy',
+                 transform=None, on_chunk=None):
+        os.makedirs(output_dir, exist_ok=True)
+        self.filename = filename
+        self.filepath = os.path.join(output_dir, filename)
+        self.output_format = output_format
+        self.chunk_size = chunk_size
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.transform = transform
+        self.on_chunk = on_chunk
+        self.total_records_saved = 0
+        self.bytes_written = 0
+        self.rows_buffer = []
+        self.first_chunk = True
+        self.parquet_writer = None
+        self.schema = get_parquet_schema(filename) if output_format == "parquet" else None
+        self.closed = False
+
+    def write(self, item):
+        """Writes a row (dictionary) or a batch of rows (DataFrame)."""
+        if isinstance(item, pd.DataFrame):
+            # Batch-mode generators yield column batches, which are written as they are
+            self._flush_rows()
+            self._write_chunk(item)
+        else:
+            self.rows_buffer.append(item)
+            if len(self.rows_buffer) >= self.chunk_size:
+                self._flush_rows()
+
+    def close(self):
+        """Writes any buffered rows and closes the file."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._flush_rows()
+            # An empty table still leaves a valid (empty) Parquet file behind
+            if self.output_format == "parquet" and self.parquet_writer is None and self.schema is not None:
+                _, pq = _import_pyarrow()
+                pq.write_table(self.schema.empty_table(), self.filepath, compression=self.compression)
+        finally:
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+        logging.info(f"Saved {self.total_records_saved} records to {self.filepath}")
+        logging.info(f"{self.filename} data successfully saved to {self.filepath} in {self.output_format} format.")
+
+    def _flush_rows(self):
+        if self.rows_buffer:
+            self._write_chunk(pd.DataFrame(self.rows_buffer))
+            self.rows_buffer = []  # Clear buffer
+
+    def _write_chunk(self, df_chunk):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if self.transform is not None:
+            df_chunk = self.transform(df_chunk)
+        if self.output_format == "csv":
+            # For CSV, append if not the first chunk, otherwise write header
+            df_chunk.to_csv(self.filepath, mode='a' if not self.first_chunk else 'w', 
+                            header=self.first_chunk, index=False)
+        else:
+            table = to_arrow_table(df_chunk, self.schema)
+            if self.parquet_writer is None:
+                _, pq = _import_pyarrow()
+                self.parquet_writer = pq.ParquetWriter(self.filepath, table.schema, compression=self.compression)
+            self.parquet_writer.write_table(table, row_group_size=self.row_group_size or len(df_chunk) or None)
+        self.total_records_saved += len(df_chunk)
+        self.first_chunk = False
+        if self.on_chunk is not None:
+            size = os.path.getsize(self.filepath) if os.path.exists(self.filepath) else self.bytes_written
+            self.on_chunk(len(df_chunk), size - self.bytes_written,
+                          time.perf_counter() - wall_start, time.process_time() - cpu_start)
+            self.bytes_written = size
 
 
 
@@ -209,35 +595,79 @@ def log_normal_int(mean, std_dev_factor=0.5, min_val=1, max_val=None):
     Returns:
         int: An integer sampled from the log-normal distribution, clamped between min_val and max_val.
     """
-    # Adjust mean for log-normal distribution
-    mu = np.log(mean**2 / np.sqrt(mean**2 + (mean * std_dev_factor)**2))
-    sigma = np.sqrt(np.log(1 + (mean * std_dev_factor)**2 / mean**2))
+    mu, sigma = _get_log_normal_params(mean, std_dev_factor)
     val = int(np.round(np.random.lognormal(mu, sigma)))
     if max_val is not None:
         return max(min_val, min(max_val, val))
     return max(min_val, val)
 
+def log_normal_ints(mean, size, std_dev_factor=0.5, min_val=1, max_val=None, rng=None):
+    """
+    Generates an array of integers from a log-normal distribution, clamped within a min/max range.
+
+    Vectorized counterpart of log_normal_int with the same distribution parameters.
+
+    Args:
+        mean (float): The desired mean of the distribution.
+        size (int): The number of values to generate.
+        std_dev_factor (float, optional): The standard deviation relative to the mean. Defaults to 0.5.
+        min_val (int, optional): The minimum value. Defaults to 1.
+        max_val (int or None, optional): The maximum value, or None for no upper limit. Defaults to None.
+        rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+    Returns:
+        numpy.ndarray: int64 values clamped between min_val and max_val.
+    """
+    rng = np.random if rng is None else rng
+    mu, sigma = _get_log_normal_params(mean, std_dev_factor)
+    values = np.round(rng.lognormal(mu, sigma, size)).astype(np.int64)
+    return np.clip(values, min_val, max_val)
+
+@functools.lru_cache(maxsize=None)
+def _get_log_normal_params(mean, std_dev_factor):
+    """Returns the (mu, sigma) of a log-normal distribution with the given mean and relative standard deviation."""
+    # Adjust mean for log-normal distribution
+    mu = math.log(mean**2 / math.sqrt(mean**2 + (mean * std_dev_factor)**2))
+    sigma = math.sqrt(math.log(1 + (mean * std_dev_factor)**2 / mean**2))
+    return mu, sigma
+
 def get_q4_multiplier(q4_increase_percentage,start_date, end_dat):
     """
-    Returns a multiplier to simulate increased activity during the fourth quarter (Q4).
+    Returns a random PO date, with a share of dates forced into the fourth quarter (Q4).
+
+    With probability q4_increase_percentage the date is drawn from the Q4 days (October,
+    November, December) of the range, otherwise from the whole range. The dates come from
+    a cached CalendarSampler, so no dates are redrawn.
 
     Args:
-        date (datetime.date): The date to check if it falls within Q4 (October, November, December).
         q4_increase_percentage (float): The percentage increase as a decimal (e.g., 0.2 for a 20% increase).
+        start_date (datetime.date): The start of the date range.
+        end_dat (datetime.date): The end of the date range.
 
     Returns:
-        float: A multiplier of (1 + q4_increase_percentage) if the date is in Q4, otherwise returns 1.0.
+        datetime.date: The random date.
     """
-    date=get_random_date(start_date,end_dat)
-    ran_num=random.random()
-    while ran_num<q4_increase_percentage:
-        if date.month in [10,11,12]:
-            return date 
-        else:
-            date=get_random_date(start_date,end_dat)
-    return date
+    return get_calendar_sampler(start_date, end_dat, q4_increase_percentage).sample()
 
-def get_delivery_delay_days(delay_distribution):
+@functools.lru_cache(maxsize=None)
+def get_calendar_sampler(start_date, end_date, q4_increase_percentage=0.0, month_end_uplift=0.0, weekday_weights=None):
+    """
+    Returns a CalendarSampler for a date range and seasonal profile, built once per arguments.
+
+    Args:
+        start_date (datetime.date): The start of the date range.
+        end_date (datetime.date): The end of the date range.
+        q4_increase_percentage (float): Share of dates forced into Q4.
+        month_end_uplift (float): Extra weight of the last days of each month.
+        weekday_weights (tuple): Seven relative weights, Monday first, or None.
+
+    Returns:
+        CalendarSampler: The sampler.
+    """
+    return CalendarSampler.from_profiles(start_date, end_date, q4_increase_percentage=q4_increase_percentage,
+                                         month_end_uplift=month_end_uplift, weekday_weights=weekday_weights)
+
+def get_delivery_delay_days(delay_distribution, py_random=None, rng=None):
     """
     Calculates a random number of delivery delay days based on a weighted distribution of time ranges.
 
@@ -245,21 +675,56 @@ def get_delivery_delay_days(delay_distribution):
         delay_distribution (dict): A dictionary where keys are strings representing delay ranges
                                    (e.g., '1-7_days', '8-14_days') and values are the weights (probabilities)
                                    for those ranges.
+        py_random (random.Random): Random stream the days are drawn from (default: the global random state).
+        rng (numpy.random.RandomState): Random stream the range is drawn from (default: the global np.random state).
 
     Returns:
         int: A random integer representing the number of delay days. Returns 0 if the chosen range
              is not recognized or if an unexpected choice is made.
     """
-    choice = weighted_choice(list(delay_distribution.keys()), list(delay_distribution.values()))
+    py_random = random if py_random is None else py_random
+    choice = _get_delay_bucket_sampler(tuple(delay_distribution.items())).sample(rng=rng)
     if choice == '1-7_days':
-        return random.randint(1, 7)
+        return py_random.randint(1, 7)
     elif choice == '8-14_days':
-        return random.randint(8, 14)
+        return py_random.randint(8, 14)
     elif choice == '15-30_days':
-        return random.randint(15, 30)
+        return py_random.randint(15, 30)
     return 0 # Should not happen if distribution sums to 1
 
 
+# Day ranges of the DELAY_DISTRIBUTION buckets, as used by get_delivery_delay_days
+DELAY_BUCKET_RANGES = {
+    '1-7_days': (1, 7),
+    '8-14_days': (8, 14),
+    '15-30_days': (15, 30)
+}
+
+@functools.lru_cache(maxsize=None)
+def _get_delay_bucket_sampler(delay_buckets):
+    """Returns an AliasSampler over the (range key, weight) pairs of a DELAY_DISTRIBUTION, built once."""
+    keys, weights = zip(*delay_buckets)
+    return AliasSampler(keys, weights)
+
+def get_delivery_delays(delay_distribution, size, rng=None):
+    """
+    Draws delivery delay days for many deliveries at once (batch version of get_delivery_delay_days).
+
+    Args:
+        delay_distribution (dict): Delay range keys (e.g. '1-7_days') mapped to their weights.
+        size (int): The number of delays to draw.
+        rng (numpy.random.RandomState): Random stream to draw from (default: the global np.random state).
+
+    Returns:
+        numpy.ndarray: Delay days per delivery; 0 for ranges that are not recognized.
+    """
+    rng = np.random if rng is None else rng
+    bounds = np.array([DELAY_BUCKET_RANGES.get(key, (0, 0)) for key in delay_distribution])
+    bucket = _get_delay_bucket_sampler(tuple(delay_distribution.items())).sample_indices(size, rng)
+    low, high = bounds[bucket, 0], bounds[bucket, 1]
+    return low + np.floor(rng.random_sample(size) * (high - low + 1)).astype(int)
+
+
 def _validate_configuration_variables(self, key_name, type,num_type=None, min_val=None, max_val=None, exclusive_min=False, exclusive_max=False):
         """
         Helper method to validate if a config value is Valid
@@ -412,3 +877,95 @@ def read_csv_rows_generator(filepath, encoding='utf-8', delimiter=',', quotechar
         raise Exception(f"An unexpected error occurred: {e}")
 
 
+def read_csv_batches_generator(filepath, batch_size=10000, encoding='utf-8', columns=None):
+    """
+    Reads a CSV file in batches and yields each batch as a DataFrame.
+
+    Like read_csv_rows_generator this never loads the whole file, but hands out
+    column batches for the vectorized (batch mode) generators. All values are
+    read as strings, the same as the row reader returns them.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        batch_size (int): The number of rows per batch (default: 10000).
+        encoding (str): The encoding of the CSV file (default: 'utf-8').
+        columns (list): The columns to read (default: all).
+
+    Yields:
+        pd.DataFrame: The next batch of up to `batch_size` rows.
+
+    Raises:
+        FileNotFoundError: If the specified file does not exist.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"The file '{filepath}' was not found.")
+    try:
+        with pd.read_csv(filepath, chunksize=batch_size, dtype=str, keep_default_na=False, encoding=encoding,
+                         usecols=columns) as reader:
+            for batch in reader:
+                yield batch
+    except pd.errors.EmptyDataError:
+        return # Empty file, no batches to yield
+
+
+def read_parquet_batches_generator(filepath, batch_size=10000, columns=None):
+    """
+    Reads a Parquet file in batches and yields each batch as a DataFrame.
+
+    Args:
+        filepath (str): The path to the Parquet file.
+        batch_size (int): The maximum number of rows per batch (default: 10000).
+        columns (list): The columns to read (default: all).
+
+    Yields:
+        pd.DataFrame: The next batch of rows; dates are returned as datetime.date objects.
+
+    Raises:
+        FileNotFoundError: If the specified file does not exist.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"The file '{filepath}' was not found.")
+    _, pq = _import_pyarrow()
+    for batch in pq.ParquetFile(filepath).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+def read_parquet_rows_generator(filepath, batch_size=10000):
+    """
+    Reads a Parquet file batch by batch and yields each row as a dictionary,
+    like read_csv_rows_generator does for CSV files.
+
+    Args:
+        filepath (str): The path to the Parquet file.
+        batch_size (int): The number of rows decoded at a time (default: 10000).
+
+    Yields:
+        dict: Column names mapped to the row's values.
+    """
+    for batch in read_parquet_batches_generator(filepath, batch_size):
+        yield from batch.to_dict('records')
+
+def regroup_batches(batches, sizes):
+    """
+    Regroups DataFrame batches of any size into consecutive batches of the given sizes.
+
+    Args:
+        batches (iterable): DataFrames of consecutive rows.
+        sizes (iterable): Number of rows of each regrouped batch, e.g. itertools.repeat(1000).
+
+    Yields:
+        pd.DataFrame: The next regrouped batch; the last one holds the rows left when the
+        batches run out before its size is reached.
+    """
+    sizes = iter(sizes)
+    size = next(sizes, None)
+    pending, pending_rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += len(batch)
+        while size is not None and pending_rows >= size:
+            rows = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            yield rows.iloc[:size]
+            pending, pending_rows = [rows.iloc[size:]], pending_rows - size
+            size = next(sizes, None)
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
@@ -10,6 +10,7 @@ import datetime
 import re
 
 from dq_config import dq_config
+from src.instrumentation.memory import MemoryMonitor
 class data_quality:
     def __init__(self, config):
         self.config = config
@@ -17,6 +18,8 @@ class data_quality:
         self.results = defaultdict(list) # Category -> List of ValidationResult
         self.data_profile = {}
         self.overall_dq_score = 0.0
+        self.memory_monitor = MemoryMonitor(trace=getattr(config, 'MEMORY_REPORT', False))
+        self.memory_report = None # MemoryReport of the last run_all_checks, one stage per check
 
 
     def _get_examples(self, df,  id_field, num_examples=5):
@@ -1103,18 +1106,27 @@ class data_quality:
         return "\n".join(chart_js)
     
     def run_all_checks(self):
+        """Loads the data, runs every check and writes the reports.
+
+        The peak and retained memory of each step are kept in `self.memory_report`. With
+        MEMORY_REPORT set in the config, the steps are traced with tracemalloc and the memory
+        report, with each step's top allocation sites, is printed and saved to REPORT_DIR.
+        """
         start_time = datetime.datetime.now()
         print_colored(f"Starting Data Quality checks at {start_time}",'BOLD')
 
-        self.load_data()
-        self.validate_schema()
-        self.validate_referential_integrity()
-        self.validate_business_logic()
-        self.validate_statistical()
-        self.validate_completeness()
-        self.profile_data()
-        self.calculate_overall_dq_score()
-        self.generate_report()
+        steps = [self.load_data, self.validate_schema, self.validate_referential_integrity, self.validate_business_logic,
+                 self.validate_statistical, self.validate_completeness, self.profile_data,
+                 self.calculate_overall_dq_score, self.generate_report]
+        with self.memory_monitor.tracing():
+            for step in steps:
+                with self.memory_monitor.stage(step.__name__):
+                    step()
+        self.memory_report = self.memory_monitor.report()
+        if getattr(self.config, 'MEMORY_REPORT', False):
+            print_colored("\n--- Memory per Check ---", 'HEADER')
+            print_colored(self.memory_report.summary(), 'OKCYAN')
+            self.memory_report.write_json(os.path.join(self.config.REPORT_DIR, getattr(self.config, 'REPORT_FILENAME_MEMORY', 'dq_memory_report.json')))
 
         end_time = datetime.datetime.now()
         print_colored(f"\nFinished Data Quality checks at {end_time}",'BOLD')
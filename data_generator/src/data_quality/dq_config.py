@@ -6,6 +6,8 @@ class dq_config:
     REPORT_DIR = "dq_reports"
     REPORT_FILENAME_JSON = "dq_report.json"
     REPORT_FILENAME_HTML = "dq_dashboard.html"
+    REPORT_FILENAME_MEMORY = "dq_memory_report.json"
+    MEMORY_REPORT = False # Trace each check with tracemalloc and save its peak/retained memory and top allocation sites (slow)
     
     # --- Schema Definitions ---
     SCHEMA = {
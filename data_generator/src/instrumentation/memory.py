@@ -0,0 +1,285 @@
+import contextlib
+import logging
+import os
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+from src.instrumentation.profiling import StageReport
+
+
+def current_rss_mb():
+    """
+    Returns the resident set size of this process in MB.
+
+    Reads /proc/self/statm where it exists (Linux); elsewhere falls back to the peak RSS
+    so far, or None if the platform reports neither.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process so far in MB, or None if it is not available."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+
+def dataframe_mb(df):
+    """Returns the memory used by a DataFrame (or None) in MB, including the contents of string columns."""
+    return 0.0 if df is None else df.memory_usage(deep=True).sum() / 2**20
+
+def rows_within_budget(max_memory_mb, bytes_per_row, share=0.1, min_rows=100):
+    """
+    Returns how many rows fit into a share of a memory budget.
+
+    Args:
+        max_memory_mb (float): The memory budget in MB.
+        bytes_per_row (int): Estimated memory per row, including temporaries.
+        share (float): The share of the budget the rows may use (default: 0.1).
+        min_rows (int): The lower bound of the result (default: 100).
+
+    Returns:
+        int: The number of rows.
+    """
+    return max(min_rows, int(max_memory_mb * 2**20 * share / bytes_per_row))
+
+
+class StageMemory:
+    """
+    Memory used by one stage of a run, e.g. a generated table or a data quality check.
+
+    Args:
+        name (str): The stage name, e.g. 'EKPO'.
+        start_mb (float): RSS when the stage started, in MB.
+        peak_mb (float): Highest RSS sampled while it ran.
+        end_mb (float): RSS when it ended.
+        traced_peak_mb (float): Peak of the memory Python allocated while it ran, above what was allocated
+                                when it started (None if the stage was not traced).
+        traced_retained_mb (float): Memory Python allocated during the stage and still held at its end
+                                    (None if the stage was not traced).
+        top_sites (list): The call sites holding the most of the retained memory, as dicts with 'site'
+                          ('file:line'), 'size_mb' and 'blocks'.
+    """
+
+    def __init__(self, name, start_mb, peak_mb, end_mb, traced_peak_mb=None, traced_retained_mb=None, top_sites=None):
+        self.name = name
+        self.start_mb = start_mb
+        self.peak_mb = peak_mb
+        self.end_mb = end_mb
+        self.traced_peak_mb = traced_peak_mb
+        self.traced_retained_mb = traced_retained_mb
+        self.top_sites = top_sites if top_sites is not None else []
+
+    @property
+    def retained_mb(self):
+        """RSS growth over the stage in MB."""
+        return self.end_mb - self.start_mb
+
+    def combine(self, other):
+        """Returns the larger figures of this and another record of the same stage, e.g. of two shards."""
+        def larger(a, b):
+            return b if a is None else a if b is None else max(a, b)
+        traced = other if (other.traced_peak_mb or 0) > (self.traced_peak_mb or 0) else self
+        return StageMemory(self.name, self.start_mb, max(self.peak_mb, other.peak_mb), larger(self.end_mb, other.end_mb),
+                           larger(self.traced_peak_mb, other.traced_peak_mb),
+                           larger(self.traced_retained_mb, other.traced_retained_mb), traced.top_sites)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start_mb": _round_mb(self.start_mb),
+            "peak_mb": _round_mb(self.peak_mb),
+            "end_mb": _round_mb(self.end_mb),
+            "retained_mb": _round_mb(self.retained_mb),
+            "traced_peak_mb": _round_mb(self.traced_peak_mb),
+            "traced_retained_mb": _round_mb(self.traced_retained_mb),
+            "top_sites": [dict(site, size_mb=_round_mb(site['size_mb'])) for site in self.top_sites]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['start_mb'], data['peak_mb'], data['end_mb'], data['traced_peak_mb'],
+                   data['traced_retained_mb'], data['top_sites'])
+
+
+class MemoryReport(StageReport):
+    """
+    Memory used by the stages of a run, one StageMemory per stage in the order the stages ran.
+
+    Args:
+        stages (list): The StageMemory of every stage.
+    """
+    stage_class = StageMemory
+    title = "Memory report"
+
+    def over_ceilings(self, ceilings, measure='traced_peak_mb'):
+        """
+        Returns the stages that used more memory than allowed, e.g. to assert a scale's memory ceilings in tests.
+
+        Args:
+            ceilings (dict): Stage name -> ceiling in MB; stages without a ceiling are not checked.
+            measure (str): The StageMemory figure to compare (default: 'traced_peak_mb'; 'peak_mb' for RSS).
+
+        Returns:
+            dict: Stage name -> the figure, for every stage above its ceiling.
+
+        Raises:
+            KeyError: If a ceiling names a stage that did not run.
+        """
+        figures = {name: getattr(self.stages[name], measure) for name in ceilings}
+        return {name: figure for name, figure in figures.items() if figure is not None and figure > ceilings[name]}
+
+    def summary(self):
+        """Returns the report as text, one line per stage and indented lines for its top allocation sites."""
+        lines = []
+        for stage in self.stages.values():
+            line = f"{stage.name}: peak RSS {stage.peak_mb:.0f} MB, retained {stage.retained_mb:+.0f} MB"
+            if stage.traced_peak_mb is not None:
+                line += f"; traced peak {stage.traced_peak_mb:.1f} MB, retained {stage.traced_retained_mb:+.1f} MB"
+            lines.append(line)
+            for site in stage.top_sites:
+                lines.append(f"    {site['site']}: {site['size_mb']:+.1f} MB in {site['blocks']:,} blocks")
+        return "\n".join(lines)
+
+
+
+class MemoryMonitor:
+    """
+    Records the memory used by each stage of a run.
+
+    While a stage runs, a background thread samples the RSS every `interval` seconds;
+    the highest sample is logged when the stage ends, together with a warning if it
+    exceeded the memory budget. With `trace`, the stage is also traced with tracemalloc,
+    which records the peak and retained memory Python allocated and the call sites
+    holding most of it. Tracing slows the traced code down severalfold.
+
+    Args:
+        max_memory_mb (float): The memory budget in MB, or None for no budget.
+        interval (float): Seconds between samples (default: 0.05).
+        trace (bool): Trace allocations with tracemalloc (default: False).
+        top_sites (int): Allocation sites to record per traced stage (default: 5).
+    """
+
+    def __init__(self, max_memory_mb=None, interval=0.05, trace=False, top_sites=5):
+        self.max_memory_mb = max_memory_mb
+        self.interval = interval
+        self.trace = trace
+        self.top_sites = top_sites
+        self.stages = {} # Stage name -> StageMemory
+
+    @property
+    def stage_peaks(self):
+        """Stage name -> peak RSS in MB."""
+        return {name: stage.peak_mb for name, stage in self.stages.items()}
+
+    @contextlib.contextmanager
+    def tracing(self):
+        """
+        Context manager that keeps tracemalloc tracing while the block runs, so that memory
+        allocated in one stage and freed in a later one is accounted for. Does nothing if the
+        monitor does not trace or tracemalloc was already started.
+        """
+        started = self.trace and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager that records the memory used while the block runs as stage `name`."""
+        start_mb = current_rss_mb()
+        if start_mb is None and not self.trace:
+            yield
+            return
+        with self.tracing():
+            traced = _TracedStage(self.top_sites) if self.trace else None
+            samples = [start_mb or 0.0]
+            stopped = threading.Event()
+
+            def sample():
+                while not stopped.wait(self.interval):
+                    samples.append(current_rss_mb() or 0.0)
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            try:
+                yield
+            finally:
+                stopped.set()
+                sampler.join()
+                end_mb = current_rss_mb() or 0.0
+                peak_mb = max(samples + [end_mb])
+                self._record(StageMemory(name, start_mb or 0.0, peak_mb, end_mb, *(traced.finish() if traced else ())))
+                logging.info(f"Stage {name}: peak RSS {peak_mb:.0f} MB (started at {start_mb or 0.0:.0f} MB).")
+                if self.max_memory_mb is not None and peak_mb > self.max_memory_mb:
+                    logging.warning(f"Stage {name} used {peak_mb:.0f} MB, more than MAX_MEMORY_MB ({self.max_memory_mb} MB).")
+
+    def merge(self, report):
+        """Adds the stages of a report from another process (e.g. a shard worker), keeping the larger figures per stage."""
+        for stage in report.stages.values():
+            self._record(stage)
+
+    def report(self):
+        """Returns the recorded stages as a MemoryReport."""
+        return MemoryReport(self.stages.values())
+
+    def _record(self, stage):
+        recorded = self.stages.get(stage.name)
+        self.stages[stage.name] = stage if recorded is None else recorded.combine(stage)
+
+
+# Running traced stages of all monitors, innermost last: tracemalloc keeps a single peak per process
+_traced_stages = []
+
+# Frames of the tracing and the RSS sampler thread, left out of the allocation sites
+_SITE_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                 tracemalloc.Filter(False, threading.__file__)]
+
+class _TracedStage:
+    """
+    Traces one stage with tracemalloc. Resets the peak when the stage starts and hands the
+    peak reached so far on to the enclosing stage, so that nested stages measure their own
+    peaks without losing the outer stages'.
+    """
+
+    def __init__(self, top_sites):
+        # The snapshot is taken first, so the memory it holds counts as allocated before the stage
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(_SITE_FILTERS) if top_sites else None
+        self.top_sites = top_sites
+        current, peak = tracemalloc.get_traced_memory()
+        if _traced_stages:
+            _traced_stages[-1].peak = max(_traced_stages[-1].peak, peak)
+        tracemalloc.reset_peak()
+        self.start = self.peak = current
+        _traced_stages.append(self)
+
+    def finish(self):
+        """Ends the stage; returns its traced peak and retained memory in MB and its top allocation sites."""
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        _traced_stages.remove(self)
+        if _traced_stages:
+            _traced_stages[-1].peak = max(_traced_stages[-1].peak, self.peak)
+        top_sites = []
+        if self.snapshot is not None:
+            differences = tracemalloc.take_snapshot().filter_traces(_SITE_FILTERS).compare_to(self.snapshot, 'lineno')
+            top_sites = [{'site': f"{difference.traceback[0].filename}:{difference.traceback[0].lineno}",
+                          'size_mb': difference.size_diff / 2**20, 'blocks': difference.count_diff}
+                         for difference in differences if difference.size_diff > 0][:self.top_sites]
+            self.snapshot = None
+        return (self.peak - self.start) / 2**20, (current - self.start) / 2**20, top_sites
+
+
+def _round_mb(value):
+    return None if value is None else round(value, 3)
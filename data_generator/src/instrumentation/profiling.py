@@ -0,0 +1,235 @@
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import re
+import time
+
+
+class StageTiming:
+    """
+    Timings of one generation stage and of its sub-phases (e.g. 'EKPO contract lookup').
+
+    Args:
+        name (str): The stage name, e.g. 'MARA'.
+        wall_seconds (float): Elapsed time.
+        cpu_seconds (float): CPU time of this process; for sharded stages the workers' CPU time is in the sub-phases.
+        rows (int): Rows the stage wrote.
+        phases (dict): Sub-phase name -> {'wall_seconds', 'cpu_seconds', 'calls'}.
+    """
+
+    def __init__(self, name, wall_seconds=0.0, cpu_seconds=0.0, rows=0, phases=None):
+        self.name = name
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.rows = rows
+        self.phases = phases if phases is not None else {}
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def add_phase(self, phase, wall_seconds, cpu_seconds, calls=1):
+        """Adds time spent in a sub-phase; repeated phases are summed."""
+        timing = self.phases.setdefault(phase, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+        timing['wall_seconds'] += wall_seconds
+        timing['cpu_seconds'] += cpu_seconds
+        timing['calls'] += calls
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows_per_sec, 2),
+            "phases": {phase: {key: round(value, 6) if isinstance(value, float) else value for key, value in timing.items()}
+                       for phase, timing in self.phases.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['wall_seconds'], data['cpu_seconds'], data['rows'], data['phases'])
+
+
+class StageReport:
+    """
+    Base of the per-stage reports of a run (GenerationReport, memory.MemoryReport): the
+    stages by name, in the order they ran, and their JSON form.
+
+    Subclasses set `stage_class`, whose from_dict rebuilds a stage from its to_dict output,
+    and `title`, which names the report in the log.
+
+    Args:
+        stages (list): The record of every stage.
+    """
+    stage_class = None
+    title = "Report"
+
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+
+    def to_dict(self):
+        return {"stages": [stage.to_dict() for stage in self.stages.values()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a report from to_dict output, e.g. one returned by a worker process."""
+        return cls([cls.stage_class.from_dict(stage) for stage in data['stages']])
+
+    def write_json(self, filepath):
+        """Writes the report to a JSON file."""
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filepath, 'w') as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+        logging.info(f"{self.title} saved to {filepath}")
+
+
+class GenerationReport(StageReport):
+    """
+    Timings of a generation run: one StageTiming per stage, in the order the stages ran.
+
+    Args:
+        stages (list): The StageTiming of every stage.
+        wall_seconds (float): Elapsed time of the whole run.
+        cpu_seconds (float): CPU time of the whole run.
+    """
+    stage_class = StageTiming
+    title = "Generation timing report"
+
+    def __init__(self, stages, wall_seconds=0.0, cpu_seconds=0.0):
+        super().__init__(stages)
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+
+    def slowest_stage(self):
+        """Returns the StageTiming with the longest wall time, or None if no stage ran."""
+        return max(self.stages.values(), key=lambda stage: stage.wall_seconds, default=None)
+
+    def summary(self):
+        """Returns the report as text, one line per stage and indented lines for its sub-phases."""
+        lines = [f"Generation took {self.wall_seconds:.2f}s wall, {self.cpu_seconds:.2f}s CPU."]
+        for stage in self.stages.values():
+            lines.append(f"{stage.name}: {stage.wall_seconds:.2f}s wall, {stage.cpu_seconds:.2f}s CPU, "
+                         f"{stage.rows:,} rows, {stage.rows_per_sec:,.0f} rows/s")
+            for phase, timing in stage.phases.items():
+                lines.append(f"    {phase}: {timing['wall_seconds']:.2f}s wall, {timing['cpu_seconds']:.2f}s CPU, "
+                             f"{timing['calls']:,} calls")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            **super().to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        report = super().from_dict(data)
+        report.wall_seconds, report.cpu_seconds = data['wall_seconds'], data['cpu_seconds']
+        return report
+
+
+# Only one cProfile profiler can run at a time; nested or in-process shard stages are covered by the outer one
+_profile_active = False
+
+class StageProfiler:
+    """
+    Records wall time, CPU time and rows of generation stages and their sub-phases.
+
+    Stages may be nested; sub-phases and rows are added to the innermost running stage.
+    With a profile directory, each stage (that is not inside another profiled stage) is
+    also run under cProfile and its statistics saved as '<prefix><stage>.prof', to be
+    read with pstats or snakeviz.
+
+    Args:
+        profile_dir (str): Directory for cProfile statistics, or None to not profile (default).
+        prefix (str): Prefix of the statistics file names, e.g. 'shard-00003-' (default: none).
+    """
+
+    def __init__(self, profile_dir=None, prefix=''):
+        self.profile_dir = profile_dir
+        self.prefix = prefix
+        self.stages = []
+        self.active = [] # Running stages, innermost last
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager that times the block as stage `name`."""
+        global _profile_active
+        timing = StageTiming(name)
+        self.stages.append(timing)
+        self.active.append(timing)
+        profile = None
+        if self.profile_dir is not None and not _profile_active:
+            profile = cProfile.Profile()
+            _profile_active = True
+            profile.enable()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield timing
+        finally:
+            timing.wall_seconds += time.perf_counter() - wall_start
+            timing.cpu_seconds += time.process_time() - cpu_start
+            self.active.pop()
+            if profile is not None:
+                profile.disable()
+                _profile_active = False
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profile.dump_stats(os.path.join(self.profile_dir, f"{self.prefix}{_file_safe(name)}.prof"))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager that adds the block's time to sub-phase `name` of the running stage."""
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+
+    def add_phase(self, name, wall_seconds, cpu_seconds, calls=1):
+        """Adds time measured elsewhere (e.g. by a writer) to sub-phase `name` of the running stage."""
+        if self.active:
+            self.active[-1].add_phase(name, wall_seconds, cpu_seconds, calls)
+
+    def add_rows(self, rows):
+        """Adds rows written to the running stage."""
+        if self.active:
+            self.active[-1].rows += rows
+
+    def merge(self, report):
+        """
+        Adds the stages of a report from another generator (e.g. a shard) to the running stage:
+        each stage becomes a sub-phase, and its sub-phases are summed into the running stage's.
+        """
+        if not self.active:
+            return
+        timing = self.active[-1]
+        for stage in report.stages.values():
+            timing.add_phase(stage.name, stage.wall_seconds, stage.cpu_seconds)
+            for phase, phase_timing in stage.phases.items():
+                timing.add_phase(phase, phase_timing['wall_seconds'], phase_timing['cpu_seconds'], phase_timing['calls'])
+            timing.rows += stage.rows
+
+    def report(self, wall_seconds=None, cpu_seconds=None):
+        """
+        Returns the recorded stages as a GenerationReport.
+
+        Args:
+            wall_seconds (float): Elapsed time of the run (default: the sum over the stages).
+            cpu_seconds (float): CPU time of the run (default: the sum over the stages).
+        """
+        if wall_seconds is None:
+            wall_seconds = sum(stage.wall_seconds for stage in self.stages)
+        if cpu_seconds is None:
+            cpu_seconds = sum(stage.cpu_seconds for stage in self.stages)
+        return GenerationReport(self.stages, wall_seconds, cpu_seconds)
+
+
+def _file_safe(name):
+    """Returns a stage name usable as a file name ('EKPO/EKBE' -> 'EKPO_EKBE')."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
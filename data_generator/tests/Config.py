@@ -1,5 +1,10 @@
 import datetime
 
+# PO_HEADERS_PER_SHARD of the sharding tests: SHARDED splits the 100 PO headers of sampleconfig
+# into 4 shards, UNSHARDED generates them in one pass
+SHARDED = 30
+UNSHARDED = 1000
+
 class sampleconfig:
     # General
 
@@ -7,6 +12,7 @@ class sampleconfig:
     RANDOM_SEED = 42
     OUTPUT_DIR = "tests_generated_sap_data"
     OUTPUT_FORMAT = "csv" # or "parquet"
+    IN_PROCESS_HANDOFF = True # As shipped; tests of the re-reading path set it to False
 
     # Date Range
     START_DATE = datetime.date(2020, 1, 1)
@@ -19,6 +25,7 @@ class sampleconfig:
     NUM_PO_LINE_ITEMS_TARGET = 400 # Target for EKPO
     NUM_PO_HISTORY_TARGET = 300 # Target for EKBE
     NUM_CONTRACTS_TARGET = 200 # Target for VENDOR_CONTRACTS
+    NUM_VENDORS_CONTRACTS_TARGET = 200 # Target for VENDOR_CONTRACTS
 
     # LFA1 - Vendor Master
     VENDOR_BLOCKED_PERCENTAGE =0.05 # 5% blocked
@@ -26,6 +33,7 @@ class sampleconfig:
     VENDOR_PERCENTAGE_FOR_DISTRIBUTION_OF_SALES=.2
     VENDOR_SALES_CONTRIBUTION_PERCENTAGE=0.80
     VENDOR_TYPES = ['ZDOM', 'ZINT', 'ZSRV', 'ZCON'] # Domestic, International, Service, Consumable
+    VENDOR_UNIQUE_FIELDS = ['NAME1', 'SMTP_ADDR'] # LFA1 columns that get distinct values in batch mode
 
     # MARA - Material Master
     MATERIAL_TYPES = ['ROH', 'HALB', 'FERT', 'HAWA']
@@ -0,0 +1,901 @@
+# tests/test_batch_generation.py
+import datetime
+import io
+import json
+import os
+import random
+
+import pandas as pd
+import numpy as np
+import pytest
+
+from src.data_generator import SAPDataGenerator
+from tests.Config import SHARDED, UNSHARDED
+
+
+@pytest.fixture
+def batch_generator(sample_config, tmp_path):
+    sample_config.GENERATION_MODE = "batch"
+    sample_config.OUTPUT_DIR = str(tmp_path)
+    d = SAPDataGenerator(sample_config)
+    d._calculate_vendor_weights()
+    return d
+
+
+def test_lfa1_batch_respects_caps_and_formats(batch_generator):
+    """
+    Validates that the vectorized LFA1 engine produces sequential vendor IDs,
+    keeps the blocked/preferred caps and writes the same columns as the row-wise engine.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    config = batch_generator.config
+    config.NUM_VENDORS = 2000
+    batch_generator._calculate_vendor_weights()
+    lfa1 = batch_generator.generate_lfa1()
+
+    assert len(lfa1) == config.NUM_VENDORS
+    # Vendor IDs stay integers in memory and are formatted when LFA1 is written
+    assert lfa1['LIFNR'].dtype == np.int64
+    assert lfa1['LIFNR'].iloc[0] == 1 and lfa1['LIFNR'].iloc[-1] == 2000
+    assert lfa1['LIFNR'].is_unique
+    assert (lfa1['SPERR'] == 'X').sum() <= np.ceil(config.VENDOR_BLOCKED_PERCENTAGE * config.NUM_VENDORS)
+    assert lfa1['IS_PREFERRED'].sum() <= np.ceil(config.VENDOR_PREFERRED_PERCENTAGE * config.NUM_VENDORS)
+    assert set(lfa1['KTOKK']) <= set(config.VENDOR_TYPES)
+    assert lfa1['NAME1'].is_unique and lfa1['SMTP_ADDR'].is_unique
+    assert pd.to_datetime(lfa1['ERDAT']).between(pd.Timestamp(config.START_DATE), pd.Timestamp(config.END_DATE)).all()
+
+    saved = pd.read_csv(f"{config.OUTPUT_DIR}/LFA1.csv", keep_default_na=False)
+    assert list(saved.columns) == ['LIFNR', 'NAME1', 'LAND1', 'ORT01', 'KTOKK', 'ERDAT', 'STRAS', 'SMTP_ADDR', 'SPERR']
+    assert saved['LIFNR'].iloc[0] == 'V0000001' and saved['LIFNR'].iloc[-1] == 'V0002000'
+
+
+def test_mara_batch_weights_and_prices(batch_generator):
+    """
+    Validates that the vectorized MARA engine draws weights within each unit-of-measure
+    branch, keeps prices inside the material group's price range and stores base prices
+    positionally.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    config = batch_generator.config
+    mara = batch_generator.generate_mara()
+
+    assert len(mara) == config.NUM_MATERIALS
+    assert mara['MATNR'].is_unique
+    assert set(mara['MATKL']) <= set(config.MATERIAL_GROUPS)
+    for mat_group, group_info in config.MATERIAL_GROUPS.items():
+        in_group = mara[mara['MATKL'] == mat_group]
+        assert in_group['MAKTX'].isin(group_info['Description']).all()
+        low, high = group_info['price_range']
+        assert in_group['BASE_PRICE'].between(low, high).all()
+
+    kg = mara[mara['MEINS'] == 'KG']
+    assert kg['BRGEW'].between(0.1, 100.0).all()
+    assert (mara['NTGEW'] <= mara['BRGEW']).all() and (mara['NTGEW'] >= 0).all()
+
+    assert isinstance(batch_generator.material_base_prices, np.ndarray)
+    np.testing.assert_array_equal(batch_generator.material_base_prices, mara['BASE_PRICE'].to_numpy())
+
+
+def test_vendor_contracts_sampled_in_flat_index_space(batch_generator):
+    """
+    Validates that vendor contracts reference unique active vendor-material pairs,
+    respect the contract target and keep valid, positive prices and date ranges.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    config = batch_generator.config
+    batch_generator.generate_lfa1()
+    batch_generator.generate_mara()
+    batch_generator.generate_vendor_contract()
+    contracts = batch_generator.contract_df
+    lfa1 = batch_generator.lfa1_df
+
+    assert 0 < len(contracts) <= config.NUM_VENDORS_CONTRACTS_TARGET
+    assert contracts['CONTRACT_ID'].is_unique
+    assert not contracts.duplicated(['LIFNR', 'MATNR']).any()
+    assert contracts['LIFNR'].isin(lfa1.loc[lfa1['SPERR'] != 'X', 'LIFNR']).all()
+    assert contracts['MATNR'].isin(batch_generator.mara_df['MATNR']).all()
+    assert (contracts['VALID_FROM'] <= contracts['VALID_TO']).all()
+    assert (contracts['CONTRACT_PRICE'] > 0).all()
+
+
+def test_sample_without_replacement_large_population():
+    """
+    Validates that sampling from a combination space far larger than memory returns
+    distinct in-range values without materializing the population.
+    """
+    from src.data_generator.utilities import sample_without_replacement
+
+    population_size = 10_000 * 500_000
+    sample = sample_without_replacement(population_size, 5000)
+    assert len(sample) == 5000
+    assert len(np.unique(sample)) == 5000
+    assert sample.min() >= 0 and sample.max() < population_size
+
+    assert sorted(sample_without_replacement(10, 10)) == list(range(10))
+    with pytest.raises(ValueError):
+        sample_without_replacement(5, 6)
+
+
+def test_contract_index_matches_brute_force_filter():
+    """
+    Validates that the per-vendor interval lookup returns exactly the materials a full
+    scan of the contract table would return for a vendor and date.
+    """
+    from src.data_generator.ContractIndex import ContractIndex
+
+    contract_df = pd.DataFrame({
+        'LIFNR': ['V1', 'V1', 'V2', 'V1', 'V2'],
+        'MATNR': ['M1', 'M2', 'M1', 'M3', 'M3'],
+        'CONTRACT_PRICE': [10.0, 20.0, 30.0, 40.0, 50.0],
+        'VALID_FROM': [datetime.date(2021, 1, 1), datetime.date(2020, 1, 1), datetime.date(2020, 6, 1),
+                       datetime.date(2022, 1, 1), datetime.date(2019, 1, 1)],
+        'VALID_TO': [datetime.date(2021, 12, 31), datetime.date(2023, 1, 1), datetime.date(2020, 12, 31),
+                     datetime.date(2022, 6, 30), datetime.date(2025, 1, 1)],
+    })
+    material_ids = ['M1', 'M2', 'M3']
+    index = ContractIndex(contract_df, material_ids)
+
+    for lifnr in ['V1', 'V2', 'V9']:
+        for date in pd.date_range('2019-06-01', '2024-06-01', freq='45D').date:
+            expected = contract_df[(contract_df['LIFNR'] == lifnr) &
+                                   (contract_df['VALID_FROM'] <= date) & (contract_df['VALID_TO'] >= date)]
+            found = index.active_materials(lifnr, date)
+            assert sorted(material_ids[m] for m in found) == sorted(expected['MATNR'])
+
+    contract_pos = index.find_active_contract('V1', 1, datetime.date(2022, 3, 1))
+    assert index.contract_price[contract_pos] == 20.0
+    assert index.find_active_contract('V1', 0, datetime.date(2022, 3, 1)) == -1
+
+    dates = np.array(pd.date_range('2019-06-01', '2024-06-01', freq='30D').date, dtype='datetime64[D]')
+    for lifnr in ['V1', 'V2', 'V9']:
+        for mat_pos in range(len(material_ids)):
+            found = index.find_active_contracts(np.full(len(dates), lifnr), np.full(len(dates), mat_pos), dates)
+            expected = [index.find_active_contract(lifnr, mat_pos, date) for date in dates]
+            np.testing.assert_array_equal(found, expected)
+
+
+def test_ekpo_batch_yields_line_item_batches(batch_generator):
+    """
+    Validates that the columnar EKPO engine yields DataFrame batches that hit the
+    line item target, number line items per PO and price contract POs at the contract price.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    config = batch_generator.config
+    config.GENERATION_BATCH_SIZE = 100
+    batch_generator.generate_lfa1()
+    batch_generator.generate_mara()
+    batch_generator.generate_vendor_contract()
+    batch_generator.generate_ekko()
+
+    batch_generator._save_table_from_generator(batch_generator.generate_ekpo, 'EKPO')
+    ekpo = pd.read_csv(f"{config.OUTPUT_DIR}/EKPO.csv", keep_default_na=False)
+    ekko = pd.read_csv(f"{config.OUTPUT_DIR}/EKKO.csv", keep_default_na=False)
+
+    assert len(ekpo) <= config.NUM_PO_LINE_ITEMS_TARGET
+    assert not ekpo.duplicated(['EBELN', 'EBELP']).any()
+    assert ekpo['EBELP'].str.fullmatch(r'LI\d{5}').all()
+    first_lines = ekpo.groupby('EBELN', sort=False)['EBELP'].first()
+    assert (first_lines == 'LI00001').all()
+    assert ekpo['EBELN'].isin(ekko['EBELN']).all()
+    assert (ekpo['NETPR'] > 0).all()
+    np.testing.assert_allclose(ekpo['NETWR'], (ekpo['MENGE'] * ekpo['NETPR']).round(2))
+    days_to_delivery = (pd.to_datetime(ekpo['EINDT']) - pd.to_datetime(ekpo['PO_DATE'])).dt.days
+    assert days_to_delivery.between(7, 60).all()
+
+    contracts = pd.read_csv(f"{config.OUTPUT_DIR}/vendor_contract.csv", keep_default_na=False)
+    contract_lines = ekpo.merge(ekko[['EBELN', 'BSART']], on='EBELN').merge(
+        contracts[['LIFNR', 'MATNR', 'CONTRACT_PRICE', 'VALID_FROM', 'VALID_TO']], on=['LIFNR', 'MATNR'])
+    po_date = pd.to_datetime(contract_lines['PO_DATE'])
+    active = contract_lines[(contract_lines['BSART'] == 'NB') &
+                            (pd.to_datetime(contract_lines['VALID_FROM']) <= po_date) &
+                            (pd.to_datetime(contract_lines['VALID_TO']) >= po_date)]
+    assert len(active) > 0
+    np.testing.assert_allclose(active['NETPR'], active['CONTRACT_PRICE'].round(2))
+
+
+def test_ekbe_batch_splits_and_interleaves(batch_generator):
+    """
+    Validates that the columnar EKBE engine splits each line item's quantity into 1-3
+    positive GRs that add up to MENGE, follows each GR with at most one matching invoice
+    and numbers GR/INV documents sequentially up to the history target.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    config = batch_generator.config
+    config.GENERATION_BATCH_SIZE = 50
+    config.NUM_PO_HISTORY_TARGET = 100000 # Enough to cover every line item
+    batch_generator.generate_SAP_data()
+    ekpo = pd.read_csv(f"{config.OUTPUT_DIR}/EKPO.csv", keep_default_na=False)
+    ekbe = pd.read_csv(f"{config.OUTPUT_DIR}/EKBE.csv", keep_default_na=False)
+
+    gr = ekbe[ekbe['BEWTP'] == 'E']
+    inv = ekbe[ekbe['BEWTP'] == 'Q']
+    assert list(gr['BELNR']) == [f"GR{i:05d}" for i in range(1, len(gr) + 1)]
+    assert list(inv['BELNR']) == [f"INV{i:05d}" for i in range(1, len(inv) + 1)]
+
+    received = gr.groupby(['EBELN', 'EBELP'])['MENGE'].agg(['sum', 'count', 'min'])
+    items = ekpo.set_index(['EBELN', 'EBELP']).loc[received.index]
+    assert len(received) == len(ekpo)
+    assert (received['sum'] == items['MENGE']).all()
+    assert received['count'].between(1, 3).all() and (received['min'] >= 1).all()
+
+    # Every invoice directly follows the GR it bills
+    previous = ekbe.shift(1)
+    is_inv = ekbe['BEWTP'] == 'Q'
+    assert (previous.loc[is_inv, 'BEWTP'] == 'E').all()
+    assert (previous.loc[is_inv, 'MENGE'] == ekbe.loc[is_inv, 'MENGE']).all()
+    invoice_lag = (pd.to_datetime(ekbe.loc[is_inv, 'BUDAT']) - pd.to_datetime(previous.loc[is_inv, 'BUDAT'])).dt.days
+    assert invoice_lag.between(*config.INVOICE_DAYS_AFTER_GR).all()
+    assert (ekbe.loc[is_inv, 'ACTUAL_DELIVERY_DATE'] == '').all()
+
+    gr_items = gr.merge(ekpo[['EBELN', 'EBELP', 'PO_DATE']], on=['EBELN', 'EBELP'])
+    assert (pd.to_datetime(gr_items['BUDAT']) > pd.to_datetime(gr_items['PO_DATE'])).all()
+
+
+def test_ekbe_batch_stops_at_history_target(batch_generator):
+    """
+    Validates that the columnar EKBE engine writes exactly NUM_PO_HISTORY_TARGET rows
+    when there are more receipts available.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    config = batch_generator.config
+    config.GENERATION_BATCH_SIZE = 50
+    batch_generator.generate_SAP_data()
+    ekbe = pd.read_csv(f"{config.OUTPUT_DIR}/EKBE.csv", keep_default_na=False)
+    assert len(ekbe) == config.NUM_PO_HISTORY_TARGET
+
+
+@pytest.mark.parametrize("generation_mode", ["batch", "row"])
+def test_sharded_generation_is_identical_for_any_number_of_workers(sample_config, tmp_path, generation_mode):
+    """
+    Validates that generating the transactional tables in shards writes every PO header
+    once, keeps PO and GR/INV document numbers unique across shards, merges the part
+    files and writes byte-identical files with 1 and 3 workers.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+    """
+    from src.data_generator.sharding import plan_shards
+    from src.data_generator.IdAllocator import IdAllocator
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.PO_HEADERS_PER_SHARD = SHARDED
+    sample_config.NUM_PO_HISTORY_TARGET = 100000
+    tables = ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']
+    outputs = []
+    for workers in [1, 3]:
+        sample_config.OUTPUT_DIR = str(tmp_path / f"workers-{workers}")
+        SAPDataGenerator(sample_config).generate_SAP_data(workers=workers)
+        assert sorted(os.listdir(sample_config.OUTPUT_DIR)) == sorted(f"{table}.csv" for table in tables)
+        outputs.append({table: (tmp_path / f"workers-{workers}" / f"{table}.csv").read_bytes() for table in tables})
+    assert outputs[0] == outputs[1]
+
+    ekko = pd.read_csv(tmp_path / "workers-1" / "EKKO.csv", keep_default_na=False)
+    ekpo = pd.read_csv(tmp_path / "workers-1" / "EKPO.csv", keep_default_na=False)
+    ekbe = pd.read_csv(tmp_path / "workers-1" / "EKBE.csv", keep_default_na=False)
+    assert list(ekko['EBELN']) == [f"PO{i:010d}" for i in range(1, sample_config.NUM_PO_HEADERS + 1)]
+    assert len(ekpo) <= sample_config.NUM_PO_LINE_ITEMS_TARGET
+    assert not ekpo.duplicated(['EBELN', 'EBELP']).any()
+    assert ekbe['BELNR'].is_unique
+    assert ekbe['EBELN'].isin(ekpo['EBELN']).all()
+
+    shards = plan_shards(sample_config, IdAllocator(), SHARDED)
+    offsets = list(range(0, sample_config.NUM_PO_HEADERS, SHARDED))
+    assert [shard['NUM_PO_HEADERS'] for shard in shards] == [min(SHARDED, sample_config.NUM_PO_HEADERS - offset) for offset in offsets]
+    assert sum(shard['NUM_PO_LINE_ITEMS_TARGET'] for shard in shards) == sample_config.NUM_PO_LINE_ITEMS_TARGET
+    assert [shard['id_offsets']['EBELN'] for shard in shards] == offsets
+
+
+def test_random_streams_are_independent_per_table_and_block():
+    """
+    Validates that each (table, block) stream is reproducible from RANDOM_SEED alone and
+    differs from the streams of other tables and blocks.
+    """
+    from src.data_generator.rng import RowStreams, get_random_state, seed_global_state
+
+    first = get_random_state(42, 'EKPO', 3).randint(0, 10**9, 5)
+    np.random.seed(0) # The global state does not affect the streams
+    np.testing.assert_array_equal(get_random_state(42, 'EKPO', 3).randint(0, 10**9, 5), first)
+    assert not np.array_equal(get_random_state(42, 'EKPO', 4).randint(0, 10**9, 5), first)
+    assert not np.array_equal(get_random_state(42, 'EKBE', 3).randint(0, 10**9, 5), first)
+    assert not np.array_equal(get_random_state(43, 'EKPO', 3).randint(0, 10**9, 5), first)
+
+    # Row streams draw what the seeded global state draws, without touching it
+    streams = RowStreams(42, 'EKPO', 3)
+    seed_global_state(42, 'EKPO', 3)
+    assert [streams.random.random(), streams.np_random.randint(10**9)] == [random.random(), np.random.randint(10**9)]
+
+
+@pytest.mark.parametrize("generation_mode, workers", [("batch", 1), ("row", 1), ("batch", 2)])
+def test_parquet_output_streams_row_groups_with_fixed_schema(sample_config, tmp_path, generation_mode, workers):
+    """
+    Validates that Parquet output writes every table with its fixed schema, streams
+    EKPO/EKBE as one row group per chunk and matches the row counts of CSV output.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+        workers (int): Number of worker processes.
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    from src.data_generator.utilities import get_parquet_schema
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.GENERATION_BATCH_SIZE = 20
+    sample_config.PO_HEADERS_PER_SHARD = 50
+    sample_config.OUTPUT_FORMAT = "parquet"
+    sample_config.PARQUET_COMPRESSION = "zstd"
+    sample_config.OUTPUT_DIR = str(tmp_path)
+    SAPDataGenerator(sample_config).generate_SAP_data(workers=workers)
+
+    for table in ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']:
+        parquet_file = pq.ParquetFile(tmp_path / f"{table}.parquet")
+        assert parquet_file.schema_arrow.equals(get_parquet_schema(f"{table}.parquet"))
+        assert parquet_file.metadata.row_group(0).column(0).compression == "ZSTD"
+
+    ekko = pd.read_parquet(tmp_path / "EKKO.parquet")
+    ekpo = pd.read_parquet(tmp_path / "EKPO.parquet")
+    ekbe = pd.read_parquet(tmp_path / "EKBE.parquet")
+    assert len(ekko) == sample_config.NUM_PO_HEADERS
+    assert 0 < len(ekpo) <= sample_config.NUM_PO_LINE_ITEMS_TARGET
+    assert 0 < len(ekbe) <= sample_config.NUM_PO_HISTORY_TARGET
+    assert ekbe.loc[ekbe['BEWTP'] == 'Q', 'ACTUAL_DELIVERY_DATE'].isna().all()
+    if generation_mode == "batch":
+        assert pq.ParquetFile(tmp_path / "EKPO.parquet").metadata.num_row_groups > 1
+
+
+@pytest.mark.parametrize("generation_mode", ["batch", "row"])
+def test_in_process_handoff_writes_complete_tables_without_rereading(sample_config, tmp_path, monkeypatch, generation_mode):
+    """
+    Validates that with in-process handoff EKKO/EKPO records go straight to the next stage,
+    they are never re-read from disk, and EKPO is still written in full although EKBE
+    stops at its target first.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        monkeypatch (MonkeyPatch): Used to make re-reading EKKO/EKPO fail.
+        generation_mode (str): "batch" or "row".
+    """
+    read_table = SAPDataGenerator._read_table
+
+    def read_table_except_handed_off(self, table, batches=None):
+        assert table not in ('EKKO', 'EKPO'), f"{table} was re-read from disk"
+        return read_table(self, table, batches)
+    monkeypatch.setattr(SAPDataGenerator, "_read_table", read_table_except_handed_off)
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.GENERATION_BATCH_SIZE = 20
+    sample_config.NUM_PO_HISTORY_TARGET = 50
+    sample_config.OUTPUT_DIR = str(tmp_path)
+    SAPDataGenerator(sample_config).generate_SAP_data()
+
+    ekko = pd.read_csv(tmp_path / "EKKO.csv", keep_default_na=False)
+    ekpo = pd.read_csv(tmp_path / "EKPO.csv", keep_default_na=False)
+    ekbe = pd.read_csv(tmp_path / "EKBE.csv", keep_default_na=False)
+    assert len(ekko) == sample_config.NUM_PO_HEADERS
+    assert len(ekpo) == sample_config.NUM_PO_LINE_ITEMS_TARGET or set(ekpo['EBELN']) == set(ekko['EBELN'])
+    assert 0 < len(ekbe) <= sample_config.NUM_PO_HISTORY_TARGET
+    assert ekbe['EBELN'].isin(ekpo['EBELN']).all()
+    assert ekpo['PO_DATE'].str.fullmatch(r'\d{4}-\d{2}-\d{2}').all()
+    assert ekbe['BUDAT'].str.fullmatch(r'\d{4}-\d{2}-\d{2}').all()
+
+
+@pytest.mark.parametrize("generation_mode", ["batch", "row"])
+def test_in_process_handoff_only_changes_io(sample_config, tmp_path, generation_mode):
+    """
+    Validates that both engines write byte-identical files with and without in-process
+    handoff: EKPO and EKBE draw from their own streams, so generating them interleaved
+    does not change their values.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+    """
+    sample_config.GENERATION_MODE = generation_mode
+    tables = ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']
+    outputs = []
+    for handoff in [False, True]:
+        sample_config.IN_PROCESS_HANDOFF = handoff
+        sample_config.OUTPUT_DIR = str(tmp_path / f"handoff-{handoff}")
+        SAPDataGenerator(sample_config).generate_SAP_data()
+        outputs.append({table: (tmp_path / f"handoff-{handoff}" / f"{table}.csv").read_bytes() for table in tables})
+    assert outputs[0] == outputs[1]
+
+
+def test_value_pools_are_seeded_cached_and_unique(tmp_path, monkeypatch):
+    """
+    Validates that Faker value pools are distinct, reproducible for a seed, loaded from
+    the on-disk cache on the next run, large enough for unique draws and no larger than a
+    draw needs.
+
+    Args:
+        tmp_path (Path): Temporary cache directory.
+        monkeypatch (MonkeyPatch): Used to make pool generation fail once the cache is filled.
+    """
+    from src.data_generator.ValuePools import ValuePools
+
+    pools = ValuePools(7, pool_size=50, cache_dir=str(tmp_path))
+    companies = pools.get_pool('company')
+    assert len(companies) == 50 and len(set(companies)) == 50
+    assert set(pools.draw('company', 500)) <= set(companies)
+    assert len(ValuePools(7, pool_size=50).get_pool('country_code')) <= 50
+
+    emails = pools.draw_unique('email', 120)
+    assert len(set(emails)) == 120
+
+    # Pools hold no more values than a draw needs; a smaller pool is the start of a larger one
+    small = ValuePools(7)
+    assert len(set(small.draw('company', 10))) <= 10 and len(small.pools['company']) == 10
+    np.testing.assert_array_equal(pools.get_pool('company', 10), small.pools['company'])
+
+    def fail_generate(self, field, size):
+        raise AssertionError("Pool was generated instead of loaded from the cache")
+    monkeypatch.setattr(ValuePools, "_generate_pool", fail_generate)
+    cached = ValuePools(7, pool_size=50, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cached.get_pool('company'), companies)
+
+    monkeypatch.undo()
+    assert list(ValuePools(8, pool_size=50).get_pool('company')) != list(companies)
+
+
+def test_id_allocator_reserves_disjoint_ranges_and_formats_at_write_time():
+    """
+    Validates that the ID allocator hands out consecutive, non-overlapping int64 ranges
+    and formats/parses IDs per kind, including EKBE's GR/INV document numbers.
+    """
+    from src.data_generator.IdAllocator import IdAllocator
+
+    allocator = IdAllocator()
+    np.testing.assert_array_equal(allocator.allocate('LIFNR', 3), [1, 2, 3])
+    assert allocator.reserve('EBELN', 10) == (1, 11)
+    assert allocator.reserve('EBELN', 5) == (11, 16)
+    assert allocator.allocate('EBELN', 2).tolist() == [16, 17]
+    assert allocator.high_water_mark('EBELN') == 17
+
+    assert list(allocator.format('LIFNR', [1, 42])) == ['V0000001', 'V0000042']
+    assert allocator.format_id('EBELN', 7) == 'PO0000000007'
+    assert list(allocator.format('CONTRACT_ID', [123456])) == ['C123456'] # Wider numbers are not cut
+    assert list(allocator.parse('MATNR', ['M0000005', 'M0001000'])) == [5, 1000]
+
+    ekbe = pd.DataFrame({'EBELN': [3, 3], 'BEWTP': ['E', 'Q'], 'BELNR': [12, 9]})
+    written = allocator.format_ids('EKBE', ekbe)
+    assert list(written['EBELN']) == ['PO0000000003'] * 2
+    assert list(written['BELNR']) == ['GR00012', 'INV00009']
+    assert ekbe['BELNR'].tolist() == [12, 9] # The handed-on chunk keeps its numbers
+    pd.testing.assert_frame_equal(allocator.parse_ids('EKBE', written)[['EBELN']], ekbe[['EBELN']])
+
+
+def test_calendar_sampler_matches_seasonal_profiles(batch_generator):
+    """
+    Validates that the calendar sampler draws PO dates inside the date range with the
+    analytic Q4 share of the old rejection loop, applies weekday and month-end profiles
+    and is used by the columnar EKKO engine.
+
+    Args:
+        batch_generator (SAPDataGenerator): Generator configured for batch mode.
+    """
+    from src.data_generator.CalendarSampler import CalendarSampler
+
+    start_date, end_date = datetime.date(2023, 1, 1), datetime.date(2024, 12, 31)
+    sampler = CalendarSampler.from_profiles(start_date, end_date, q4_increase_percentage=0.3)
+    days = pd.DatetimeIndex(sampler.days)
+    is_q4 = np.asarray(days.month >= 10)
+    # A date is forced into Q4 with probability 0.3, otherwise uniform over all days
+    expected_q4_share = 0.3 + 0.7 * is_q4.mean()
+    assert sampler.expected_share(is_q4) == pytest.approx(expected_q4_share)
+
+    np.random.seed(0)
+    dates = pd.DatetimeIndex(sampler.sample(20000))
+    # Same [start, end) range as get_random_dates
+    assert dates.min() >= pd.Timestamp(start_date) and dates.max() < pd.Timestamp(end_date)
+    assert days[-1] == pd.Timestamp(end_date) - pd.Timedelta(days=1)
+    assert (dates.month >= 10).mean() == pytest.approx(expected_q4_share, abs=0.02)
+    assert isinstance(sampler.sample(), datetime.date)
+
+    weekdays_only = CalendarSampler.from_profiles(start_date, end_date, weekday_weights=[1, 1, 1, 1, 1, 0, 0])
+    assert (pd.DatetimeIndex(weekdays_only.sample(1000)).dayofweek < 5).all()
+    month_end = CalendarSampler.from_profiles(start_date, end_date, month_end_uplift=1.0, month_end_days=3)
+    is_month_end = (days + pd.Timedelta(days=3)).month != days.month
+    assert month_end.expected_share(np.asarray(is_month_end)) > is_month_end.mean()
+
+    config = batch_generator.config
+    config.WEEKDAY_WEIGHTS = [1, 1, 1, 1, 1, 0, 0]
+    batch_generator.generate_lfa1()
+    batch_generator.generate_mara()
+    batch_generator.generate_vendor_contract()
+    batch_generator.generate_ekko()
+    ekko = pd.read_csv(f"{config.OUTPUT_DIR}/EKKO.csv", keep_default_na=False)
+    aedat = pd.to_datetime(ekko['AEDAT'])
+    assert len(ekko) == config.NUM_PO_HEADERS
+    assert aedat.between(pd.Timestamp(config.START_DATE), pd.Timestamp(config.END_DATE)).all()
+    assert (aedat.dt.dayofweek < 5).all()
+    assert (ekko['AEDAT'] == ekko['BEDAT']).all()
+    assert ekko['BSART'].iloc[:(ekko['BSART'] == 'NB').sum()].eq('NB').all()
+    assert ekko['LIFNR'].isin(pd.read_csv(f"{config.OUTPUT_DIR}/LFA1.csv", keep_default_na=False)['LIFNR']).all()
+
+
+def test_alias_sampler_matches_weights():
+    """
+    Validates that the alias sampler draws items in proportion to their weights, never
+    draws zero-weight items, supports single and `size=N` draws, and that delivery delays
+    drawn through it stay inside their DELAY_DISTRIBUTION buckets.
+    """
+    from src.data_generator.utilities import AliasSampler, get_delivery_delays, get_delivery_delay_days
+
+    np.random.seed(0)
+    weights = np.array([5.0, 0.0, 1.0, 3.0, 1.0])
+    sampler = AliasSampler(['a', 'b', 'c', 'd', 'e'], weights)
+    draws = sampler.sample(100000)
+    shares = pd.Series(draws).value_counts(normalize=True).reindex(list('abcde'), fill_value=0)
+    np.testing.assert_allclose(shares.to_numpy(), weights / weights.sum(), atol=0.01)
+    assert sampler.sample() in {'a', 'c', 'd', 'e'}
+    assert isinstance(sampler.sample_indices(), int)
+    with pytest.raises(ValueError):
+        AliasSampler(['a', 'b'], [0, 0])
+
+    delay_distribution = {'1-7_days': 0.6, '8-14_days': 0.3, '15-30_days': 0.1}
+    delays = get_delivery_delays(delay_distribution, 50000)
+    assert delays.min() >= 1 and delays.max() <= 30
+    assert np.mean(delays <= 7) == pytest.approx(0.6, abs=0.01)
+    assert 1 <= get_delivery_delay_days(delay_distribution) <= 30
+
+
+def test_vectorized_helpers_match_scalar_versions():
+    """
+    Validates that the array-returning helpers agree with their scalar counterparts:
+    same log-normal parameters and clamping, same inclusive day ranges and the same
+    rounded net values.
+    """
+    from src.data_generator.utilities import (
+        log_normal_int, log_normal_ints, get_random_date_in_range, get_random_dates_in_range,
+        calculate_net_value, calculate_net_values
+    )
+
+    np.random.seed(1)
+    scalar = [log_normal_int(4, std_dev_factor=0.5, min_val=1, max_val=15) for _ in range(5)]
+    np.random.seed(1)
+    vector = [log_normal_ints(4, 1, std_dev_factor=0.5, min_val=1, max_val=15)[0] for _ in range(5)]
+    assert scalar == vector
+    values = log_normal_ints(4, 100000, min_val=1, max_val=15)
+    assert values.dtype == np.int64 and values.min() >= 1 and values.max() <= 15
+    assert values.mean() == pytest.approx(4, abs=0.1)
+
+    po_dates = np.array(['2024-01-31', '2024-02-28', '2024-12-31'], dtype='datetime64[D]')
+    eindt = get_random_dates_in_range(np.repeat(po_dates, 2000), 7, 60)
+    days_ahead = (eindt - np.repeat(po_dates, 2000)).astype(int)
+    assert eindt.dtype == np.dtype('datetime64[D]')
+    assert days_ahead.min() == 7 and days_ahead.max() == 60
+    assert len(get_random_dates_in_range(datetime.date(2024, 1, 1), 0, 0, size=3)) == 3
+    assert 7 <= (get_random_date_in_range(datetime.date(2024, 1, 1), 7, 60) - datetime.date(2024, 1, 1)).days <= 60
+
+    quantities = np.random.randint(1, 1001, 1000)
+    prices = np.round(np.random.uniform(1, 10000, 1000), 2)
+    np.testing.assert_allclose(calculate_net_values(quantities, prices),
+                               [calculate_net_value(int(q), float(p)) for q, p in zip(quantities, prices)], atol=0.011)
+
+
+@pytest.mark.parametrize("generation_mode", ["batch", "row"])
+def test_generation_plan_hits_targets_exactly(sample_config, tmp_path, generation_mode):
+    """
+    Validates that the generation plan gives every PO at least one line item, sums exactly
+    to the line item and history targets, and that both engines follow it.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+    """
+    from src.data_generator.GenerationPlan import GenerationPlan, adjust_to_total
+
+    counts = adjust_to_total(np.array([1, 5, 15, 3]), 10, 1, 15)
+    assert counts.sum() == 10 and counts.min() >= 1
+    assert adjust_to_total(np.array([1, 5, 15, 3]), 40, 1, 15).max() <= 15
+
+    sample_config.NUM_PO_LINE_ITEMS_TARGET = 250 # Fewer than the ~400 the mean of 4 lines per PO gives
+    plan = GenerationPlan.draw(sample_config)
+    assert plan.num_line_items == 250 and plan.line_counts.min() >= 1
+    assert plan.line_range(10, 20) == (plan.line_counts[:10].sum(), plan.line_counts[:20].sum())
+    assert plan.num_history_rows == sample_config.NUM_PO_HISTORY_TARGET
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.GENERATION_BATCH_SIZE = 20
+    sample_config.OUTPUT_DIR = str(tmp_path)
+    generator = SAPDataGenerator(sample_config)
+    generator.generate_SAP_data()
+    ekko = pd.read_csv(tmp_path / "EKKO.csv", keep_default_na=False)
+    ekpo = pd.read_csv(tmp_path / "EKPO.csv", keep_default_na=False)
+    ekbe = pd.read_csv(tmp_path / "EKBE.csv", keep_default_na=False)
+    assert len(ekpo) == sample_config.NUM_PO_LINE_ITEMS_TARGET
+    assert set(ekpo['EBELN']) == set(ekko['EBELN']) # Every PO has line items
+    np.testing.assert_array_equal(ekpo.groupby('EBELN', sort=False).size().to_numpy(), generator.plan.line_counts)
+    np.testing.assert_array_equal(ekpo['MENGE'].to_numpy(), generator.plan.quantities)
+    assert len(ekbe) == sample_config.NUM_PO_HISTORY_TARGET
+
+
+def test_master_data_store_maps_columns_read_only(tmp_path):
+    """
+    Validates that the master data store round-trips numeric, date and string columns,
+    returns memory-mapped read-only views instead of copies and dictionary-encodes strings.
+
+    Args:
+        tmp_path (Path): Temporary store directory.
+    """
+    from src.data_generator.MasterDataStore import MasterDataStore
+
+    mara = pd.DataFrame({
+        'MATNR': np.arange(1, 6, dtype=np.int64),
+        'MATKL': ['Electronics', 'Office Supplies', 'Electronics', 'Raw Materials', 'Electronics'],
+        'BASE_PRICE': [1.5, 2.0, 3.25, 4.0, 5.75],
+        'ERSDA': [datetime.date(2024, 1, day) for day in range(1, 6)],
+        'CREATED': pd.date_range('2024-01-01', periods=5)
+    })
+    store = MasterDataStore(str(tmp_path / "store"))
+    store.put_table('MARA', mara)
+    store.put_array('material_base_prices', mara['BASE_PRICE'].to_numpy())
+
+    shared = store.get_table('MARA')
+    assert list(shared.columns) == list(mara.columns)
+    for column in mara.columns:
+        assert shared[column].tolist() == mara[column].tolist()
+    # Mapped read-only, not copied
+    for column in ['MATNR', 'BASE_PRICE', 'CREATED']:
+        assert not shared[column].to_numpy().flags.writeable
+    assert not shared['MATKL'].array.codes.flags.writeable
+    assert shared['MATKL'].dtype == 'category' and len(shared['MATKL'].cat.categories) == 3
+    assert (shared['MATKL'] == 'Electronics').sum() == 3
+    prices = store.get_array('material_base_prices')
+    assert isinstance(prices, np.memmap) and prices.tolist() == mara['BASE_PRICE'].tolist()
+
+    store.remove()
+    assert not (tmp_path / "store").exists()
+
+
+@pytest.mark.parametrize("generation_mode, workers", [("row", 1), ("row", 2), ("batch", 1), ("batch", 2)])
+def test_memory_budget_spills_master_data_without_changing_output(sample_config, tmp_path, generation_mode, workers):
+    """
+    Validates that a tight MAX_MEMORY_MB lowers the batch size, spills the master data to
+    memory-mapped files, releases it after the run and records every stage's peak memory,
+    while both engines write the same files as without a budget.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+        workers (int): Number of worker processes.
+    """
+
+    sample_config.GENERATION_MODE = generation_mode
+    # Shards of more PO headers than the budget's 100-record batches
+    sample_config.NUM_PO_HEADERS = 300
+    sample_config.PO_HEADERS_PER_SHARD = 150
+    tables = ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']
+    outputs = []
+    for max_memory_mb in [None, 0.01]:
+        sample_config.MAX_MEMORY_MB = max_memory_mb
+        sample_config.OUTPUT_DIR = str(tmp_path / f"budget-{max_memory_mb}")
+        generator = SAPDataGenerator(sample_config)
+        generator.generate_SAP_data(workers=workers)
+        assert sorted(os.listdir(sample_config.OUTPUT_DIR)) == sorted(f"{table}.csv" for table in tables)
+        outputs.append({table: (tmp_path / f"budget-{max_memory_mb}" / f"{table}.csv").read_bytes() for table in tables})
+        assert {'LFA1', 'MARA', 'vendor_contract'} <= set(generator.memory_monitor.stage_peaks)
+    assert outputs[0] == outputs[1]
+
+    assert generator._batch_size() == 100
+    assert generator.lfa1_df is None and generator.master_store is None
+
+    sample_config.OUTPUT_DIR = str(tmp_path / "spilled")
+    generator = SAPDataGenerator(sample_config)
+    generator._calculate_vendor_weights()
+    generator.generate_lfa1()
+    generator.generate_mara()
+    generator.generate_vendor_contract()
+    generator._apply_memory_budget()
+    assert os.path.isdir(generator.master_store.directory)
+    assert list(generator.mara_df.columns) == ['MATNR', 'MATKL', 'MEINS']
+    assert not generator.mara_df['MATKL'].cat.codes.to_numpy().flags.writeable
+    generator._release_master_data()
+    assert not os.path.exists(tmp_path / "spilled" / ".master_data")
+
+
+@pytest.mark.parametrize("generation_mode, output_format, workers", [("batch", "csv", 1), ("row", "csv", 1), ("batch", "parquet", 2)])
+def test_append_adds_new_window_as_new_files(sample_config, tmp_path, generation_mode, output_format, workers):
+    """
+    Validates that an append run keeps the existing files, writes EKKO/EKPO/EKBE of the new
+    window to new increment files and continues the PO and GR/INV number sequences.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+        output_format (str): "csv" or "parquet".
+        workers (int): Number of worker processes.
+    """
+
+    def read(name):
+        path = tmp_path / f"{name}.{output_format}"
+        return pd.read_parquet(path) if output_format == "parquet" else pd.read_csv(path, keep_default_na=False)
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.OUTPUT_FORMAT = output_format
+    sample_config.OUTPUT_DIR = str(tmp_path)
+    sample_config.PO_HEADERS_PER_SHARD = 40
+    SAPDataGenerator(sample_config).generate_SAP_data(workers=workers)
+    full_run = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+
+    sample_config.START_DATE = datetime.date(2025, 1, 1)
+    sample_config.END_DATE = datetime.date(2025, 1, 31)
+    for increment in [1, 2]:
+        SAPDataGenerator(sample_config).generate_SAP_data(workers=workers, append=True)
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            list(full_run) + [f"{table}-append-{i:05d}.{output_format}" for table in ['EKKO', 'EKPO', 'EKBE'] for i in range(1, increment + 1)])
+    assert {name: (tmp_path / name).read_bytes() for name in full_run} == full_run
+
+    ekko = [read("EKKO"), read("EKKO-append-00001"), read("EKKO-append-00002")]
+    ebeln = pd.concat([df['EBELN'] for df in ekko], ignore_index=True)
+    assert list(ebeln) == [f"PO{i:010d}" for i in range(1, 3 * sample_config.NUM_PO_HEADERS + 1)]
+    assert ekko[1]['LIFNR'].isin(read("LFA1")['LIFNR']).all()
+    appended_dates = pd.to_datetime(pd.concat([ekko[1]['AEDAT'], ekko[2]['AEDAT']]))
+    assert appended_dates.between(pd.Timestamp(2025, 1, 1), pd.Timestamp(2025, 1, 31)).all()
+    assert not ekko[1][['LIFNR', 'AEDAT']].equals(ekko[2][['LIFNR', 'AEDAT']]) # Increments draw from their own streams
+
+    ekbe = pd.concat([read("EKBE"), read("EKBE-append-00001"), read("EKBE-append-00002")], ignore_index=True)
+    assert ekbe['BELNR'].is_unique
+    assert read("EKPO-append-00001")['EBELN'].isin(ekko[1]['EBELN']).all()
+
+
+@pytest.mark.parametrize("generation_mode, shard_size", [("batch", SHARDED), ("row", SHARDED), ("batch", UNSHARDED), ("row", UNSHARDED)])
+def test_resume_skips_finished_stages_and_matches_uninterrupted_run(sample_config, tmp_path, monkeypatch, generation_mode, shard_size):
+    """
+    Validates that a checkpointed run that fails part-way can be resumed: the resumed run
+    skips the recorded stages and shards and writes the same files as an uninterrupted run.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        monkeypatch (MonkeyPatch): Used to make a stage fail and to count stage calls.
+        generation_mode (str): "batch" or "row".
+        shard_size (int): PO_HEADERS_PER_SHARD, SHARDED or UNSHARDED.
+    """
+    from src.data_generator.Checkpoint import Checkpoint
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.PO_HEADERS_PER_SHARD = shard_size
+    tables = ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']
+    sample_config.OUTPUT_DIR = str(tmp_path / "uninterrupted")
+    SAPDataGenerator(sample_config).generate_SAP_data(workers=1)
+    expected = {table: (tmp_path / "uninterrupted" / f"{table}.csv").read_bytes() for table in tables}
+
+    sample_config.OUTPUT_DIR = str(tmp_path / "resumed")
+    sample_config.CHECKPOINT = True
+    calls, preempted = [], [True]
+    original_generate_ekpo = SAPDataGenerator.generate_ekpo
+    def failing_generate_ekpo(generator, *args):
+        calls.append(generator.shard_id)
+        if preempted[0] and generator.shard_id in (None, 2):
+            raise RuntimeError("node preempted")
+        return original_generate_ekpo(generator, *args)
+    monkeypatch.setattr(SAPDataGenerator, 'generate_ekpo', failing_generate_ekpo)
+    with pytest.raises(RuntimeError):
+        SAPDataGenerator(sample_config).generate_SAP_data(workers=1)
+
+    manifest = json.loads((tmp_path / "resumed" / Checkpoint.FILENAME).read_text())
+    finished = ['LFA1', 'MARA', 'vendor_contract'] + (['shard 0', 'shard 1'] if shard_size == SHARDED else [])
+    assert list(manifest['stages']) == finished
+    assert manifest['stages']['vendor_contract']['id_high_water_marks']['LIFNR'] == sample_config.NUM_VENDORS
+
+    calls.clear()
+    preempted[0] = False
+    monkeypatch.setattr(SAPDataGenerator, 'generate_lfa1', lambda generator: pytest.fail("LFA1 was regenerated"))
+    SAPDataGenerator(sample_config).generate_SAP_data(workers=1, resume=True)
+    assert calls == ([2, 3] if shard_size == SHARDED else [None])
+    assert {table: (tmp_path / "resumed" / f"{table}.csv").read_bytes() for table in tables} == expected
+
+    sample_config.NUM_PO_HEADERS += 1
+    with pytest.raises(ValueError):
+        SAPDataGenerator(sample_config).generate_SAP_data(workers=1, resume=True)
+
+
+@pytest.mark.parametrize("generation_mode, shard_size", [("batch", UNSHARDED), ("row", UNSHARDED), ("batch", SHARDED)])
+def test_progress_reports_every_stage_to_all_sinks(sample_config, tmp_path, generation_mode, shard_size):
+    """
+    Validates that every stage reports its rows against the planned targets to the JSON
+    status file, the log and the terminal bar, ending at 100% with throughput figures.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+        shard_size (int): PO_HEADERS_PER_SHARD, SHARDED or UNSHARDED.
+    """
+    from src.data_generator.progress import TerminalProgressSink
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.PO_HEADERS_PER_SHARD = shard_size
+    sample_config.OUTPUT_DIR = str(tmp_path / "output")
+    sample_config.PROGRESS_SINKS = ['log', 'json']
+    sample_config.PROGRESS_STATUS_FILE = str(tmp_path / "status.json")
+    sample_config.PROGRESS_INTERVAL_SECONDS = 0
+    generator = SAPDataGenerator(sample_config)
+    terminal = io.StringIO()
+    generator.progress.sinks.append(TerminalProgressSink(terminal))
+    generator.generate_SAP_data(workers=1)
+
+    status = json.loads((tmp_path / "status.json").read_text())
+    assert status['current_stage'] is None
+    stages = status['stages']
+    written = {table: len(pd.read_csv(tmp_path / "output" / f"{table}.csv")) for table in ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']}
+    expected = ['LFA1', 'MARA', 'vendor_contract'] + (['EKKO', 'EKPO', 'EKBE'] if shard_size == UNSHARDED else ['EKKO/EKPO/EKBE shards'])
+    assert sorted(stages) == sorted(expected)
+    for name, snapshot in stages.items():
+        assert snapshot['status'] == 'finished' and snapshot['bytes_written'] > 0 and snapshot['rows_per_sec'] > 0
+        if name in written:
+            assert snapshot['rows'] == written[name]
+    if shard_size == UNSHARDED:
+        assert stages['EKPO']['total_rows'] == generator._generation_plan().num_line_items
+        assert all(stages[table]['percent'] == 100.0 for table in ['LFA1', 'MARA', 'EKKO', 'EKPO', 'EKBE'])
+    else:
+        assert stages['EKKO/EKPO/EKBE shards']['rows'] == sample_config.NUM_PO_HEADERS
+        assert stages['EKKO/EKPO/EKBE shards']['unit'] == 'PO headers'
+    assert "[##############################] LFA1: 100.0%" in terminal.getvalue()
+
+
+@pytest.mark.parametrize("generation_mode, shard_size", [("batch", UNSHARDED), ("row", UNSHARDED), ("batch", SHARDED)])
+def test_timing_report_covers_every_stage_and_ekpo_phase(sample_config, tmp_path, generation_mode, shard_size):
+    """
+    Validates that the timing report has a stage per generation step with the rows it wrote,
+    breaks EKPO down into contract lookup, pricing and writing (also for sharded runs, whose
+    shard timings are merged), and is written with its cProfile statistics when configured.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        generation_mode (str): "batch" or "row".
+        shard_size (int): PO_HEADERS_PER_SHARD, SHARDED or UNSHARDED.
+    """
+    from src.instrumentation.profiling import GenerationReport
+
+    sample_config.GENERATION_MODE = generation_mode
+    sample_config.PO_HEADERS_PER_SHARD = shard_size
+    sample_config.OUTPUT_DIR = str(tmp_path / "output")
+    sample_config.TIMING_REPORT = True
+    sample_config.PROFILE_STAGES = True
+    generator = SAPDataGenerator(sample_config)
+    report = generator.generate_SAP_data(workers=1)
+
+    assert report is generator.report
+    written = {table: len(pd.read_csv(tmp_path / "output" / f"{table}.csv")) for table in ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']}
+    for table in ['LFA1', 'MARA', 'vendor_contract']:
+        assert report.stages[table].rows == written[table]
+    assert sum(stage.rows for stage in report.stages.values()) == sum(written.values())
+    if shard_size == UNSHARDED:
+        ekpo_stage = next(stage for name, stage in report.stages.items() if name.startswith('EKPO'))
+    else:
+        ekpo_stage = report.stages['EKKO/EKPO/EKBE']
+        assert ekpo_stage.phases['EKPO/EKBE']['calls'] == 4 and 'merge EKPO' in ekpo_stage.phases
+    for phase in ['EKPO contract index', 'EKPO contract lookup', 'EKPO pricing', 'EKPO write']:
+        if phase == 'EKPO pricing' and generation_mode == 'row':
+            continue # The row engine prices inline
+        assert ekpo_stage.phases[phase]['calls'] > 0
+    assert report.wall_seconds >= sum(stage.wall_seconds for stage in report.stages.values()) > 0
+    assert report.slowest_stage() is not None and "EKKO" in report.summary()
+
+    written_report = GenerationReport.from_dict(json.loads((tmp_path / "output" / "generation_report.json").read_text()))
+    assert list(written_report.stages) == list(report.stages)
+    profiles = {path.name for path in (tmp_path / "output" / "profiles").iterdir()}
+    assert {'LFA1.prof', 'MARA.prof', 'vendor_contract.prof'} <= profiles
@@ -0,0 +1,86 @@
+# tests/test_benchmarks.py
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks import utilities as micro
+from benchmarks.generation import BASELINE_PATH, compare_to_baseline, fit_scaling_exponent, run_benchmark
+
+
+def test_fit_scaling_exponent_recovers_power_law():
+    """Validates that the fitted exponent is that of the power law the timings follow, and None without distinct sizes."""
+    rows = [1000, 10000, 100000]
+    assert fit_scaling_exponent(rows, [2e-6 * r for r in rows]) == pytest.approx(1.0)
+    assert fit_scaling_exponent(rows, [1e-9 * r ** 2 for r in rows]) == pytest.approx(2.0)
+    assert fit_scaling_exponent([500, 500], [0.1, 0.2]) is None
+
+
+def test_compare_to_baseline_flags_superlinear_slow_and_memory_hungry_stages():
+    """Validates that exponent, throughput and peak memory regressions beyond their tolerances are reported, and nothing else."""
+    run = {'rows': 40000, 'wall_seconds': 1.0, 'rows_per_sec': 40000.0, 'peak_mb': 200.0}
+    baseline = {'scales': [1, 10, 100], 'modes': {'batch': {
+        'EKPO': {'exponent': 1.0, 'runs': {'100': dict(run)}},
+        'EKBE': {'exponent': 1.0, 'runs': {'100': dict(run)}}}}}
+    assert compare_to_baseline(baseline, baseline) == []
+
+    results = copy.deepcopy(baseline)
+    results['modes']['batch']['EKPO']['exponent'] = 1.6
+    results['modes']['batch']['EKPO']['runs']['100'].update(rows_per_sec=10000.0, peak_mb=400.0)
+    results['modes']['batch']['EKBE']['exponent'] = 1.1 # Within the tolerance
+    regressions = compare_to_baseline(results, baseline)
+    assert len(regressions) == 3 and all(regression.startswith('batch EKPO') for regression in regressions)
+
+
+def test_benchmark_reports_every_table_at_every_scale():
+    """Validates that a small benchmark run measures every table at every scale and matches the stored baseline's layout."""
+    results = run_benchmark(scales=[1, 2], modes=['batch'])
+    tables = results['modes']['batch']
+    assert list(tables) == ['LFA1', 'MARA', 'vendor_contract', 'EKKO', 'EKPO', 'EKBE']
+    for figures in tables.values():
+        assert figures['exponent'] is not None
+        assert set(figures['runs']) == {'1', '2'}
+        assert all(run['rows'] > 0 and run['rows_per_sec'] > 0 and run['peak_mb'] > 0 for run in figures['runs'].values())
+    assert tables['EKPO']['runs']['2']['rows'] > tables['EKPO']['runs']['1']['rows']
+
+    with open(BASELINE_PATH) as baseline_file:
+        baseline = json.load(baseline_file)
+    assert {mode: list(tables) for mode, tables in baseline['modes'].items()} == {mode: list(tables) for mode in ['batch', 'row']}
+
+
+def test_micro_benchmark_cases_match_baseline_and_produce_their_values(tmp_path):
+    """
+    Validates that every utilities primitive has a scalar and a batch case, that the saved
+    baseline covers exactly the cases, and that one call of each case produces the number
+    of values its timings are divided by.
+
+    Args:
+        tmp_path (Path): Directory for the CSV reader input.
+    """
+    cases = micro.build_cases(str(tmp_path))
+    with open(micro.BASELINE_PATH) as baseline_file:
+        assert set(json.load(baseline_file)) == {case.name for case in cases}
+    for primitive in ['generate_id', 'get_random_date', 'get_random_date_in_range', 'weighted_choice', 'log_normal_int',
+                      'get_q4_multiplier', 'get_delivery_delay_days', 'calculate_net_value', 'read_csv_rows_generator']:
+        assert {case.variant.split()[0] for case in cases if case.primitive == primitive} == {'scalar', 'batch'}
+    for case in cases:
+        produced = case.setup()()
+        if case.primitive == 'read_csv_rows_generator':
+            assert produced == case.items == micro.CSV_ROWS
+        elif case.variant.startswith('batch'):
+            assert len(produced) == case.items == micro.BATCH_SIZE
+        else:
+            assert np.ndim(produced) == 0 and case.items == 1
+
+
+def test_micro_benchmark_flags_slowdowns_beyond_tolerance():
+    """Validates that only cases slower than the baseline by more than the tolerance are reported."""
+    baseline = {'generate_id scalar': {'ns_per_item': 100.0, 'items_per_call': 1},
+                'generate_id batch': {'ns_per_item': 10.0, 'items_per_call': 10000}}
+    results = {'generate_id scalar': {'ns_per_item': 140.0, 'items_per_call': 1},
+               'generate_id batch': {'ns_per_item': 20.0, 'items_per_call': 10000},
+               'calculate_net_value scalar': {'ns_per_item': 1000.0, 'items_per_call': 1}} # Not in the baseline
+    regressions = micro.compare_to_baseline(results, baseline, tolerance=0.5)
+    assert len(regressions) == 1 and regressions[0].startswith('generate_id batch')
+    assert micro.run_benchmark('calculate_net_value scalar', repeat=1)['calculate_net_value scalar']['ns_per_item'] > 0
@@ -0,0 +1,114 @@
+# tests/test_memory_ceilings.py
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.data_generator import SAPDataGenerator
+from src.instrumentation.memory import MemoryMonitor
+from tests.Config import SHARDED, UNSHARDED
+
+# Traced peak memory (MB) each stage may reach at the scale of tests.Config.sampleconfig
+GENERATION_CEILINGS_MB = {'LFA1': 4, 'MARA': 4, 'vendor_contract': 4, 'EKKO': 4, 'EKPO/EKBE': 4}
+DQ_CEILINGS_MB = {'load_data': 4, 'validate_schema': 4, 'validate_referential_integrity': 4,
+                  'validate_business_logic': 4, 'validate_statistical': 4, 'validate_completeness': 4, 'profile_data': 4}
+DASHBOARD_CEILINGS_MB = {'load raw data': 4, 'type conversions': 4, 'merge df_po_items': 4, 'derived metrics': 4,
+                         'aggregations': 4, 'savings opportunities': 4}
+
+
+@pytest.fixture
+def generated_dir(sample_config, tmp_path):
+    sample_config.OUTPUT_DIR = str(tmp_path / "output")
+    SAPDataGenerator(sample_config).generate_SAP_data(workers=1)
+    return sample_config.OUTPUT_DIR
+
+
+@pytest.mark.parametrize("shard_size", [UNSHARDED, SHARDED])
+def test_generation_stays_within_memory_ceilings(sample_config, tmp_path, shard_size):
+    """
+    Validates that a traced generation run reports the peak and retained memory and the top
+    allocation sites of every stage, writes them to memory_report.json, and stays within the
+    memory ceilings of the sample scale; sharded runs report the shards' stages.
+
+    Args:
+        sample_config (Config): Test configuration.
+        tmp_path (Path): Temporary output directory.
+        shard_size (int): PO_HEADERS_PER_SHARD, SHARDED or UNSHARDED.
+    """
+    sample_config.OUTPUT_DIR = str(tmp_path / "output")
+    sample_config.PO_HEADERS_PER_SHARD = shard_size
+    sample_config.MEMORY_REPORT = True
+    generator = SAPDataGenerator(sample_config)
+    generator.generate_SAP_data(workers=1)
+    report = generator.memory_report
+    assert set(GENERATION_CEILINGS_MB) <= set(report.stages)
+    assert report.over_ceilings(GENERATION_CEILINGS_MB) == {}
+    for stage in report.stages.values():
+        assert stage.peak_mb > 0 and stage.traced_peak_mb is not None and stage.traced_peak_mb >= stage.traced_retained_mb
+    assert report.stages['EKPO/EKBE'].top_sites and all(site['size_mb'] > 0 for site in report.stages['EKPO/EKBE'].top_sites)
+    written = json.loads((tmp_path / "output" / "memory_report.json").read_text())
+    assert [stage['name'] for stage in written['stages']] == list(report.stages)
+
+
+def test_data_quality_checks_stay_within_memory_ceilings(generated_dir, tmp_path, monkeypatch):
+    """
+    Validates that run_all_checks reports the memory of every check, saves the traced report
+    next to the DQ reports and stays within the memory ceilings of the sample scale.
+
+    Args:
+        generated_dir (str): Directory with the generated sample tables.
+        tmp_path (Path): Temporary report directory.
+        monkeypatch (MonkeyPatch): Puts the data quality modules on the import path.
+    """
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), '..', 'src', 'data_quality'))
+    data_quality = importlib.import_module('data_quality')
+    config = importlib.import_module('dq_config').dq_config()
+    config.DATA_DIR = generated_dir
+    config.REPORT_DIR = str(tmp_path / "dq_reports")
+    config.MEMORY_REPORT = True
+    checks = data_quality.data_quality(config)
+    checks.run_all_checks()
+    report = checks.memory_report
+
+    assert list(report.stages)[0] == 'load_data' and list(report.stages)[-1] == 'generate_report'
+    assert report.over_ceilings(DQ_CEILINGS_MB) == {}
+    assert all(stage.traced_peak_mb is not None for stage in report.stages.values())
+    assert (tmp_path / "dq_reports" / config.REPORT_FILENAME_MEMORY).exists()
+
+
+def test_dashboard_preprocessing_stays_within_memory_ceilings(generated_dir, monkeypatch):
+    """
+    Validates that load_and_preprocess_data reports the memory of every preprocessing step,
+    including the merge into df_po_items, within the memory ceilings of the sample scale.
+
+    Args:
+        generated_dir (str): Directory with the generated sample tables.
+        monkeypatch (MonkeyPatch): Puts the dashboard modules on the import path.
+    """
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(__file__), '..', 'dashboard'))
+    dashboard_prep = importlib.import_module('dashboard_prep')
+    monkeypatch.setattr(dashboard_prep, 'DATA_DIR', generated_dir)
+    monitor = MemoryMonitor(trace=True)
+    with monitor.tracing():
+        data = dashboard_prep.load_and_preprocess_data.__wrapped__(_memory_monitor=monitor)
+    report = monitor.report()
+
+    assert list(report.stages) == list(DASHBOARD_CEILINGS_MB)
+    assert report.over_ceilings(DASHBOARD_CEILINGS_MB) == {}
+    assert report.stages['merge df_po_items'].traced_retained_mb > 0 and len(data['df_po_items']) > 0
+
+
+def test_monitored_modules_import_without_the_generator_package():
+    """
+    Validates that the data quality checks and the dashboard preprocessing import the memory
+    monitor without loading the generator package or configuring the root logger.
+    """
+    root = os.path.join(os.path.dirname(__file__), '..')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.path.join(root, 'src', 'data_quality'), os.path.join(root, 'dashboard')]))
+    code = ("import logging, sys; import data_quality, dashboard_prep; "
+            "print('src.data_generator' in sys.modules, len(logging.getLogger().handlers))")
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', '0']